@@ -0,0 +1,44 @@
+# Benchmarks the per-tuple CoordinateConverter methods against the batch ones
+# run from the repository root with: python benchmarks/benchCoordinateConverter.py [count]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from CoordinateConverter import CoordinateConverter, numpy
+
+def timeIt(name: str, function, count: int) -> float:
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter()-start
+    print(f"{name:<40} {elapsed:8.3f}s {count/elapsed/1_000_000:8.2f}M conversions/s")
+    return elapsed
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    random.seed(0)
+    coordinates = [(random.randint(-30_000_000, 30_000_000), random.randint(-64, 320), random.randint(-30_000_000, 30_000_000)) for _ in range(count)]
+    print(f"Converting {count} coordinates")
+
+    perTuple = timeIt("overworldToNether (per tuple)", lambda: [CoordinateConverter.overworldToNether(i) for i in coordinates], count)
+    batch = timeIt("overworldToNetherBatch (python)", lambda: CoordinateConverter.overworldToNetherBatch(coordinates), count)
+    print(" "*41+f"{perTuple/batch:8.2f}x faster than per tuple")
+    assert CoordinateConverter.overworldToNetherBatch(coordinates) == [CoordinateConverter.overworldToNether(i) for i in coordinates]
+
+    timeIt("netherToOverworld (per tuple)", lambda: [CoordinateConverter.netherToOverworld(i) for i in coordinates], count)
+    timeIt("netherToOverworldBatch (python)", lambda: CoordinateConverter.netherToOverworldBatch(coordinates), count)
+
+    if numpy is None:
+        print("numpy isn't installed, skipping the numpy benchmarks.")
+        return
+    coordinateArray = numpy.array(coordinates, dtype=numpy.int64)
+    numpyBatch = timeIt("overworldToNetherBatch (numpy)", lambda: CoordinateConverter.overworldToNetherBatch(coordinateArray), count)
+    print(" "*41+f"{perTuple/numpyBatch:8.2f}x faster than per tuple")
+    assert CoordinateConverter.overworldToNetherBatch(coordinateArray).tolist() == [list(i) for i in CoordinateConverter.overworldToNetherBatch(coordinates)]
+    timeIt("netherToOverworldBatch (numpy)", lambda: CoordinateConverter.netherToOverworldBatch(coordinateArray), count)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Benchmarks CoordinateParser against the coordinate parsing the console used before it
+# run from the repository root with: python benchmarks/benchCoordinateParsing.py [count]
+
+import os
+import random
+import sys
+import time
+from ast import literal_eval
+from typing import Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from CoordinateParser import extractCoordinates, parseCoordinateString
+
+#* the old parsing functions, copied here as they were so there's something to compare against
+def oldRemoveCommasFromNumber(number: str) -> int:
+    NUMBERS = ["1","2","3","4","5","6","7","8","9","0","-"]
+    newString: str = ""
+    for i in number:
+        if i not in NUMBERS:
+            continue
+        else:
+            newString += i
+    return int(newString)
+
+def oldParseCoordinates(value: str) -> Tuple[int, int, int]:
+    if value[0] == "X":
+        splitList = value.split(" ")
+        if len(splitList) == 4:
+            return (oldRemoveCommasFromNumber(splitList[1]), 63, oldRemoveCommasFromNumber(splitList[3]))
+        return (oldRemoveCommasFromNumber(splitList[1]), oldRemoveCommasFromNumber(splitList[3]), oldRemoveCommasFromNumber(splitList[5]))
+    elif value[0] == "/":
+        splitList = value.split(" ")
+        if splitList[2] == "~":
+            splitList[2] = "63"
+        return (int(splitList[1]), int(splitList[2]), int(splitList[3]))
+    return literal_eval(value)
+
+def generateLines(count: int) -> list[str]:
+    """A mix of the formats the old parser supports, so both parsers get the same input."""
+    randomGenerator = random.Random(0)
+    lines: list[str] = []
+    for i in range(count):
+        x, y, z = randomGenerator.randint(-30_000, 30_000), randomGenerator.randint(-64, 320), randomGenerator.randint(-30_000, 30_000)
+        kind = i % 4
+        if kind == 0:
+            lines.append(f"X: {x:,} Z: {z:,}")
+        elif kind == 1:
+            lines.append(f"X: {x:,} Y: {y} Z: {z:,}")
+        elif kind == 2:
+            lines.append(f"/tp {x} ~ {z}")
+        else:
+            lines.append(f"({x}, {y}, {z})")
+    return lines
+
+def timeIt(name: str, function, count: int) -> float:
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter()-start
+    print(f"{name:<40} {elapsed:8.3f}s {count/elapsed/1_000_000:8.2f}M lines/s")
+    return elapsed
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    lines = generateLines(count)
+    blob = "\n".join(lines)
+    print(f"Parsing {count} lines")
+
+    old = timeIt("old parser (per line)", lambda: [oldParseCoordinates(i) for i in lines], count)
+    new = timeIt("parseCoordinateString (per line)", lambda: [parseCoordinateString(i) for i in lines], count)
+    print(" "*41+f"{old/new:8.2f}x faster than the old parser")
+    extract = timeIt("extractCoordinates (one blob)", lambda: extractCoordinates(blob), count)
+    print(" "*41+f"{old/extract:8.2f}x faster than the old parser")
+    assert [parseCoordinateString(i) for i in lines] == [oldParseCoordinates(i) for i in lines] == extractCoordinates(blob)
+
+if __name__ == "__main__":
+    main()
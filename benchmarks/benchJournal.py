@@ -0,0 +1,69 @@
+# Benchmarks what it costs to make changes durable: journaling each change, group committing a batch of them, and rewriting the waypoint file for each one
+# run from the repository root with: python benchmarks/benchJournal.py [count] [existing waypoints]
+# everything runs in a temporary directory, nothing outside of it is read or written
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from syntheticWaypoints import writeSyntheticWaypointFile
+from Journal import Journal, getJournalPath
+from Waypoint import Waypoint
+from XaeroWaypoints import XaeroWaypoints
+
+MAP_NAME: str = "mw$default_1.txt"
+
+def openWaypoints(directory: str, name: str, existingCount: int, journaled: bool) -> XaeroWaypoints:
+    waypointDirectory = os.path.join(directory, name)
+    os.makedirs(os.path.join(waypointDirectory, XaeroWaypoints.OVERWORLD))
+    writeSyntheticWaypointFile(os.path.join(waypointDirectory, XaeroWaypoints.OVERWORLD, MAP_NAME), existingCount)
+    xaeroWaypoints = XaeroWaypoints(waypointDirectory, MAP_NAME, deferWrites=True)
+    xaeroWaypoints.getWaypointSet(XaeroWaypoints.OVERWORLD)
+    if journaled:
+        xaeroWaypoints.journal = Journal(getJournalPath(waypointDirectory))
+    return xaeroWaypoints
+
+def timeIt(name: str, function, count: int) -> None:
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter()-start
+    print(f"{name:<44} {elapsed:8.3f}s {elapsed/count*1000:8.3f}ms per change")
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    existingCount = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    pyPoints = [Waypoint(f"change {i}", "C", i, 64, -i, 10) for i in range(count)]
+    print(f"Making {count} changes to a map with {existingCount} waypoints")
+    with tempfile.TemporaryDirectory() as directory:
+        xaeroWaypoints = openWaypoints(directory, "perChange", existingCount, True)
+        def journalEachChange() -> None:
+            for i in pyPoints:
+                xaeroWaypoints.removeWaypoints(xaeroWaypoints.getWaypointSet(XaeroWaypoints.OVERWORLD).waypoints[:1], XaeroWaypoints.OVERWORLD)
+                xaeroWaypoints.addWaypoints([i], XaeroWaypoints.OVERWORLD)
+                xaeroWaypoints.commitJournal()
+        timeIt("journal, one fsync per change", journalEachChange, count)
+        xaeroWaypoints.close()
+
+        xaeroWaypoints = openWaypoints(directory, "groupCommit", existingCount, True)
+        def groupCommit() -> None:
+            for i in pyPoints:
+                xaeroWaypoints.removeWaypoints(xaeroWaypoints.getWaypointSet(XaeroWaypoints.OVERWORLD).waypoints[:1], XaeroWaypoints.OVERWORLD)
+                xaeroWaypoints.addWaypoints([i], XaeroWaypoints.OVERWORLD)
+            xaeroWaypoints.commitJournal()
+        timeIt("journal, group committed", groupCommit, count)
+        xaeroWaypoints.close()
+
+        xaeroWaypoints = openWaypoints(directory, "rewrite", existingCount, False)
+        def rewriteEachChange() -> None:
+            for i in pyPoints:
+                xaeroWaypoints.removeWaypoints(xaeroWaypoints.getWaypointSet(XaeroWaypoints.OVERWORLD).waypoints[:1], XaeroWaypoints.OVERWORLD)
+                xaeroWaypoints.addWaypoints([i], XaeroWaypoints.OVERWORLD)
+                xaeroWaypoints.flush()
+        timeIt("no journal, file rewritten per change", rewriteEachChange, count)
+        xaeroWaypoints.close()
+
+if __name__ == "__main__":
+    main()
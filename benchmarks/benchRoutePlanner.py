@@ -0,0 +1,34 @@
+# Benchmarks planning a route through randomly placed waypoints, with and without nether travel
+# run from the repository root with: python benchmarks/benchRoutePlanner.py [count]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from RoutePlanner import RoutePlanner
+from Waypoint import Waypoint
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    randomGenerator = random.Random(0)
+    pyPoints = [Waypoint(f"structure {i}", "S", randomGenerator.randint(-20_000, 20_000), 64, randomGenerator.randint(-20_000, 20_000), 10) for i in range(count)]
+    print(f"Routing {count} waypoints")
+    for useNether in (False, True):
+        planner = RoutePlanner(pyPoints, useNether=useNether)
+        name = "with nether travel" if useNether else "overworld only"
+        start = time.perf_counter()
+        path = planner.buildNearestNeighbourPath()
+        nearestNeighbourTime = time.perf_counter()-start
+        nearestNeighbourCost = sum(planner.getCost(path[i-1], path[i]) for i in range(1, len(path)))
+        start = time.perf_counter()
+        planner.improveWithTwoOpt(path)
+        twoOptTime = time.perf_counter()-start
+        twoOptCost = sum(planner.getCost(path[i-1], path[i]) for i in range(1, len(path)))
+        assert sorted(path) == list(range(count+1))
+        print(f"{name:<20} nearest neighbour {nearestNeighbourTime:6.2f}s {nearestNeighbourCost:12.0f} blocks, 2-opt {twoOptTime:6.2f}s {twoOptCost:12.0f} blocks ({1-twoOptCost/nearestNeighbourCost:.1%} shorter)")
+
+if __name__ == "__main__":
+    main()
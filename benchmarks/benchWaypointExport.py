@@ -0,0 +1,50 @@
+# Benchmarks exporting a large map to every export format, compared to just reading and writing the same number of bytes
+# run from the repository root with: python benchmarks/benchWaypointExport.py [count]
+# everything runs in a temporary directory, nothing outside of it is read or written
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from syntheticWaypoints import writeSyntheticWaypointFile
+from WaypointExport import EXPORT_FORMATS, ExportFilter, exportWaypoints
+from XaeroWaypoints import XaeroWaypoints
+
+MAP_NAME: str = "mw$default_1.txt"
+
+def timeIt(name: str, function, count: int) -> float:
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter()-start
+    print(f"{name:<40} {elapsed:8.3f}s {count/elapsed/1_000_000:8.2f}M waypoints/s")
+    return elapsed
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        waypointDirectory = os.path.join(directory, "Multiplayer_127.0.0.1")
+        os.makedirs(os.path.join(waypointDirectory, XaeroWaypoints.OVERWORLD))
+        waypointFile = os.path.join(waypointDirectory, XaeroWaypoints.OVERWORLD, MAP_NAME)
+        writeSyntheticWaypointFile(waypointFile, count)
+        print(f"Exporting {count} waypoints ({os.path.getsize(waypointFile)/1_000_000:.1f} MB)")
+
+        timeIt("copying the file (disk speed)", lambda: shutil.copyfile(waypointFile, os.path.join(directory, "copy.txt")), count)
+        xaeroWaypoints = XaeroWaypoints(waypointDirectory, MAP_NAME)
+        try:
+            for i in EXPORT_FORMATS:
+                exportPath = os.path.join(directory, f"export.{i}")
+                timeIt(f"{i} (streamed from the file)", lambda: exportWaypoints(xaeroWaypoints, exportPath, i, [XaeroWaypoints.OVERWORLD]), count)
+            timeIt("csv (bbox, normalized to the nether)", lambda: exportWaypoints(xaeroWaypoints, exportPath, "csv", [XaeroWaypoints.OVERWORLD], "nether", ExportFilter(boundingBox=(-1000, -1000, 1000, 1000))), count)
+            xaeroWaypoints.getWaypointSet(XaeroWaypoints.OVERWORLD)
+            for i in EXPORT_FORMATS:
+                exportPath = os.path.join(directory, f"export.{i}")
+                timeIt(f"{i} (already loaded)", lambda: exportWaypoints(xaeroWaypoints, exportPath, i, [XaeroWaypoints.OVERWORLD]), count)
+        finally:
+            xaeroWaypoints.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Benchmarks diffing and syncing two large maps that have drifted apart
+# run from the repository root with: python benchmarks/benchWaypointSync.py [count]
+# everything runs in a temporary directory, nothing outside of it is read or written
+
+import copy
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from syntheticWaypoints import generateWaypointLines
+from Waypoint import Waypoint
+from WaypointSync import applyWaypointDiff, diffWaypoints
+from XaeroWaypoints import WAYPOINT_FORMAT_MESSAGE, XaeroWaypoints
+
+MAP_NAME: str = "mw$default_1.txt"
+
+def timeIt(name: str, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"{name:<40} {time.perf_counter()-start:8.3f}s")
+    return result
+
+def writeMap(waypointDirectory: str, mapName: str, pyPoints: list[Waypoint]) -> None:
+    os.makedirs(os.path.join(waypointDirectory, XaeroWaypoints.OVERWORLD), exist_ok=True)
+    with open(os.path.join(waypointDirectory, XaeroWaypoints.OVERWORLD, mapName), "w", encoding="utf-8") as waypointFile:
+        waypointFile.write(WAYPOINT_FORMAT_MESSAGE)
+        waypointFile.writelines(i.toXaero()+"\n" for i in pyPoints)
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    randomGenerator = random.Random(0)
+    sourcePyPoints = [Waypoint.fromXaero(i) for i in generateWaypointLines(count)]
+    # the target is the same map after drifting: 1% of it is missing, 1% has a different color and there's 1% it has that the source doesn't
+    targetPyPoints = [copy.copy(i) for i in sourcePyPoints if randomGenerator.random() > 0.01]
+    for i in randomGenerator.sample(targetPyPoints, count//100):
+        i.color = (i.color+1) % 16
+    targetPyPoints += [Waypoint.fromXaero(i.replace("waypoint:", "waypoint:extra", 1)) for i in generateWaypointLines(count//100, seed=1)]
+    print(f"Syncing {count} waypoints into a map with {len(targetPyPoints)}")
+
+    diff = timeIt("diffWaypoints", lambda: diffWaypoints(sourcePyPoints, targetPyPoints, XaeroWaypoints.OVERWORLD))
+    print(f"{len(diff.added)} added, {len(diff.changed)} changed, {len(diff.removed)} removed")
+
+    with tempfile.TemporaryDirectory() as waypointDirectory:
+        writeMap(waypointDirectory, MAP_NAME, targetPyPoints)
+        targetWaypoints = XaeroWaypoints(waypointDirectory, MAP_NAME)
+        try:
+            timeIt("loading the target", lambda: targetWaypoints.getWaypointSet(XaeroWaypoints.OVERWORLD))
+            diff = timeIt("diffWaypoints (loaded target)", lambda: diffWaypoints(sourcePyPoints, targetWaypoints.getWaypointSet(XaeroWaypoints.OVERWORLD).waypoints, XaeroWaypoints.OVERWORLD))
+            timeIt("applyWaypointDiff (rewrite)", lambda: applyWaypointDiff(targetWaypoints, diff))
+            diff = diffWaypoints(sourcePyPoints, targetWaypoints.getWaypointSet(XaeroWaypoints.OVERWORLD).waypoints, XaeroWaypoints.OVERWORLD)
+            assert diff.empty
+        finally:
+            targetWaypoints.close()
+
+if __name__ == "__main__":
+    main()
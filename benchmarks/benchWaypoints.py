@@ -0,0 +1,145 @@
+# Benchmarks parsing, serializing and writing waypoint files and handling console input at several file sizes
+# run from the repository root with: python benchmarks/benchWaypoints.py [--sizes 1000,10000,100000,1000000] [--json results.json] [--compare previous.json]
+# everything runs in a temporary directory, nothing outside of it is read or written
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from syntheticWaypoints import generateWaypointLines, writeSyntheticWaypointFile
+from Console import Console
+from Waypoint import Waypoint
+from XaeroWaypoints import XaeroWaypoints
+from main import COMMANDS
+
+MAP_NAME: str = "mw$default_1.txt"
+
+def measure(function: Callable[[], object], repeat: int) -> tuple[float, int]:
+    """Returns the best wall time out of `repeat` runs, and the peak memory allocated during one extra run (tracemalloc slows things down, so it isn't used for the timing)."""
+    bestTime = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        bestTime = min(bestTime, time.perf_counter()-start)
+    tracemalloc.start()
+    try:
+        function()
+        peakMemory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return bestTime, peakMemory
+
+def makeWaypointDirectory(root: str, size: int) -> str:
+    waypointDirectory = os.path.join(root, f"Multiplayer_{size}")
+    writeSyntheticWaypointFile(os.path.join(waypointDirectory, XaeroWaypoints.OVERWORLD, MAP_NAME), size)
+    return waypointDirectory
+
+def runBenchmarks(root: str, size: int, repeat: int) -> list[dict]:
+    waypointDirectory = makeWaypointDirectory(root, size)
+    overworldFile = os.path.join(waypointDirectory, XaeroWaypoints.OVERWORLD, MAP_NAME)
+    xaeroWaypoints = XaeroWaypoints(waypointDirectory, MAP_NAME)
+    lines = generateWaypointLines(size)
+    waypoints = [Waypoint.fromXaero(i) for i in lines]
+    # the console is benchmarked with a fixed number of commands since it doesn't depend on the file size
+    consoleInputs = [f"add --name test{i} --color 3 --dimension nether X: {i*7:,} Z: {-i*3:,}" for i in range(min(size, 10_000))]
+    console = Console()
+    for i in COMMANDS:
+        console.registerCommand(i, COMMANDS[i])
+
+    def handleInputs() -> None:
+        for i in consoleInputs:
+            console.handleInput(i)
+
+    addedCount = [0] # every added waypoint gets new coordinates, otherwise the dedupe benchmark would only be adding waypoints on its first run
+
+    def addWaypoints(dedupeRadius: float | None) -> None:
+        # 100 single adds to a file that already has `size` waypoints in it
+        for _ in range(100):
+            addedCount[0] += 1
+            xaeroWaypoints.addWaypoint(Waypoint(f"added {addedCount[0]}", "A", 40_000+addedCount[0]*10, 64, 40_000, 10), XaeroWaypoints.OVERWORLD, dedupeRadius)
+
+    benchmarks: list[tuple[str, Callable[[], object], int]] = [
+        ("parseXaeroWaypointFile", lambda: xaeroWaypoints.parseXaeroWaypointFile(overworldFile), size),
+        ("convertXaeroToPyPoint", lambda: [xaeroWaypoints.convertXaeroToPyPoint(i) for i in lines], size),
+        ("convertPyPointToXaero", lambda: [xaeroWaypoints.convertPyPointToXaero(i) for i in waypoints], size),
+        ("writeXaeroWaypointFile", lambda: xaeroWaypoints.writeXaeroWaypointFile(waypoints, XaeroWaypoints.THE_END), size),
+        ("addWaypoint (append)", lambda: addWaypoints(None), 100),
+        ("addWaypoint (dedupe)", lambda: addWaypoints(1), 100),
+        ("Console.handleInput", handleInputs, len(consoleInputs))
+    ]
+    xaeroWaypoints.getWaypointSet(XaeroWaypoints.OVERWORLD) # loaded up front so the add benchmarks don't include parsing the file
+
+    results: list[dict] = []
+    for name, function, itemCount in benchmarks:
+        seconds, peakMemory = measure(function, repeat)
+        results.append({
+            "benchmark": name,
+            "size": size,
+            "items": itemCount,
+            "seconds": seconds,
+            "itemsPerSecond": itemCount/seconds if seconds > 0 else None,
+            "peakMemoryBytes": peakMemory
+        })
+    return results
+
+def getGitCommit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def printResults(results: list[dict], previousResults: list[dict] | None) -> None:
+    previousTimes: dict[tuple[str, int], float] = {}
+    if previousResults is not None:
+        previousTimes = {(i["benchmark"], i["size"]): i["seconds"] for i in previousResults}
+    header = "{:<26} {:>9} {:>10} {:>14} {:>9}".format("benchmark", "size", "seconds", "items/s", "peak MB")
+    if previousResults is not None:
+        header += " {:>12}".format("vs previous")
+    print(header)
+    for i in results:
+        line = "{:<26} {:>9} {:>10.4f} {:>14,.0f} {:>9.1f}".format(i["benchmark"], i["size"], i["seconds"], i["itemsPerSecond"] or 0, i["peakMemoryBytes"]/1_000_000)
+        previousTime = previousTimes.get((i["benchmark"], i["size"]))
+        if previousTime is not None:
+            line += " {:>11.2f}x".format(previousTime/i["seconds"])
+        print(line)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks waypoint file handling with synthetic waypoint files.")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma separated waypoint counts to benchmark (default: 1000,10000,100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="how many times to run each benchmark, the best time is kept (default: 3)")
+    parser.add_argument("--json", help="write the results to this file as JSON")
+    parser.add_argument("--compare", help="a JSON file from a previous run to compare against")
+    args = parser.parse_args()
+
+    previousResults: list[dict] | None = None
+    if args.compare is not None:
+        with open(args.compare, "r") as previousFile:
+            previousResults = json.load(previousFile)["results"]
+
+    results: list[dict] = []
+    with tempfile.TemporaryDirectory() as root:
+        for size in [int(i) for i in args.sizes.split(",")]:
+            results.extend(runBenchmarks(root, size, args.repeat))
+    printResults(results, previousResults)
+
+    if args.json is not None:
+        with open(args.json, "w") as jsonFile:
+            json.dump({
+                "commit": getGitCommit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": time.time(),
+                "results": results
+            }, jsonFile, indent=4)
+
+if __name__ == "__main__":
+    main()
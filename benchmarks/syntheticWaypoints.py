@@ -0,0 +1,37 @@
+# Generates realistic looking Xaero waypoint files for the benchmarks
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from XaeroWaypoints import WAYPOINT_FORMAT_MESSAGE
+
+# the kinds of things people actually make waypoints for, so names and initials have realistic lengths
+WAYPOINT_NAMES: list[str] = ["Stronghold", "Ancient City", "Trial Chambers", "Village", "Desert Temple", "Jungle Temple", "Witch Hut", "Ocean Monument", "Woodland Mansion", "Shipwreck", "Ruined Portal", "Bastion", "Nether Fortress", "Home", "Spawner", "Mine"]
+
+def generateWaypointLine(randomGenerator: random.Random, index: int) -> str:
+    """Returns one 14 field `waypoint:` line (without the newline)."""
+    name = randomGenerator.choice(WAYPOINT_NAMES)
+    x = randomGenerator.randint(-30_000, 30_000)
+    y = randomGenerator.randint(-64, 320)
+    z = randomGenerator.randint(-30_000, 30_000)
+    color = randomGenerator.randint(0, 15)
+    disabled = "true" if randomGenerator.random() < 0.05 else "false"
+    visibilityType = randomGenerator.choice((0, 0, 0, 1, 2))
+    return f"waypoint:{name} {index}:{name[0]}:{x}:{y}:{z}:{color}:{disabled}:0:gui.xaero_default:false:0:{visibilityType}:false"
+
+def generateWaypointLines(count: int, seed: int = 0) -> list[str]:
+    randomGenerator = random.Random(seed)
+    return [generateWaypointLine(randomGenerator, i) for i in range(count)]
+
+def writeSyntheticWaypointFile(path: str, count: int, seed: int = 0) -> None:
+    """Writes a waypoint file the same way Xaero does: the format comment header and then one waypoint per line."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    randomGenerator = random.Random(seed)
+    with open(path, "w") as waypointFile:
+        waypointFile.write(WAYPOINT_FORMAT_MESSAGE)
+        # written in chunks so generating a million lines doesn't need them all in memory at once
+        for chunkStart in range(0, count, 10_000):
+            waypointFile.write("".join([generateWaypointLine(randomGenerator, i)+"\n" for i in range(chunkStart, min(count, chunkStart+10_000))]))
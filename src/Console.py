@@ -1,29 +1,152 @@
-from ast import literal_eval
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 import logging
+import os
 from multiprocessing import Value
 from typing import Tuple
 
+import config
+import Instrumentation
 from CoordinateConverter import CoordinateConverter
+from CoordinateParser import CoordinateParseError, parseCoordinateString
+from Journal import isJournalFor, openJournal, redo, shareJournal, undo
+from FanOut import FanOutTarget, addToTargets, loadFanOutTargets
+from RoutePlanner import DEFAULT_PORTAL_COST, RoutePlanner, numberRoute
+from WaypointExport import EXPORT_FORMATS, ExportFilter, exportWaypoints, getExportFormat
+from WaypointSync import WaypointDiff, applyWaypointDiff, diffWaypoints
+from WorldDiscovery import MULTIPLAYER_PREFIX
 from XaeroWaypoints import XaeroWaypoints
 from XaeroWaypoints import XaeroWaypointColors
-from helper import removeCommasFromNumber
-
-def parseCoordinatesFromStringCoordinates(stringCoordinates: str) -> Tuple[int, int, int]: # ex: X: -6,652 Z: -5,420
-    splitList = stringCoordinates.split(" ") # will split into ["X:","<x-coordinate>","Z:","<y-coordinate>"] OR ["X:","<x-coordinate>","Y:","<y-coordinate>","Z:","<y-coordinate>"]
-    if len(splitList) == 4: # is an X Z pair (no Y coord)
-        return (removeCommasFromNumber(splitList[1]), 63, removeCommasFromNumber(splitList[3]))
-    elif len(splitList) == 6: # is an X Y Z pair (yes Y coord)
-        return (removeCommasFromNumber(splitList[1]), removeCommasFromNumber(splitList[3]), removeCommasFromNumber(splitList[5]))
-    else:
-        logging.critical("The provided value for the \"add\" command was recognized as string coordinates, but appears to be malformed. Double-check the provided coordinates to make sure they are correct. This is a fatal error, and program execution will now end.")
-        exit()
-
-def parseCoordinatesFromTeleportCommand(teleportCommand: str) -> Tuple[int, int, int]: # ex: /tp 7540 ~ -11516
-    splitList = teleportCommand.split(" ")
-    if splitList[2] == "~": # so no Z value is provided
-        splitList[2] = "63"
-    return (int(splitList[1]), int(splitList[2]), int(splitList[3]))
+from Waypoint import Waypoint
+from helper import isValidIPv4Address, isValidWaypointText
+
+def parseCoordinates(value: str) -> Tuple[int, int, int] | None:
+    """Parses `value` into an (X, Y, Z) tuple, in any format `CoordinateParser` knows (ex. "X: -6,652 Z: -5,420", "/tp 7540 ~ -11516" or "(432, 77, -98)").\n
+    Returns None (and logs why) if the value couldn't be parsed."""
+    if value == "":
+        logging.error("No coordinates were provided.")
+        return None
+    try:
+        return parseCoordinateString(value)
+    except CoordinateParseError as e:
+        logging.error(str(e)+" Double-check the provided coordinates to make sure they are correct.")
+        return None
+
+def parseDimension(value: str | None) -> str | None:
+    """Turns the value of a --dimension flag into the dimension's folder name. Returns None if it isn't a valid dimension."""
+    if value == "overworld":
+        return XaeroWaypoints.OVERWORLD
+    elif value == "nether":
+        return XaeroWaypoints.NETHER
+    elif value == "the_end":
+        return XaeroWaypoints.THE_END
+    logging.error("Invalid --dimension flag value: "+str(value))
+    return None
+
+def parsePositiveNumberFlag(flag: "UserFlag") -> float | None:
+    try:
+        value = float(str(flag.value))
+    except ValueError:
+        value = -1
+    if value < 0:
+        logging.error(f"Invalid {flag.flag} flag value: {flag.value}. It should be a positive number.")
+        return None
+    return value
+
+def printWaypointDiff(diff: WaypointDiff, limit: int) -> None:
+    """Prints what "sync" would do to one dimension, listing up to `limit` waypoints of each kind."""
+    print(f"{diff.dimension}: {len(diff.added)} to add, {len(diff.changed)} changed, {len(diff.removed)} only in the other map")
+    for prefix, pyPoints in (("+", diff.added), ("~", [i[1] for i in diff.changed]), ("-", diff.removed)):
+        for i in pyPoints[:limit]:
+            print(f"  {prefix} \"{i.name}\" at {i.coordinateString()}")
+        if len(pyPoints) > limit:
+            print(f"  {prefix} ...and {len(pyPoints)-limit} more")
+
+def parseIntegerList(flag: "UserFlag", length: int) -> list[int] | None:
+    """Parses a flag value like "-100,200" (no spaces, since they split the command up). Returns None if it isn't `length` integers."""
+    try:
+        values = [int(i) for i in str(flag.value).split(",")]
+    except ValueError:
+        values = []
+    if len(values) != length:
+        logging.error(f"Invalid {flag.flag} flag value: {flag.value}. It should be {length} integers separated by commas, with no spaces.")
+        return None
+    return values
+
+@dataclass
+class WaypointOptions:
+    """The settings shared by every waypoint created from a single "add" or "import" command (everything except the coordinates)."""
+    name: str = "new waypoint"
+    initials: str | None = None
+    color: int = XaeroWaypointColors.GREEN.value #! this is returning the name of the enum member by default and i have no idea why, for some reason i have to specify to use .value or it will return "XaeroWaypointColors.GREEN"
+    dimension: str = XaeroWaypoints.OVERWORLD
+    conversion: str | None = None # "nether" if the coordinates should be converted from overworld to nether, "overworld" for the opposite
+    dedupeRadius: float | None = None # skip waypoints that are within this many blocks of an existing one
+    fanOut: bool = False # also add the waypoints to every target in the config's fanOutTargets
+
+def parseWaypointOptions(flags: list["UserFlag"]) -> WaypointOptions | None:
+    """Reads the flags shared by the "add" and "import" commands. Returns None if one of them has an invalid value."""
+    # these are default values that are changed if certain values are present in the flags below
+    options = WaypointOptions()
+    for i in flags:
+        if i.flag == "--innether":
+            options.conversion = "nether"
+            options.dimension = XaeroWaypoints.NETHER
+        if i.flag == "--inoverworld":
+            options.conversion = "overworld"
+            options.dimension = XaeroWaypoints.OVERWORLD
+
+        if i.flag == "--dimension":
+            dimension = parseDimension(i.value)
+            if dimension is None:
+                return None
+            options.dimension = dimension
+        if i.flag == "--name":
+            if not isValidWaypointText(str(i.value)):
+                logging.error(f"Invalid --name flag value: {i.value!r}. It can't be empty or contain \":\", newlines or other control characters.")
+                return None
+            options.name = str(i.value)
+        if i.flag == "--initial":
+            # todo: add a limit on the number of chars this can be, idk what xaero uses but i know that there is one
+            if not isValidWaypointText(str(i.value)):
+                logging.error(f"Invalid --initial flag value: {i.value!r}. It can't be empty or contain \":\", newlines or other control characters.")
+                return None
+            options.initials = i.value
+        if i.flag == "--color":
+            try:
+                options.color = int(str(i.value))
+            except ValueError:
+                options.color = -1
+            if options.color not in range(16):
+                logging.error(f"Invalid --color flag value: {i.value}. It should be an integer from 0-15.")
+                return None
+        if i.flag == "--fanout":
+            options.fanOut = True
+        if i.flag == "--dedupe":
+            options.dedupeRadius = parsePositiveNumberFlag(i)
+            if options.dedupeRadius is None:
+                return None
+
+    if options.initials is None: # it's value wasn't defined in a flag
+        options.initials = options.name[0].upper()
+    return options
+
+def createPyPoints(coordinateList: list[Tuple[int, int, int]], options: WaypointOptions) -> list[Waypoint]:
+    """Makes a waypoint for every set of coordinates in `coordinateList`, converting them all between the overworld and nether at once first if the options say to."""
+    if options.conversion == "nether":
+        coordinateList = CoordinateConverter.overworldToNetherBatch(coordinateList)
+    elif options.conversion == "overworld":
+        coordinateList = CoordinateConverter.netherToOverworldBatch(coordinateList)
+    # xaero doesn't like decimals so round them out here
+    return [Waypoint(
+        name=options.name,
+        initials=options.initials,
+        x=int(waypointCoordinates[0]),
+        y=int(waypointCoordinates[1]),
+        z=int(waypointCoordinates[2]),
+        color=options.color,
+        visibilityType=0 # TODO: add boolean flag for local/global
+    ) for waypointCoordinates in coordinateList]
 
 @dataclass
 class Command:
@@ -49,6 +172,7 @@ class UserCommand:
 class Console:
     def __init__(self) -> None:
         self.commandRegistry: dict[str, Command] = {}
+        self.running: bool = True # set to False by the "exit" command
 
         self.currentInput: UserCommand
 
@@ -61,7 +185,7 @@ class Console:
         # the flag itself, the indice of the flag in the components, the value of the flag, and the indice of the value of the flag in the components
         userFlags: list[UserFlag] = []
         for i, v in enumerate(userInputComponents):
-            if v[0] == "-" and v[1] == "-": # so the start of the component is "--" (aka a flag)
+            if v.startswith("--"): # so the start of the component is "--" (aka a flag)
                 flagValue = None
                 flagValueIndex = None
                 try: # this is in a try/catch block because if a flag doesn't exist, this will error out because it can't find it in CFLAGS, but the check for if it exists is in checkCommandValidity, once userCommand["flags"] is already defined. Instead of re-writing most of the stuff here to work even it it doesn't exist, putting it in a try/catch and just ignoring the error is best, since an error with an actual error message will show up after this line, anyway
@@ -82,7 +206,7 @@ class Console:
         
         # create the command dict
         userCommand: UserCommand = UserCommand(userInputComponents[0], userFlags, " ".join(userValue))
-        print(userCommand)
+        logging.debug(userCommand)
         
         # check for validity
         if self.checkCommandValidity(userCommand):
@@ -114,77 +238,47 @@ class Console:
         """Handles where commands go to run.\n
         Returns a boolean based on whether or not the operation was successful, True is it was and False if it wasn't\n
         xaeroWaypoints param is temporary until I can figure out a better way to go about it."""
+        xaeroWaypoints.syncExternalChanges() # pick up anything changed in-game since the last command
         if userCommand.corecommand == "add":
-            if userCommand.value[0] == "X":
-                waypointCoordinates: Tuple[int, int, int] = parseCoordinatesFromStringCoordinates(userCommand.value)
-            elif userCommand.value[0] == "/":
-                waypointCoordinates: Tuple[int, int, int] = parseCoordinatesFromTeleportCommand(userCommand.value)
-            elif userCommand.value[0] == "(" and userCommand.value[-1] == ")": # a tuple (if the user made it correctly)
-                try:
-                    waypointCoordinates: Tuple[int, int, int] = literal_eval(userCommand.value)
-                except (ValueError, SyntaxError) as e:
-                    logging.error("An error occured when evaluating the tuple coordinates:", e)
-
-                if len(waypointCoordinates) != 3:
-                    logging.error("Waypoint coordinates passed as a tuple must contain X, Y, and Z values (length of 3).")
-                    return False
-            else:
-                logging.error(f"Failed to parse string \"{userCommand.value}\"")
+            waypointCoordinates = parseCoordinates(userCommand.value)
+            if waypointCoordinates is None:
                 return False
-            
-            # these are default values that are changed if certain values are present in the flags below
-            waypointName: str = "new waypoint"
-            waypointInitials: str | None = None
-            waypointColor: str = str(XaeroWaypointColors.GREEN.value) #! this is returning the name of the enum member by default and i have no idea why, for some reason i have to specify to use .value or it will return "XaeroWaypointColors.GREEN"
-            waypointDimension: str = XaeroWaypoints.OVERWORLD
-            
-            for i in userCommand.flags:
-                if i.flag == "--innether":
-                    waypointCoordinates = CoordinateConverter.overworldToNether(waypointCoordinates)
-                    waypointDimension = XaeroWaypoints.NETHER
-                    logging.info(f"Coordinates converted from Overworld to Nether coordinates.")
-                if i.flag == "--inoverworld":
-                    waypointCoordinates = CoordinateConverter.netherToOverworld(waypointCoordinates)
-                    waypointDimension = XaeroWaypoints.OVERWORLD
-                    logging.info(f"Coordinates converted from Nether to Overworld coordinates.")
-
-                if i.flag == "--dimension":
-                    if i.value == "overworld":
-                        waypointDimension = XaeroWaypoints.OVERWORLD
-                    elif i.value == "nether":
-                        waypointDimension = XaeroWaypoints.NETHER
-                    elif i.value == "the_end":
-                        waypointDimension = XaeroWaypoints.THE_END
-                    else:
-                        logging.error("Invalid --dimension flag value: "+str(i.value))
-                        return False
-                if i.flag == "--name":
-                    waypointName = str(i.value)
-                if i.flag == "--initial":
-                    # todo: add a limit on the number of chars this can be, idk what xaero uses but i know that there is one
-                    waypointInitials = i.value
-                if i.flag == "--color":
-                    waypointColor = str(i.value)
-
-            if waypointInitials is None: # it's value wasn't defined in a flag
-                waypointInitials = waypointName[0].upper()
-                
-            xaeroWaypoints.addWaypoint({
-                "name": waypointName,
-                "initials": waypointInitials,
-                "x": waypointCoordinates[0],
-                "y": waypointCoordinates[1], # make this work
-                "z": waypointCoordinates[2],
-                "color": waypointColor,
-                "disabled": "false",
-                "type": 0,
-                "set": "gui.xaero_default",
-                "rotate_on_tp": "false",
-                "tp_yaw": 0,
-                "visibility_type": "0", # TODO: add boolean flag for local/global
-                "destination": "false"
-            }, waypointDimension)
-            logging.info(f"Created waypoint \"{waypointName}\" at {str(waypointCoordinates)}!") # todo: make this output ACTUAL coords (this doesn't account for rounding)
+            options = parseWaypointOptions(userCommand.flags)
+            if options is None:
+                return False
+            if options.conversion == "nether":
+                logging.info(f"Coordinates converted from Overworld to Nether coordinates.")
+            elif options.conversion == "overworld":
+                logging.info(f"Coordinates converted from Nether to Overworld coordinates.")
+
+            newPyPoint = createPyPoints([waypointCoordinates], options)[0]
+            if options.fanOut:
+                return self.fanOutWaypoints([newPyPoint], options, xaeroWaypoints)
+            if not xaeroWaypoints.addWaypoint(newPyPoint, options.dimension, options.dedupeRadius):
+                logging.warning(f"There is already a waypoint within {options.dedupeRadius} blocks of {newPyPoint.coordinateString()}, so it wasn't added.")
+                return True
+            logging.info(f"Created waypoint \"{options.name}\" at {newPyPoint.coordinateString()}!")
+        elif userCommand.corecommand == "import":
+            return self.runImportCommand(userCommand, xaeroWaypoints)
+        elif userCommand.corecommand == "targets":
+            return self.runTargetsCommand(userCommand)
+        elif userCommand.corecommand == "near":
+            return self.runNearCommand(userCommand, xaeroWaypoints)
+        elif userCommand.corecommand == "map":
+            return self.runMapCommand(userCommand, xaeroWaypoints)
+        elif userCommand.corecommand == "diff" or userCommand.corecommand == "sync":
+            return self.runSyncCommand(userCommand, xaeroWaypoints)
+        elif userCommand.corecommand == "export":
+            return self.runExportCommand(userCommand, xaeroWaypoints)
+        elif userCommand.corecommand == "route":
+            return self.runRouteCommand(userCommand, xaeroWaypoints)
+        elif userCommand.corecommand == "undo" or userCommand.corecommand == "redo":
+            return self.runUndoCommand(userCommand, xaeroWaypoints)
+        elif userCommand.corecommand == "stats":
+            return self.runStatsCommand(userCommand)
+        elif userCommand.corecommand == "compact":
+            xaeroWaypoints.compactXaeroWaypointFiles()
+            logging.info("Rewrote every waypoint file.")
         elif userCommand.corecommand == "help":
             if userCommand.value != "": # a value is provided
                 # check if the input is a valid command
@@ -202,6 +296,388 @@ class Console:
                     print("- "+i)
                 print("Type \"help <command>\" for additional information about the command.")
         elif userCommand.corecommand == "exit":
-            exit()
+            xaeroWaypoints.flush()
+            self.running = False
+        return True
+
+    def runImportCommand(self, userCommand: UserCommand, xaeroWaypoints: XaeroWaypoints) -> bool:
+        """Streams a file of coordinates (one per line, in any format the "add" command accepts) into waypoints.\n
+        Every waypoint is built in memory first and each dimension file is only written once at the end, instead of once per waypoint."""
+        options = parseWaypointOptions(userCommand.flags)
+        if options is None:
+            return False
+
+        coordinateList: list[Tuple[int, int, int]] = []
+        skippedLines: int = 0
+        try:
+            with open(userCommand.value, "r", encoding="utf-8") as importFile:
+                for lineNumber, line in enumerate(importFile, start=1):
+                    line = line.strip()
+                    if line == "" or line[0] == "#": # blank lines and comments are allowed in import files
+                        continue
+                    waypointCoordinates = parseCoordinates(line)
+                    if waypointCoordinates is None:
+                        logging.warning(f"Skipping line {lineNumber} of \"{userCommand.value}\".")
+                        skippedLines += 1
+                        continue
+                    coordinateList.append(waypointCoordinates)
+        except OSError as e:
+            logging.error(f"Unable to read import file \"{userCommand.value}\": {e}")
+            return False
+        newPyPoints = createPyPoints(coordinateList, options)
+
+        if options.fanOut:
+            if skippedLines > 0:
+                logging.warning(f"{skippedLines} lines of \"{userCommand.value}\" were skipped.")
+            return self.fanOutWaypoints(newPyPoints, options, xaeroWaypoints)
+
+        #* every waypoint from one import shares the same flags, so they all go to the same dimension and there's only one file write
+        addedPyPoints = xaeroWaypoints.addWaypoints(newPyPoints, options.dimension, options.dedupeRadius)
+
+        logging.info(f"Imported {len(addedPyPoints)} waypoints from \"{userCommand.value}\"."
+                     + (f" {len(newPyPoints)-len(addedPyPoints)} were already within {options.dedupeRadius} blocks of another waypoint." if len(addedPyPoints) != len(newPyPoints) else "")
+                     + (f" {skippedLines} lines were skipped." if skippedLines > 0 else ""))
+        return True
+
+    def runNearCommand(self, userCommand: UserCommand, xaeroWaypoints: XaeroWaypoints) -> bool:
+        """Lists the waypoints closest to the given coordinates."""
+        coordinates = parseCoordinates(userCommand.value)
+        if coordinates is None:
+            return False
+        dimension: str = XaeroWaypoints.OVERWORLD
+        radius: float | None = None
+        limit: int = 10
+        for i in userCommand.flags:
+            if i.flag == "--dimension":
+                dimension = parseDimension(i.value)
+                if dimension is None:
+                    return False
+            if i.flag == "--radius":
+                radius = parsePositiveNumberFlag(i)
+                if radius is None:
+                    return False
+            if i.flag == "--limit":
+                limitValue = parsePositiveNumberFlag(i)
+                if limitValue is None:
+                    return False
+                if limitValue < 1:
+                    logging.error(f"Invalid --limit flag value: {i.value}. It should be at least 1.")
+                    return False
+                limit = int(limitValue)
+
+        nearbyWaypoints = xaeroWaypoints.findWaypointsNear(int(coordinates[0]), int(coordinates[2]), dimension, radius, limit)
+        if len(nearbyWaypoints) == 0:
+            print("No waypoints found.")
+            return True
+        for distance, waypoint in nearbyWaypoints:
+            print(f"{round(distance)} blocks: \"{waypoint.name}\" at {waypoint.coordinateString()}")
+        return True
+
+    def runMapCommand(self, userCommand: UserCommand, xaeroWaypoints: XaeroWaypoints) -> bool:
+        """Lists the maps in the current world, or switches to one of them."""
+        maps = xaeroWaypoints.listMaps()
+        if userCommand.value == "":
+            cachedMaps = {i[0] for i in xaeroWaypoints.mapCache}
+            for i, v in enumerate(maps):
+                if v == xaeroWaypoints.currentMap:
+                    print(f"({i}) {v} (current)")
+                elif v in cachedMaps:
+                    print(f"({i}) {v} (loaded)")
+                else:
+                    print(f"({i}) {v}")
+            return True
+
+        mapName = userCommand.value
+        if mapName not in maps:
+            try:
+                mapName = maps[int(mapName)]
+            except (ValueError, IndexError):
+                if not mapName.endswith(".txt"):
+                    logging.error(f"There is no map \"{mapName}\". Type \"map\" to list them.")
+                    return False
+                logging.info(f"\"{mapName}\" doesn't exist yet, it will be created when a waypoint is added to it.")
+        xaeroWaypoints.switchMap(mapName)
+        logging.info(f"Switched to {mapName}.")
+        return True
+
+    def runSyncCommand(self, userCommand: UserCommand, xaeroWaypoints: XaeroWaypoints) -> bool:
+        """Compares the current map to another map or server ("diff"), or makes the other one match the current map ("sync")."""
+        targetDirectory: str = xaeroWaypoints.waypointDirectory
+        targetMap: str = xaeroWaypoints.currentMap
+        dimensions: list[str] = [XaeroWaypoints.OVERWORLD, XaeroWaypoints.NETHER, XaeroWaypoints.THE_END]
+        removeExtra: bool = True
+        limit: int = 10
+        for i in userCommand.flags:
+            if i.flag == "--map":
+                targetMap = i.value
+            if i.flag == "--world":
+                waypointsDirectory = os.path.join(config.getConfig().gameDirectory, "XaeroWaypoints")
+                targetDirectory = os.path.join(waypointsDirectory, i.value)
+                if not os.path.isdir(targetDirectory): # it's a server's IP address
+                    targetDirectory = os.path.join(waypointsDirectory, MULTIPLAYER_PREFIX+i.value)
+                if not os.path.isdir(targetDirectory):
+                    logging.error(f"There is no world or server \"{i.value}\" in \"{waypointsDirectory}\".")
+                    return False
+            if i.flag == "--dimension":
+                dimension = parseDimension(i.value)
+                if dimension is None:
+                    return False
+                dimensions = [dimension]
+            if i.flag == "--keep":
+                removeExtra = False
+            if i.flag == "--limit":
+                limitValue = parsePositiveNumberFlag(i)
+                if limitValue is None:
+                    return False
+                limit = int(limitValue)
+        if (os.path.abspath(targetDirectory), targetMap) == (os.path.abspath(xaeroWaypoints.waypointDirectory), xaeroWaypoints.currentMap):
+            logging.error("Pick a different map (--map) or world (--world) to compare the current map to.")
+            return False
+        targetName = f"{os.path.basename(targetDirectory)} ({targetMap})"
+
+        targetWaypoints = XaeroWaypoints(targetDirectory, targetMap)
+        try:
+            if userCommand.corecommand == "sync": # recorded in the target world's journal, so it can be undone from there (or from here, if it's another map of this world)
+                if isJournalFor(xaeroWaypoints.journal, targetDirectory):
+                    shareJournal(targetWaypoints, xaeroWaypoints.journal)
+                else:
+                    recoveredCount = openJournal(targetWaypoints)
+                    if recoveredCount > 0:
+                        logging.info(f"Recovered {recoveredCount} changes to {os.path.basename(targetDirectory)} from its journal that weren't written to its waypoint files last time.")
+            for dimension in dimensions:
+                diff = diffWaypoints(xaeroWaypoints.getWaypointSet(dimension).waypoints, targetWaypoints.getWaypointSet(dimension).waypoints, dimension)
+                if userCommand.corecommand == "diff":
+                    printWaypointDiff(diff, limit)
+                elif diff.empty or (not removeExtra and len(diff.added) == 0 and len(diff.changed) == 0):
+                    logging.info(f"{targetName} {dimension}: already up to date.")
+                else:
+                    applyWaypointDiff(targetWaypoints, diff, removeExtra)
+                    logging.info(f"{targetName} {dimension}: added {len(diff.added)}, changed {len(diff.changed)}, removed {len(diff.removed) if removeExtra else 0} waypoints.")
+        finally:
+            targetWaypoints.close()
+        return True
+
+    def runExportCommand(self, userCommand: UserCommand, xaeroWaypoints: XaeroWaypoints) -> bool:
+        """Writes the waypoints of the current map to a CSV, JSON Lines or GeoJSON file."""
+        exportFormat = getExportFormat(userCommand.value)
+        dimensions: list[str] = []
+        normalizeTo: str | None = None
+        exportFilter = ExportFilter()
+        for i in userCommand.flags:
+            if i.flag == "--format":
+                if i.value not in EXPORT_FORMATS:
+                    logging.error(f"Invalid --format flag value: {i.value}. Allowed values are: {', '.join(EXPORT_FORMATS)}.")
+                    return False
+                exportFormat = i.value
+            if i.flag == "--dimension":
+                dimension = parseDimension(i.value)
+                if dimension is None:
+                    return False
+                dimensions.append(dimension)
+            if i.flag == "--normalize":
+                if i.value not in ("overworld", "nether"):
+                    logging.error(f"Invalid --normalize flag value: {i.value}. It should be \"overworld\" or \"nether\".")
+                    return False
+                normalizeTo = i.value
+            if i.flag == "--bbox":
+                boundingBox = parseIntegerList(i, 4)
+                if boundingBox is None:
+                    return False
+                exportFilter.boundingBox = (min(boundingBox[0], boundingBox[2]), min(boundingBox[1], boundingBox[3]), max(boundingBox[0], boundingBox[2]), max(boundingBox[1], boundingBox[3]))
+            if i.flag == "--center":
+                center = parseIntegerList(i, 2)
+                if center is None:
+                    return False
+                exportFilter.center = (center[0], center[1])
+            if i.flag == "--radius":
+                exportFilter.radius = parsePositiveNumberFlag(i)
+                if exportFilter.radius is None:
+                    return False
+        if exportFormat is None:
+            logging.error(f"Couldn't tell what format to export \"{userCommand.value}\" as from its extension. Pass one with --format ({', '.join(EXPORT_FORMATS)}).")
+            return False
+        if (exportFilter.center is None) != (exportFilter.radius is None):
+            logging.error("--center and --radius have to be used together.")
+            return False
+        if len(dimensions) == 0:
+            dimensions = [XaeroWaypoints.OVERWORLD, XaeroWaypoints.NETHER, XaeroWaypoints.THE_END]
+        filtered = exportFilter.boundingBox is not None or exportFilter.center is not None
+
+        try:
+            exportedCount = exportWaypoints(xaeroWaypoints, userCommand.value, exportFormat, dimensions, normalizeTo, exportFilter if filtered else None)
+        except OSError as e:
+            logging.error(f"Unable to write export file \"{userCommand.value}\": {e}")
+            return False
+        logging.info(f"Exported {exportedCount} waypoints to \"{userCommand.value}\".")
+        return True
+
+    def runRouteCommand(self, userCommand: UserCommand, xaeroWaypoints: XaeroWaypoints) -> bool:
+        """Works out a short order to visit waypoints in, and optionally numbers them in that order."""
+        start: Tuple[int, int] = (0, 0)
+        if userCommand.value != "":
+            startCoordinates = parseCoordinates(userCommand.value)
+            if startCoordinates is None:
+                return False
+            start = (int(startCoordinates[0]), int(startCoordinates[2]))
+        dimension: str = XaeroWaypoints.OVERWORLD
+        nameFilter: str | None = None
+        useNether: bool = False
+        portalCost: float = DEFAULT_PORTAL_COST
+        writeRoute: bool = False
+        for i in userCommand.flags:
+            if i.flag == "--dimension":
+                dimension = parseDimension(i.value)
+                if dimension is None:
+                    return False
+            if i.flag == "--name":
+                nameFilter = str(i.value).lower()
+            if i.flag == "--nether":
+                useNether = True
+            if i.flag == "--portalcost":
+                portalCost = parsePositiveNumberFlag(i)
+                if portalCost is None:
+                    return False
+            if i.flag == "--write":
+                writeRoute = True
+        if useNether and dimension != XaeroWaypoints.OVERWORLD:
+            logging.error("--nether can only be used for routes in the overworld.")
+            return False
+
+        pyPoints = xaeroWaypoints.getWaypointSet(dimension).waypoints
+        if nameFilter is not None:
+            pyPoints = [i for i in pyPoints if nameFilter in i.name.lower()]
+        if len(pyPoints) == 0:
+            print("There are no waypoints to route.")
+            return True
+        route = RoutePlanner(pyPoints, start, useNether, portalCost).plan()
+        for i, v in enumerate(route.waypoints):
+            print(f"{i+1}. \"{v.name}\" at {v.coordinateString()}: {round(route.legCosts[i])} blocks" + (" (through the nether)" if route.legsViaNether[i] else ""))
+        print(f"Total: {round(route.totalCost)} blocks")
+
+        if writeRoute:
+            xaeroWaypoints.replaceWaypoints(route.waypoints, numberRoute(route), dimension)
+            xaeroWaypoints.flush()
+            logging.info(f"Numbered {len(route.waypoints)} waypoints in the order of the route.")
+        return True
+
+    def runUndoCommand(self, userCommand: UserCommand, xaeroWaypoints: XaeroWaypoints) -> bool:
+        """Takes back the last change to the waypoints ("undo"), or makes the last undone change again ("redo")."""
+        if xaeroWaypoints.journal is None:
+            logging.error("There's no journal for this world, so there's nothing to undo or redo.")
+            return False
+        try:
+            count = int(userCommand.value) if userCommand.value != "" else 1
+        except ValueError:
+            count = -1
+        if count < 1:
+            logging.error(f"Invalid number of changes to {userCommand.corecommand}: {userCommand.value}")
+            return False
+        for _ in range(count):
+            if userCommand.corecommand == "undo":
+                change = undo(xaeroWaypoints, xaeroWaypoints.journal)
+            else:
+                change = redo(xaeroWaypoints, xaeroWaypoints.journal)
+            if change is None:
+                print(f"There's nothing to {userCommand.corecommand}.")
+                break
+            removedCount, addedCount = (len(change["added"]), len(change["removed"])) if userCommand.corecommand == "undo" else (len(change["removed"]), len(change["added"]))
+            logging.info(f"{userCommand.corecommand.capitalize()}: removed {removedCount} and added {addedCount} waypoints in {change['map']} ({change['dimension']}).")
+        xaeroWaypoints.flush() # so it shows up in game
+        return True
+
+    def runStatsCommand(self, userCommand: UserCommand) -> bool:
+        """Shows how long parsing, writing and commands have taken, or turns timing them on or off."""
+        for i in userCommand.flags:
+            if i.flag == "--enable":
+                Instrumentation.enableInstrumentation()
+                logging.info("Timing is on.")
+                return True
+            if i.flag == "--disable":
+                Instrumentation.disableInstrumentation()
+                logging.info("Timing is off.")
+                return True
+            if i.flag == "--reset":
+                Instrumentation.resetStats()
+                logging.info("Cleared the stats.")
+                return True
+        if not Instrumentation.isEnabled() and len(Instrumentation.stats) == 0:
+            print("Nothing has been timed yet. Turn timing on with \"stats --enable\", or start with --stats.")
+            return True
+        print(Instrumentation.formatStats())
+        return True
+
+    def fanOutWaypoints(self, pyPoints: list[Waypoint], options: WaypointOptions, xaeroWaypoints: XaeroWaypoints) -> bool:
+        """Adds `pyPoints` to the current map and every fan-out target from the config at the same time. Returns False if any of them failed."""
+        appConfig = config.getConfig()
+        currentTarget = (os.path.normcase(os.path.abspath(xaeroWaypoints.waypointDirectory)), xaeroWaypoints.currentMap)
+        currentTargetName = f"{os.path.basename(xaeroWaypoints.waypointDirectory)} ({xaeroWaypoints.currentMap})"
+        targets: list[FanOutTarget] = []
+        for i in loadFanOutTargets(appConfig.fanOutTargets):
+            if (os.path.normcase(os.path.abspath(i.getWaypointDirectory(appConfig.gameDirectory))), i.map) == currentTarget:
+                continue # the current map is already getting them
+            targets.append(i)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            #* the current map is added to alongside the other targets instead of before them
+            currentFuture = executor.submit(xaeroWaypoints.addWaypoints, pyPoints, options.dimension, options.dedupeRadius)
+            results = addToTargets(appConfig.gameDirectory, targets, pyPoints, options.dimension, options.dedupeRadius, journal=xaeroWaypoints.journal)
+            try:
+                logging.info(f"{currentTargetName}: added {len(currentFuture.result())} waypoints.")
+                succeeded = True
+            except Exception as e:
+                logging.error(f"{currentTargetName}: failed to add waypoints: {e}")
+                succeeded = False
+
+        for i in results:
+            if i.error is not None:
+                logging.error(f"Multiplayer_{i.target.ipAddress} ({i.target.map}): failed to add waypoints: {i.error}")
+                succeeded = False
+            else:
+                logging.info(f"Multiplayer_{i.target.ipAddress} ({i.target.map}): added {i.addedCount} waypoints.")
+        return succeeded
+
+    def runTargetsCommand(self, userCommand: UserCommand) -> bool:
+        """Lists, adds, or removes fan-out targets."""
+        appConfig = config.getConfig()
+        targetList: list[dict[str, str]] = list(appConfig.fanOutTargets)
+        adding: bool = False
+        ipAddress: str | None = None
+        targetMap: str | None = None
+        for i in userCommand.flags:
+            if i.flag == "--add":
+                adding = True
+            if i.flag == "--ip":
+                ipAddress = i.value
+            if i.flag == "--map":
+                targetMap = i.value
+            if i.flag == "--remove":
+                try:
+                    removed = targetList.pop(int(str(i.value)))
+                except (ValueError, IndexError):
+                    logging.error(f"There is no fan-out target #{i.value}.")
+                    return False
+                appConfig.set("fanOutTargets", targetList)
+                appConfig.save()
+                removedIpAddress, removedMap = removed.get("ipAddress"), removed.get("map")
+                logging.info(f"Removed fan-out target Multiplayer_{removedIpAddress} ({removedMap}).")
+                return True
+
+        if adding:
+            if ipAddress is None or targetMap is None:
+                logging.error("Both --ip and --map are required to add a fan-out target.")
+                return False
+            if not isValidIPv4Address(ipAddress):
+                logging.error(f"\"{ipAddress}\" is not a valid IP address.")
+                return False
+            targetList.append({"ipAddress": ipAddress, "map": targetMap})
+            appConfig.set("fanOutTargets", targetList)
+            appConfig.save()
+            logging.info(f"Added fan-out target Multiplayer_{ipAddress} ({targetMap}).")
+            return True
+
+        if len(targetList) == 0:
+            print("There are no fan-out targets. Add one with \"targets --add --ip <ip> --map <map>\".")
+        for i, v in enumerate(targetList):
+            targetIpAddress, targetMap = v.get("ipAddress"), v.get("map")
+            print(f"({i}) Multiplayer_{targetIpAddress} ({targetMap})")
         return True
-        
\ No newline at end of file
@@ -1,8 +1,51 @@
-from typing import Tuple
+import math
+from typing import Sequence, Tuple
+
+try:
+    import numpy
+except ImportError: # numpy is optional, the batch methods fall back to plain python without it
+    numpy = None
+
+NETHER_ROOF_Y: int = 128 # nether waypoints are put on the roof for nether roof travel
+OCEAN_LEVEL_Y: int = 63 # overworld waypoints converted from the nether don't have a meaningful Y, so they're put at sea level
 
 class CoordinateConverter:
+    """Converts between overworld and nether coordinates (1 nether block = 8 overworld blocks).\n
+    Results are always whole blocks, floored the same way the game does it (so -1 in the overworld is -1 in the nether, not 0)."""
+    @staticmethod
     def overworldToNether(overworldCoordinates: Tuple[int, int, int]) -> Tuple[int, int, int]:
-        return (overworldCoordinates[0]/8, 128, overworldCoordinates[2]/8)
+        return (math.floor(overworldCoordinates[0]/8), NETHER_ROOF_Y, math.floor(overworldCoordinates[2]/8))
 
+    @staticmethod
     def netherToOverworld(netherCoordinates: Tuple[int, int, int]) -> Tuple[int, int, int]:
-        return (netherCoordinates[0]*8, netherCoordinates[1]*8)
\ No newline at end of file
+        return (math.floor(netherCoordinates[0]*8), OCEAN_LEVEL_Y, math.floor(netherCoordinates[2]*8))
+
+    @staticmethod
+    def overworldToNetherBatch(overworldCoordinates: "Sequence[Tuple[int, int, int]] | numpy.ndarray") -> "list[Tuple[int, int, int]] | numpy.ndarray":
+        """Converts a whole batch of (X, Y, Z) coordinates at once.\n
+        If a numpy array with shape (n, 3) is passed in, every column is converted at once and a new integer array is returned. Anything else is converted in plain python and a list of tuples is returned."""
+        if numpy is not None and isinstance(overworldCoordinates, numpy.ndarray):
+            netherCoordinates = numpy.empty((len(overworldCoordinates), 3), dtype=numpy.int64)
+            netherCoordinates[:, 0] = numpy.floor_divide(overworldCoordinates[:, 0], 8)
+            netherCoordinates[:, 1] = NETHER_ROOF_Y
+            netherCoordinates[:, 2] = numpy.floor_divide(overworldCoordinates[:, 2], 8)
+            return netherCoordinates
+        try:
+            # for ints, shifting right by 3 is the same as flooring x/8 (including for negative numbers), and it's a lot faster
+            return [(x >> 3, NETHER_ROOF_Y, z >> 3) for x, _, z in overworldCoordinates]
+        except TypeError: # there's a float in there
+            return [(math.floor(x/8), NETHER_ROOF_Y, math.floor(z/8)) for x, _, z in overworldCoordinates]
+
+    @staticmethod
+    def netherToOverworldBatch(netherCoordinates: "Sequence[Tuple[int, int, int]] | numpy.ndarray") -> "list[Tuple[int, int, int]] | numpy.ndarray":
+        """See `overworldToNetherBatch`."""
+        if numpy is not None and isinstance(netherCoordinates, numpy.ndarray):
+            overworldCoordinates = numpy.empty((len(netherCoordinates), 3), dtype=numpy.int64)
+            overworldCoordinates[:, 0] = numpy.floor(netherCoordinates[:, 0]*8)
+            overworldCoordinates[:, 1] = OCEAN_LEVEL_Y
+            overworldCoordinates[:, 2] = numpy.floor(netherCoordinates[:, 2]*8)
+            return overworldCoordinates
+        try:
+            return [(x << 3, OCEAN_LEVEL_Y, z << 3) for x, _, z in netherCoordinates]
+        except TypeError: # there's a float in there
+            return [(math.floor(x*8), OCEAN_LEVEL_Y, math.floor(z*8)) for x, _, z in netherCoordinates]
@@ -0,0 +1,127 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterator, Tuple
+
+from CoordinateConverter import OCEAN_LEVEL_Y
+
+class CoordinateParseError(ValueError):
+    """Raised when a string doesn't contain coordinates in any of the registered formats."""
+    def __init__(self, value: str, reason: str = "it isn't in any known coordinate format") -> None:
+        super().__init__(f"Couldn't parse coordinates from \"{value}\": {reason}.")
+        self.value = value
+        self.reason = reason
+
+# one coordinate: an integer (optionally with thousands commas, like chunkbase uses), a decimal, or a relative "~" coordinate
+NUMBER: str = r"-?\d[\d,]*(?:\.\d+)?"
+RELATIVE_NUMBER: str = r"~(?:-?\d+(?:\.\d+)?)?|" + NUMBER
+
+@dataclass(frozen=True)
+class CoordinateFormat:
+    """A way coordinates can be written. `pattern` must have exactly three capturing groups: X, Y and Z (Y's group can be optional, it's set to the ocean level if it doesn't match).\n
+    `convert` turns the three captured strings into coordinates, see `toCoordinates` for the default."""
+    name: str
+    pattern: str
+    convert: "Callable[[str, str | None, str, Tuple[int, int, int] | None], Tuple[int, int, int]]"
+
+def toCoordinate(value: str, originValue: int | None) -> int:
+    #* these are checked with "in" instead of trying int() first and catching the error, since chunkbase's commas would make that the slow path for most coordinates
+    if "," in value:
+        value = value.replace(",", "")
+    if value[0] == "~":
+        if originValue is None:
+            raise CoordinateParseError(value, "relative coordinates need a position to be relative to")
+        return originValue + (math.floor(float(value[1:])) if len(value) > 1 else 0)
+    if "." in value:
+        return math.floor(float(value)) # xaero doesn't like decimals, so they're floored like the game does it
+    return int(value)
+
+def toCoordinates(x: str, y: str | None, z: str, origin: Tuple[int, int, int] | None = None) -> Tuple[int, int, int]:
+    """The default `CoordinateFormat.convert`. A missing Y, or a bare "~" Y with no origin (like in chunkbase's "/tp 7540 ~ -11516"), is set to the ocean level."""
+    if y is None or (y == "~" and origin is None):
+        yValue = OCEAN_LEVEL_Y
+    else:
+        yValue = toCoordinate(y, None if origin is None else origin[1])
+    if origin is None:
+        return (toCoordinate(x, None), yValue, toCoordinate(z, None))
+    return (toCoordinate(x, origin[0]), yValue, toCoordinate(z, origin[2]))
+
+# the order matters: when two formats could match at the same spot, the first one wins
+COORDINATE_FORMATS: list[CoordinateFormat] = [
+    # what chunkbase shows when you click on something: "X: -6,652 Z: -5,420" (sometimes with a Y)
+    CoordinateFormat("chunkbase", rf"\bX:[ \t]*({NUMBER})(?:[ \t]+Y:[ \t]*({NUMBER}))?[ \t]+Z:[ \t]*({NUMBER})", toCoordinates),
+    # the F3 debug screen: "XYZ: 123.456 / 64.00000 / -78.900"
+    CoordinateFormat("f3", rf"\bXYZ:[ \t]*({NUMBER})[ \t]*/[ \t]*({NUMBER})[ \t]*/[ \t]*({NUMBER})", toCoordinates),
+    # what chunkbase's copy button gives you: "/tp 7540 ~ -11516", also "/tp @s ..." and "/teleport ..."
+    CoordinateFormat("teleport", rf"/(?:tp|teleport)(?:[ \t]+@?[A-Za-z_]\S*)?[ \t]+({RELATIVE_NUMBER})[ \t]+({RELATIVE_NUMBER})[ \t]+({RELATIVE_NUMBER})", toCoordinates),
+    # a python style tuple: "(432, 77, -98)"
+    CoordinateFormat("tuple", rf"\([ \t]*({NUMBER})[ \t]*,[ \t]*({NUMBER})[ \t]*,[ \t]*({NUMBER})[ \t]*\)", toCoordinates),
+    # "~10 ~ ~-5" on its own line
+    CoordinateFormat("relative", rf"^[ \t]*({RELATIVE_NUMBER})[ \t]+({RELATIVE_NUMBER})[ \t]+({RELATIVE_NUMBER})[ \t]*$", toCoordinates),
+    # "432 77 -98" on its own line. it has to be the whole line, otherwise any three numbers in a row in pasted text would count
+    CoordinateFormat("plain", rf"^[ \t]*({NUMBER})[ \t]+({NUMBER})[ \t]+({NUMBER})[ \t]*$", toCoordinates),
+]
+
+class CoordinateParser:
+    """Finds coordinates in text using every format in `formats`, all at once with a single precompiled regex (each format is one alternative in it)."""
+    def __init__(self, formats: list[CoordinateFormat] | None = None) -> None:
+        self.formats: list[CoordinateFormat] = list(COORDINATE_FORMATS if formats is None else formats)
+        self.compile()
+
+    def registerFormat(self, coordinateFormat: CoordinateFormat, first: bool = False) -> None:
+        """Adds a format. If `first` is True it's tried before the others (see the comment on `COORDINATE_FORMATS`)."""
+        if first:
+            self.formats.insert(0, coordinateFormat)
+        else:
+            self.formats.append(coordinateFormat)
+        self.compile()
+
+    def compile(self) -> None:
+        alternatives: list[str] = []
+        # the regex's group number -> (the format's converter, the group number of its X)
+        #* each format is wrapped in a group, which ends after the format's own groups, so match.lastindex is always the wrapping group of whichever format matched
+        self.groupFormats: dict[int, tuple[CoordinateFormat, int]] = {}
+        groupNumber = 1
+        for i in self.formats:
+            if re.compile(i.pattern).groups != 3:
+                raise ValueError(f"The pattern for the \"{i.name}\" coordinate format should have 3 groups (X, Y and Z).")
+            alternatives.append(f"({i.pattern})")
+            self.groupFormats[groupNumber] = (i, groupNumber+1)
+            groupNumber += 4
+        self.pattern = re.compile("|".join(alternatives), re.MULTILINE)
+
+    def parse(self, value: str, origin: Tuple[int, int, int] | None = None) -> Tuple[int, int, int]:
+        """Parses one set of coordinates that should take up the whole string (other than whitespace). `origin` is what relative ("~") coordinates are relative to.\n
+        Raises `CoordinateParseError` if it isn't in any known format."""
+        match = self.pattern.fullmatch(value.strip())
+        if match is None:
+            raise CoordinateParseError(value)
+        coordinateFormat, firstGroup = self.groupFormats[match.lastindex]
+        try:
+            return coordinateFormat.convert(*match.group(firstGroup, firstGroup+1, firstGroup+2), origin)
+        except CoordinateParseError as e: # so the error has the whole value in it, not just the coordinate that was wrong
+            raise CoordinateParseError(value, e.reason)
+
+    def iterMatches(self, text: str, origin: Tuple[int, int, int] | None = None) -> Iterator[tuple[str, Tuple[int, int, int]]]:
+        """Yields (format name, coordinates) for every set of coordinates in `text`, in the order they appear. Relative coordinates are skipped if no `origin` is given."""
+        groupFormats = self.groupFormats
+        for match in self.pattern.finditer(text):
+            coordinateFormat, firstGroup = groupFormats[match.lastindex]
+            try:
+                yield coordinateFormat.name, coordinateFormat.convert(*match.group(firstGroup, firstGroup+1, firstGroup+2), origin)
+            except CoordinateParseError:
+                continue
+
+    def extract(self, text: str, origin: Tuple[int, int, int] | None = None) -> list[Tuple[int, int, int]]:
+        """Returns every set of coordinates in `text` (ex. a bunch of lines pasted from chunkbase), in the order they appear. Text around or between them is ignored."""
+        return [i[1] for i in self.iterMatches(text, origin)]
+
+defaultParser = CoordinateParser()
+
+def parseCoordinateString(value: str, origin: Tuple[int, int, int] | None = None) -> Tuple[int, int, int]:
+    """See `CoordinateParser.parse`."""
+    return defaultParser.parse(value, origin)
+
+def extractCoordinates(text: str, origin: Tuple[int, int, int] | None = None) -> list[Tuple[int, int, int]]:
+    """See `CoordinateParser.extract`."""
+    return defaultParser.extract(text, origin)
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import logging
+import math
+from typing import Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from Console import WaypointOptions, createPyPoints, parseCoordinates, parseDimension
+from CoordinateParser import extractCoordinates
+from Waypoint import Waypoint
+from XaeroWaypoints import XaeroWaypoints
+from helper import isValidWaypointText
+
+DEFAULT_PORT: int = 25590
+MAX_BODY_SIZE: int = 16_000_000 # an import of ~200k coordinates, anything bigger is probably a mistake
+# browser pages that are allowed to send waypoints. requests without an Origin header (scripts, curl) are always allowed since they can't come from a random website
+ALLOWED_ORIGINS: set[str] = {"https://www.chunkbase.com", "https://chunkbase.com"}
+# the Host header has to be one of these (with the daemon's port), otherwise a website could point its own domain at 127.0.0.1 (dns rebinding) and read /near without ever sending an Origin header
+ALLOWED_HOSTS: set[str] = {"127.0.0.1", "localhost"}
+
+class DaemonRequestError(Exception):
+    """Raised while handling a request to send back an error response instead of a result."""
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+HTTP_STATUS_REASONS: dict[int, str] = {
+    200: "OK",
+    204: "No Content",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error"
+}
+
+def parseJsonCoordinates(value: object) -> Tuple[int, int, int]:
+    """Coordinates in a request can either be a string in any format the "add" command accepts, or a list of [X, Y, Z]."""
+    if isinstance(value, str):
+        coordinates = parseCoordinates(value.strip())
+        if coordinates is None:
+            raise DaemonRequestError(400, f"Couldn't parse the coordinates \"{value}\".")
+        return coordinates
+    if isinstance(value, list) and len(value) == 3 and all(isinstance(i, (int, float)) and not isinstance(i, bool) for i in value):
+        #* json.loads accepts NaN, Infinity and numbers too big for a float (which become inf), and int() can't round those
+        if not all(math.isfinite(i) for i in value):
+            raise DaemonRequestError(400, f"Coordinates should be finite numbers, not {json.dumps(value)}.")
+        return (value[0], value[1], value[2])
+    raise DaemonRequestError(400, f"Coordinates should be a string or a list of [X, Y, Z], not {json.dumps(value)}.")
+
+def parseJsonWaypointOptions(body: dict) -> WaypointOptions:
+    """The JSON version of `Console.parseWaypointOptions`, every key is optional:\n
+    {"name": str, "initials": str, "color": 0-15, "dimension": "overworld" | "nether" | "the_end", "convert": "nether" | "overworld", "dedupe": number}\n
+    "convert" works like the --innether and --inoverworld flags."""
+    options = WaypointOptions()
+    if "convert" in body:
+        if body["convert"] == "nether":
+            options.conversion = "nether"
+            options.dimension = XaeroWaypoints.NETHER
+        elif body["convert"] == "overworld":
+            options.conversion = "overworld"
+            options.dimension = XaeroWaypoints.OVERWORLD
+        else:
+            raise DaemonRequestError(400, "\"convert\" should be \"nether\" or \"overworld\".")
+    if "dimension" in body:
+        dimension = parseDimension(body["dimension"])
+        if dimension is None:
+            raise DaemonRequestError(400, "\"dimension\" should be \"overworld\", \"nether\" or \"the_end\".")
+        options.dimension = dimension
+    if "name" in body:
+        if not isinstance(body["name"], str) or not isValidWaypointText(body["name"]):
+            raise DaemonRequestError(400, "\"name\" should be a string that isn't empty and doesn't contain \":\", newlines or other control characters.")
+        options.name = body["name"]
+    if "initials" in body:
+        if not isinstance(body["initials"], str) or not isValidWaypointText(body["initials"]):
+            raise DaemonRequestError(400, "\"initials\" should be a string that isn't empty and doesn't contain \":\", newlines or other control characters.")
+        options.initials = body["initials"]
+    if "color" in body:
+        if not isinstance(body["color"], int) or isinstance(body["color"], bool) or body["color"] not in range(16):
+            raise DaemonRequestError(400, "\"color\" should be an integer from 0-15.")
+        options.color = body["color"]
+    if "dedupe" in body:
+        if not isinstance(body["dedupe"], (int, float)) or isinstance(body["dedupe"], bool) or body["dedupe"] < 0:
+            raise DaemonRequestError(400, "\"dedupe\" should be a positive number.")
+        options.dedupeRadius = body["dedupe"]
+    if options.initials is None:
+        options.initials = options.name[0].upper()
+    return options
+
+def waypointToJson(pyPoint: Waypoint) -> dict:
+    return {"name": pyPoint.name, "initials": pyPoint.initials, "x": pyPoint.x, "y": pyPoint.y, "z": pyPoint.z, "color": pyPoint.color}
+
+class Daemon:
+    """Keeps a `XaeroWaypoints` loaded and serves it over a small HTTP/1.1 API on localhost, so waypoints can be pushed (ex. from a browser helper on Chunkbase or a script) without starting the tool up every time.\n
+    Endpoints (every body and response is JSON):\n
+    - POST /add: {"coordinates": ..., <options>} adds one waypoint, see `parseJsonCoordinates` and `parseJsonWaypointOptions`.\n
+    - POST /import: {"coordinates": [...], <options>} adds many waypoints with a single file write. Instead of "coordinates", "text" can be a blob of pasted text to pull every coordinate out of.\n
+    - GET /near?x=&z=&dimension=&radius=&limit= lists the waypoints closest to (x, z).\n
+    Requests for the same dimension are handled one at a time, requests for different dimensions can run at the same time."""
+    def __init__(self, xaeroWaypoints: XaeroWaypoints, port: int = DEFAULT_PORT, host: str = "127.0.0.1") -> None:
+        self.xaeroWaypoints = xaeroWaypoints
+        self.port = port
+        self.host = host
+        self.dimensionLocks: dict[str, asyncio.Lock] = {}
+        self.server: asyncio.Server | None = None
+        self.connections: set[asyncio.StreamWriter] = set()
+
+    def getDimensionLock(self, dimension: str) -> asyncio.Lock:
+        # created on first use so they belong to the running event loop
+        if dimension not in self.dimensionLocks:
+            self.dimensionLocks[dimension] = asyncio.Lock()
+        return self.dimensionLocks[dimension]
+
+    async def start(self) -> None:
+        # every dimension is loaded up front so the first request doesn't have to wait for a parse
+        for dimension in (XaeroWaypoints.OVERWORLD, XaeroWaypoints.NETHER, XaeroWaypoints.THE_END):
+            await asyncio.to_thread(self.xaeroWaypoints.getWaypointSet, dimension)
+        self.server = await asyncio.start_server(self.handleConnection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1] # in case port 0 was used to get any free port
+        logging.info(f"Listening on http://{self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            for i in self.connections: # kept alive connections would stop wait_closed() from ever returning
+                i.close()
+            await self.server.wait_closed()
+            self.server = None
+        for i in self.dimensionLocks.values():
+            await i.acquire() # wait for anything still writing
+        self.xaeroWaypoints.flush()
+        self.xaeroWaypoints.close()
+
+    async def serveForever(self) -> None:
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def handleConnection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Handles requests on one connection until the client closes it (connections are kept alive so a client sending lots of waypoints doesn't reconnect every time)."""
+        self.connections.add(writer)
+        try:
+            while True:
+                requestLine = await reader.readline()
+                if requestLine == b"":
+                    return
+                try:
+                    method, target, version = requestLine.decode("latin-1").rstrip("\r\n").split(" ")
+                except ValueError:
+                    await self.sendResponse(writer, 400, {"error": "Malformed request line."}, keepAlive=False)
+                    return
+                headers: dict[str, str] = {}
+                while True:
+                    headerLine = await reader.readline()
+                    if headerLine in (b"\r\n", b"\n", b""):
+                        break
+                    headerName, _, headerValue = headerLine.decode("latin-1").partition(":")
+                    headers[headerName.strip().lower()] = headerValue.strip()
+                keepAlive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                try:
+                    contentLength = int(headers.get("content-length", "0"))
+                except ValueError:
+                    contentLength = -1
+                if contentLength < 0 or contentLength > MAX_BODY_SIZE:
+                    await self.sendResponse(writer, 413 if contentLength > 0 else 400, {"error": "Invalid Content-Length."}, keepAlive=False)
+                    return
+                body = await reader.readexactly(contentLength) if contentLength > 0 else b""
+
+                origin = headers.get("origin")
+                if not self.isAllowedHost(headers.get("host")):
+                    await self.sendResponse(writer, 403, {"error": "Requests have to be sent to " + " or ".join(f"{i}:{self.port}" for i in sorted(ALLOWED_HOSTS)) + "."}, keepAlive=False)
+                    return
+                if origin is not None and origin not in ALLOWED_ORIGINS:
+                    await self.sendResponse(writer, 403, {"error": f"Requests from {origin} aren't allowed."}, keepAlive=keepAlive)
+                elif method == "OPTIONS": # a browser checking whether it's allowed to send a request
+                    await self.sendResponse(writer, 204, None, keepAlive=keepAlive, origin=origin)
+                else:
+                    status, response = await self.handleRequest(method, target, body)
+                    await self.sendResponse(writer, status, response, keepAlive=keepAlive, origin=origin)
+                if not keepAlive:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.LimitOverrunError, ValueError): # the client went away or sent something way too long
+            return
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    def isAllowedHost(self, host: str | None) -> bool:
+        if host is None:
+            return False
+        return host.lower() in {f"{i}:{self.port}" for i in ALLOWED_HOSTS | {self.host}}
+
+    async def sendResponse(self, writer: asyncio.StreamWriter, status: int, response: dict | None, keepAlive: bool, origin: str | None = None) -> None:
+        body = b"" if response is None else json.dumps(response).encode("utf-8")
+        headers = [
+            f"HTTP/1.1 {status} {HTTP_STATUS_REASONS[status]}",
+            f"Content-Length: {len(body)}",
+            "Connection: " + ("keep-alive" if keepAlive else "close")
+        ]
+        if response is not None:
+            headers.append("Content-Type: application/json")
+        if origin is not None:
+            headers += [f"Access-Control-Allow-Origin: {origin}", "Access-Control-Allow-Methods: GET, POST, OPTIONS", "Access-Control-Allow-Headers: Content-Type", "Vary: Origin"]
+        writer.write(("\r\n".join(headers)+"\r\n\r\n").encode("latin-1")+body)
+        await writer.drain()
+
+    async def handleRequest(self, method: str, target: str, body: bytes) -> tuple[int, dict]:
+        splitTarget = urlsplit(target)
+        routes = {"/add": ("POST", self.handleAdd), "/import": ("POST", self.handleImport), "/near": ("GET", self.handleNear)}
+        if splitTarget.path not in routes:
+            return 404, {"error": f"There is no {splitTarget.path} endpoint."}
+        routeMethod, handler = routes[splitTarget.path]
+        if method != routeMethod:
+            return 405, {"error": f"{splitTarget.path} only accepts {routeMethod} requests."}
+        try:
+            if method == "POST":
+                try:
+                    requestBody = json.loads(body)
+                except (ValueError, UnicodeDecodeError):
+                    raise DaemonRequestError(400, "The request body isn't valid JSON.")
+                if not isinstance(requestBody, dict):
+                    raise DaemonRequestError(400, "The request body should be a JSON object.")
+                return 200, await handler(requestBody)
+            return 200, await handler({i: v[-1] for i, v in parse_qs(splitTarget.query).items()})
+        except DaemonRequestError as e:
+            return e.status, {"error": e.message}
+        except Exception as e: # one bad request shouldn't take the daemon down
+            logging.exception(f"Error handling {method} {target}")
+            return 500, {"error": str(e)}
+
+    async def handleAdd(self, body: dict) -> dict:
+        if "coordinates" not in body:
+            raise DaemonRequestError(400, "\"coordinates\" is required.")
+        options = parseJsonWaypointOptions(body)
+        newPyPoint = createPyPoints([parseJsonCoordinates(body["coordinates"])], options)[0]
+        async with self.getDimensionLock(options.dimension):
+            added = await asyncio.to_thread(self.xaeroWaypoints.addWaypoint, newPyPoint, options.dimension, options.dedupeRadius)
+        return {"added": added, "waypoint": waypointToJson(newPyPoint)}
+
+    async def handleImport(self, body: dict) -> dict:
+        if isinstance(body.get("text"), str):
+            coordinateList = extractCoordinates(body["text"])
+        elif isinstance(body.get("coordinates"), list):
+            coordinateList = [parseJsonCoordinates(i) for i in body["coordinates"]]
+        else:
+            raise DaemonRequestError(400, "\"coordinates\" should be a list (or \"text\" should be a string).")
+        options = parseJsonWaypointOptions(body)
+        newPyPoints = createPyPoints(coordinateList, options)
+        async with self.getDimensionLock(options.dimension):
+            addedPyPoints = await asyncio.to_thread(self.xaeroWaypoints.addWaypoints, newPyPoints, options.dimension, options.dedupeRadius)
+        return {"added": len(addedPyPoints), "duplicates": len(newPyPoints)-len(addedPyPoints)}
+
+    async def handleNear(self, query: dict[str, str]) -> dict:
+        try:
+            x = float(query["x"])
+            z = float(query["z"])
+            radius = float(query["radius"]) if "radius" in query else None
+            limit = int(query.get("limit", "10"))
+        except KeyError:
+            raise DaemonRequestError(400, "\"x\" and \"z\" are required.")
+        except ValueError:
+            raise DaemonRequestError(400, "\"x\", \"z\", \"radius\" and \"limit\" should be numbers.")
+        if not (math.isfinite(x) and math.isfinite(z)) or (radius is not None and not math.isfinite(radius)):
+            raise DaemonRequestError(400, "\"x\", \"z\" and \"radius\" should be finite numbers.")
+        if radius is not None and radius < 0:
+            raise DaemonRequestError(400, "\"radius\" can't be negative.")
+        if limit < 1:
+            raise DaemonRequestError(400, "\"limit\" should be at least 1.")
+        x, z = int(x), int(z)
+        dimension = parseDimension(query.get("dimension", "overworld"))
+        if dimension is None:
+            raise DaemonRequestError(400, "\"dimension\" should be \"overworld\", \"nether\" or \"the_end\".")
+
+        def findNear() -> list[tuple[float, Waypoint]]:
+            self.xaeroWaypoints.syncExternalChanges([dimension])
+            return self.xaeroWaypoints.findWaypointsNear(x, z, dimension, radius, limit)
+
+        async with self.getDimensionLock(dimension):
+            nearbyWaypoints = await asyncio.to_thread(findNear)
+        return {"waypoints": [dict(waypointToJson(waypoint), distance=distance) for distance, waypoint in nearbyWaypoints]}
+
+def runDaemon(xaeroWaypoints: XaeroWaypoints, port: int = DEFAULT_PORT) -> None:
+    """Runs the daemon until it's stopped with Ctrl+C."""
+    daemon = Daemon(xaeroWaypoints, port)
+    try:
+        asyncio.run(daemon.serveForever())
+    except KeyboardInterrupt:
+        logging.info("Stopped the daemon.")
@@ -0,0 +1,87 @@
+import copy
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from Journal import Journal, getJournalPath, isJournalFor, recoverJournal, shareJournal
+from Waypoint import Waypoint
+from XaeroWaypoints import XaeroWaypoints
+
+@dataclass
+class FanOutTarget:
+    """One server + map that waypoints can be written to."""
+    ipAddress: str
+    map: str
+
+    def getWaypointDirectory(self, gameDirectory: str) -> str:
+        return os.path.join(gameDirectory, "XaeroWaypoints", f"Multiplayer_{self.ipAddress}")
+
+@dataclass
+class FanOutResult:
+    target: FanOutTarget
+    addedCount: int = 0
+    error: Exception | None = None
+
+def loadFanOutTargets(targetList: list[dict[str, str]]) -> list[FanOutTarget]:
+    """Turns the "fanOutTargets" list from the config into `FanOutTarget`s, skipping (and logging) any that are malformed."""
+    targets: list[FanOutTarget] = []
+    for i, v in enumerate(targetList):
+        try:
+            targets.append(FanOutTarget(v["ipAddress"], v["map"]))
+        except (KeyError, TypeError):
+            logging.error(f"Fan-out target #{i} in the config is malformed, it should look like {{\"ipAddress\": \"...\", \"map\": \"...\"}}. It will be skipped.")
+    return targets
+
+def addToTarget(waypointDirectory: str, target: FanOutTarget, pyPoints: list[Waypoint], dimension: str, dedupeRadius: float | None, journal: Journal) -> FanOutResult:
+    try:
+        xaeroWaypoints = XaeroWaypoints(waypointDirectory, target.map)
+        try:
+            shareJournal(xaeroWaypoints, journal)
+            # every target gets its own copies so editing a waypoint in one set can't change it in another
+            addedPyPoints = xaeroWaypoints.addWaypoints([copy.copy(i) for i in pyPoints], dimension, dedupeRadius)
+            xaeroWaypoints.flush()
+        finally:
+            xaeroWaypoints.close()
+        return FanOutResult(target, len(addedPyPoints))
+    except Exception as e: # one broken target shouldn't stop the others, the error is reported in the result instead
+        return FanOutResult(target, error=e)
+
+def addToWorld(gameDirectory: str, targets: list[FanOutTarget], pyPoints: list[Waypoint], dimension: str, dedupeRadius: float | None, currentJournal: Journal | None) -> list[FanOutResult]:
+    """Adds to every target in one world, one after another since they all record their changes in the world's journal (so they can be undone from that world).\n
+    If it's the current world its journal (`currentJournal`) is used, otherwise the world's journal is opened, recovered and closed again here."""
+    waypointDirectory = targets[0].getWaypointDirectory(gameDirectory)
+    if isJournalFor(currentJournal, waypointDirectory):
+        return [addToTarget(waypointDirectory, i, pyPoints, dimension, dedupeRadius, currentJournal) for i in targets]
+    try:
+        journal = Journal(getJournalPath(waypointDirectory))
+        recoveryWaypoints = XaeroWaypoints(waypointDirectory, targets[0].map)
+        try:
+            shareJournal(recoveryWaypoints, journal)
+            recoverJournal(recoveryWaypoints, journal)
+        finally:
+            recoveryWaypoints.close()
+    except Exception as e:
+        return [FanOutResult(i, error=e) for i in targets]
+    try:
+        return [addToTarget(waypointDirectory, i, pyPoints, dimension, dedupeRadius, journal) for i in targets]
+    finally:
+        journal.close()
+
+def addToTargets(gameDirectory: str, targets: list[FanOutTarget], pyPoints: list[Waypoint], dimension: str, dedupeRadius: float | None = None, maxWorkers: int | None = None, journal: Journal | None = None) -> list[FanOutResult]:
+    """Adds the same waypoints to every target at once on a thread pool (each world has its own files and journal, so they don't have to wait on each other). `journal` is the current world's journal, see `addToWorld`.\n
+    Returns one `FanOutResult` per target, in the same order as `targets`. Errors are caught per target, so check `FanOutResult.error`."""
+    if len(targets) == 0:
+        return []
+    worlds: dict[str, list[FanOutTarget]] = {}
+    for i in targets:
+        worlds.setdefault(os.path.normcase(os.path.abspath(i.getWaypointDirectory(gameDirectory))), []).append(i)
+    if maxWorkers is None:
+        maxWorkers = min(32, len(worlds))
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        futures = [executor.submit(addToWorld, gameDirectory, i, pyPoints, dimension, dedupeRadius, journal) for i in worlds.values()]
+        results: dict[int, FanOutResult] = {}
+        for i in futures:
+            for result in i.result():
+                results[id(result.target)] = result
+    return [results[id(i)] for i in targets]
@@ -0,0 +1,129 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+import threading
+
+# inotify event flags, from <sys/inotify.h>
+IN_MODIFY: int = 0x00000002
+IN_CLOSE_WRITE: int = 0x00000008
+IN_MOVED_FROM: int = 0x00000040
+IN_MOVED_TO: int = 0x00000080
+IN_CREATE: int = 0x00000100
+IN_DELETE: int = 0x00000200
+IN_Q_OVERFLOW: int = 0x00004000
+WATCH_MASK: int = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT_HEADER = struct.Struct("iIII") # wd, mask, cookie, len
+
+def getFileSignature(path: str) -> tuple[int, int, int] | None:
+    """(size, mtime, inode) of a file, or None if it doesn't exist. If any of these change, the file has been changed."""
+    try:
+        fileStat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (fileStat.st_size, fileStat.st_mtime_ns, fileStat.st_ino)
+
+class FileWatcher:
+    """Keeps track of which files in a set of watched files have changed since the last time `getChangedPaths()` was called.\n
+    On Linux this uses inotify on the files' directories (directories, since xaero and we both replace the files instead of editing them), so checking for changes is a single non-blocking read with no stat() calls.
+    Everywhere else, and for files whose directory doesn't exist yet, it falls back to comparing each file's size/mtime/inode.\n
+    A path showing up as changed only means it *might* have changed (ex. our own writes show up too), so callers should still compare against what they last saw."""
+    def __init__(self, useInotify: bool = True) -> None:
+        self.polledPaths: dict[str, tuple[int, int, int] | None] = {}
+        self.inotifyPaths: set[str] = set()
+        self.watchDescriptors: dict[int, str] = {} # watch descriptor -> directory
+        self.watchedDirectories: dict[str, int] = {} # directory -> watch descriptor
+        self.pendingChanges: set[str] = set()
+        self.lock = threading.Lock() # the daemon uses different dimensions from different threads
+        self.inotifyFd: int | None = None
+        if useInotify and sys.platform.startswith("linux"):
+            self.openInotify()
+
+    def openInotify(self) -> None:
+        try:
+            self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError) as e:
+            logging.debug(f"inotify isn't available, falling back to polling: {e}")
+            return
+        if fd < 0:
+            logging.debug(f"inotify_init1 failed (errno {ctypes.get_errno()}), falling back to polling.")
+            return
+        self.inotifyFd = fd
+
+    def close(self) -> None:
+        if self.inotifyFd is not None:
+            os.close(self.inotifyFd)
+            self.inotifyFd = None
+
+    def watch(self, path: str) -> None:
+        with self.lock:
+            self.addWatch(os.path.abspath(path))
+
+    def addWatch(self, path: str) -> None:
+        if path in self.polledPaths or path in self.inotifyPaths:
+            return
+        directory = os.path.dirname(path)
+        if self.inotifyFd is not None:
+            watchDescriptor = self.watchedDirectories.get(directory)
+            if watchDescriptor is None:
+                watchDescriptor = self.libc.inotify_add_watch(self.inotifyFd, os.fsencode(directory), WATCH_MASK)
+            if watchDescriptor >= 0:
+                self.watchDescriptors[watchDescriptor] = directory
+                self.watchedDirectories[directory] = watchDescriptor
+                self.inotifyPaths.add(path)
+                return
+        self.polledPaths[path] = getFileSignature(path)
+
+    def unwatch(self, path: str) -> None:
+        path = os.path.abspath(path)
+        with self.lock:
+            self.polledPaths.pop(path, None)
+            self.inotifyPaths.discard(path)
+            self.pendingChanges.discard(path)
+        # the directory watch is left in place, it's cheap and other files in it might still be watched
+
+    def readInotifyEvents(self) -> None:
+        while True:
+            try:
+                eventData = os.read(self.inotifyFd, 65536)
+            except BlockingIOError: # nothing left to read
+                return
+            offset = 0
+            while offset < len(eventData):
+                watchDescriptor, mask, _, nameLength = INOTIFY_EVENT_HEADER.unpack_from(eventData, offset)
+                name = eventData[offset+INOTIFY_EVENT_HEADER.size:offset+INOTIFY_EVENT_HEADER.size+nameLength].rstrip(b"\0")
+                offset += INOTIFY_EVENT_HEADER.size+nameLength
+                if mask & IN_Q_OVERFLOW: # events were dropped, so anything could have changed
+                    self.pendingChanges.update(self.inotifyPaths)
+                    continue
+                directory = self.watchDescriptors.get(watchDescriptor)
+                if directory is None:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name))
+                if path in self.inotifyPaths:
+                    self.pendingChanges.add(path)
+
+    def markChanged(self, path: str) -> None:
+        """Makes `path` show up in the next `getChangedPaths()` again, for when a change was noticed but couldn't be dealt with yet."""
+        with self.lock:
+            self.pendingChanges.add(os.path.abspath(path))
+
+    def getChangedPaths(self) -> set[str]:
+        """Returns the watched paths that may have changed since the last call."""
+        with self.lock:
+            return self.collectChangedPaths()
+
+    def collectChangedPaths(self) -> set[str]:
+        if self.inotifyFd is not None and len(self.inotifyPaths) > 0:
+            self.readInotifyEvents()
+        for path in self.polledPaths:
+            signature = getFileSignature(path)
+            if signature != self.polledPaths[path]:
+                self.polledPaths[path] = signature
+                self.pendingChanges.add(path)
+        changedPaths = self.pendingChanges
+        self.pendingChanges = set()
+        return changedPaths
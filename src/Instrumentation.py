@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+MAX_SAMPLES: int = 10_000 # per operation, percentiles are worked out from a random sample of this many calls once there are more
+MAX_TRACE_EVENTS: int = 1_000_000
+
+@dataclass
+class OperationStats:
+    """Timings (in seconds) and byte counts for every call to one instrumented function."""
+    count: int = 0
+    totalTime: float = 0
+    maxTime: float = 0
+    bytesRead: int = 0
+    bytesWritten: int = 0
+    samples: list[float] = field(default_factory=list, repr=False)
+
+    def record(self, duration: float) -> None:
+        self.count += 1
+        self.totalTime += duration
+        if duration > self.maxTime:
+            self.maxTime = duration
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(duration)
+        else: # reservoir sampling, so every call has the same chance of being in the sample no matter how many there have been
+            replacedIndex = random.randrange(self.count)
+            if replacedIndex < MAX_SAMPLES:
+                self.samples[replacedIndex] = duration
+
+    def getPercentile(self, percentile: float) -> float:
+        if len(self.samples) == 0:
+            return 0
+        sortedSamples = sorted(self.samples)
+        return sortedSamples[min(len(sortedSamples)-1, int(len(sortedSamples)*percentile/100))]
+
+    def toDict(self) -> dict:
+        return {
+            "count": self.count,
+            "totalSeconds": self.totalTime,
+            "p50Seconds": self.getPercentile(50),
+            "p90Seconds": self.getPercentile(90),
+            "p99Seconds": self.getPercentile(99),
+            "maxSeconds": self.maxTime,
+            "bytesRead": self.bytesRead,
+            "bytesWritten": self.bytesWritten
+        }
+
+@dataclass
+class InstrumentedFunction:
+    """A method that gets timed while instrumentation is on.\n
+    `getLabel` can split the stats up by the method's arguments (ex. one entry per console command). `getBytesRead`/`getBytesWritten` are called after the method returns, with the same arguments.\n
+    `getFileSize` is for methods that append to a file: it's called before and after, and the difference is counted as written."""
+    owner: type
+    name: str
+    getLabel: Callable[..., str] | None = None
+    getBytesRead: Callable[..., int] | None = None
+    getBytesWritten: Callable[..., int] | None = None
+    getFileSize: Callable[..., int] | None = None
+    traced: bool = True # False for methods that are called once per waypoint, they'd flood the trace
+
+# name -> stats for it
+stats: dict[str, OperationStats] = {}
+traceEvents: list[dict] | None = None # only kept if a trace file was asked for
+originalFunctions: dict[tuple[type, str], Callable] = {}
+statsLock = threading.Lock() # the daemon calls instrumented methods from worker threads
+startTime: float = time.perf_counter()
+
+def getFileSize(path: str) -> int:
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+def getInstrumentedFunctions() -> list[InstrumentedFunction]:
+    #* imported here since Console imports this module for the "stats" command
+    from Console import Console
+    from XaeroWaypoints import XaeroWaypoints
+    return [
+        InstrumentedFunction(XaeroWaypoints, "parseXaeroWaypointFile",
+            getBytesRead=lambda self, file, endOffset=None, unparsedLines=None: getFileSize(file) if endOffset is None else min(endOffset, getFileSize(file))),
+        InstrumentedFunction(XaeroWaypoints, "writeXaeroWaypointFile",
+            getBytesWritten=lambda self, pyPoints, dimension, mapName=None: getFileSize(self.getWaypointFilePath(dimension, mapName))),
+        InstrumentedFunction(XaeroWaypoints, "appendXaeroWaypointFile",
+            getFileSize=lambda self, pyPoints, dimension: getFileSize(self.getWaypointFilePath(dimension))),
+        InstrumentedFunction(XaeroWaypoints, "convertPyPointToXaero", traced=False),
+        InstrumentedFunction(Console, "handleInput"),
+        InstrumentedFunction(Console, "runCommand", getLabel=lambda self, userCommand, xaeroWaypoints: userCommand.corecommand)
+    ]
+
+def makeWrapper(instrumented: InstrumentedFunction, function: Callable) -> Callable:
+    statName = f"{instrumented.owner.__name__}.{instrumented.name}"
+    def wrapper(*args, **kwargs):
+        fileSizeBefore = instrumented.getFileSize(*args, **kwargs) if instrumented.getFileSize is not None else 0
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            duration = time.perf_counter()-start
+            name = statName if instrumented.getLabel is None else f"{statName} ({instrumented.getLabel(*args, **kwargs)})"
+            bytesRead = instrumented.getBytesRead(*args, **kwargs) if instrumented.getBytesRead is not None else 0
+            if instrumented.getFileSize is not None:
+                bytesWritten = instrumented.getFileSize(*args, **kwargs)-fileSizeBefore
+            else:
+                bytesWritten = instrumented.getBytesWritten(*args, **kwargs) if instrumented.getBytesWritten is not None else 0
+            with statsLock:
+                operationStats = stats.setdefault(name, OperationStats())
+                operationStats.record(duration)
+                operationStats.bytesRead += bytesRead
+                operationStats.bytesWritten += bytesWritten
+                if traceEvents is not None and instrumented.traced and len(traceEvents) < MAX_TRACE_EVENTS:
+                    # chrome's trace event format, so the file can be opened in chrome://tracing or ui.perfetto.dev
+                    traceEvents.append({"name": name, "ph": "X", "ts": (start-startTime)*1_000_000, "dur": duration*1_000_000, "pid": os.getpid(), "tid": threading.get_ident(), "args": {"bytesRead": bytesRead, "bytesWritten": bytesWritten}})
+    wrapper.__wrapped__ = function
+    wrapper.__name__ = function.__name__
+    wrapper.__doc__ = function.__doc__
+    return wrapper
+
+def isEnabled() -> bool:
+    return len(originalFunctions) > 0
+
+def enableInstrumentation(trace: bool = False) -> None:
+    """Starts timing the functions in `getInstrumentedFunctions()`. Until this is called they aren't touched at all, so instrumentation costs nothing while it's off.\n
+    If `trace` is True every call is also kept as a trace event for `writeTrace`."""
+    global traceEvents
+    if trace and traceEvents is None:
+        traceEvents = []
+    if isEnabled():
+        return
+    for i in getInstrumentedFunctions():
+        function = getattr(i.owner, i.name)
+        originalFunctions[(i.owner, i.name)] = function
+        setattr(i.owner, i.name, makeWrapper(i, function))
+
+def disableInstrumentation() -> None:
+    """Puts the original functions back. The stats collected so far are kept."""
+    for (owner, name), function in originalFunctions.items():
+        setattr(owner, name, function)
+    originalFunctions.clear()
+
+def resetStats() -> None:
+    with statsLock:
+        stats.clear()
+        if traceEvents is not None:
+            traceEvents.clear()
+
+def formatStats() -> str:
+    """The stats as a table, slowest (by total time) first."""
+    with statsLock:
+        rows = sorted(stats.items(), key=lambda i: i[1].totalTime, reverse=True)
+        lines = [f"{'operation':<52} {'count':>8} {'total ms':>10} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'read':>10} {'written':>10}"]
+        for name, i in rows:
+            lines.append(f"{name:<52} {i.count:>8} {i.totalTime*1000:>10.2f} {i.getPercentile(50)*1000:>9.3f} {i.getPercentile(90)*1000:>9.3f} {i.getPercentile(99)*1000:>9.3f} {i.maxTime*1000:>9.3f} {formatBytes(i.bytesRead):>10} {formatBytes(i.bytesWritten):>10}")
+    return "\n".join(lines)
+
+def formatBytes(byteCount: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if byteCount < 1000:
+            return f"{byteCount:.0f} {unit}" if unit == "B" else f"{byteCount:.1f} {unit}"
+        byteCount /= 1000
+    return f"{byteCount:.1f} GB"
+
+def writeTrace(path: str) -> None:
+    """Writes the trace events and a summary of the stats to `path` as JSON."""
+    with statsLock:
+        trace = {
+            "traceEvents": traceEvents if traceEvents is not None else [],
+            "stats": {name: i.toDict() for name, i in stats.items()}
+        }
+    tempPath = path+".tmp"
+    with open(tempPath, "w", encoding="utf-8") as traceFile:
+        json.dump(trace, traceFile)
+    os.replace(tempPath, path)
+    logging.info(f"Wrote the trace to \"{path}\".")
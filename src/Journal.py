@@ -0,0 +1,267 @@
+import json
+import logging
+import os
+import threading
+
+from Waypoint import Waypoint
+from WaypointSync import getWaypointIdentity
+from XaeroWaypoints import XaeroWaypoints
+
+JOURNAL_SUFFIX: str = ".journal" # the journal for "XaeroWaypoints/Multiplayer_1.2.3.4" is "XaeroWaypoints/Multiplayer_1.2.3.4.journal"
+MAX_HISTORY: int = 1000 # how many changes are kept for undo when the journal is compacted
+COMPACT_SIZE: int = 16_000_000 # the journal is compacted on startup once it's bigger than this many bytes
+
+def getJournalPath(waypointDirectory: str) -> str:
+    return os.path.abspath(waypointDirectory)+JOURNAL_SUFFIX
+
+class Journal:
+    """An append-only log (one JSON object per line) of every change made to the waypoints of one world, written before the waypoint files are.\n
+    There are 4 kinds of records, each with an increasing "seq":\n
+    - "change": waypoints that were removed from and/or added to one dimension of one map, as their lines in the waypoint file (an edit is both)\n
+    - "undo"/"redo": the change with seq "target" was undone or redone\n
+    - "checkpoint": every record before this one is in the waypoint files. If it has a "map" and "dimension" it only covers the changes to that one file (ex. after an append)\n
+    Records are only buffered when they're made. `commit()` writes everything buffered so far with a single fsync (group commit),
+    so adding 10,000 waypoints in one import, or several requests to the daemon at once, is still only one fsync."""
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock() # for the buffer and history, records can be made from the daemon's worker threads
+        self.commitLock = threading.Lock() # only one commit writes at a time, the others wait and then usually have nothing left to write
+        self.pendingLines: list[str] = []
+        self.unsynced: bool = False # True if records were written with commit(sync=False) and haven't been fsynced yet
+        self.lastSeq: int = 0
+        self.checkpointSeq: int = 0
+        self.changes: dict[int, dict] = {} # seq -> "change" record, for undo and redo
+        self.undoStack: list[int] = [] # seqs of changes that can be undone, most recent last
+        self.redoStack: list[int] = [] # seqs of changes that were undone and can be redone, most recently undone last
+        self.unflushedRecords: list[dict] = [] # records after the last checkpoint when the journal was opened, see `recoverJournal`
+        self.replaying: bool = False # True while undoing, redoing or recovering, so the changes that makes aren't recorded as new changes
+        self.load()
+        self.journalFile = open(self.path, "a", encoding="utf-8")
+
+    def load(self) -> None:
+        try:
+            journalFile = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        records: list[dict] = []
+        validLength: int = 0
+        with journalFile:
+            for line in journalFile:
+                try:
+                    record = json.loads(line)
+                    record["seq"]
+                except (ValueError, KeyError, TypeError):
+                    logging.warning(f"The journal \"{self.path}\" ends with a partly written record (most likely from a crash), it will be ignored.")
+                    break
+                if not line.endswith(b"\n"): # the last line was cut off before its newline, so it was never committed
+                    break
+                records.append(record)
+                validLength += len(line)
+        if validLength != os.path.getsize(self.path):
+            with open(self.path, "r+b") as journalFile: # so new records don't end up on the same line as the broken one
+                journalFile.truncate(validLength)
+        for i in records:
+            self.applyToHistory(i)
+            self.lastSeq = i["seq"]
+            if i["type"] == "checkpoint" and "dimension" not in i:
+                self.checkpointSeq = i["seq"]
+                self.unflushedRecords = []
+            else:
+                self.unflushedRecords.append(i)
+        self.unflushedRecords = self.skipCheckpointedRecords(self.unflushedRecords)
+        if validLength > COMPACT_SIZE and len(self.unflushedRecords) == 0:
+            self.compact()
+
+    def getRecordFile(self, record: dict) -> tuple[str, str] | None:
+        """The (map, dimension) a change, undo or redo record changed. None if it's an undo or redo of a change that isn't in the journal anymore."""
+        if record["type"] == "change":
+            return (record["map"], record["dimension"])
+        change = self.changes.get(record.get("target"))
+        return None if change is None else (change["map"], change["dimension"])
+
+    def skipCheckpointedRecords(self, records: list[dict]) -> list[dict]:
+        """`records` without the checkpoints, and without the changes that a later checkpoint for their file says are already in it."""
+        fileCheckpoints: dict[tuple[str, str], int] = {}
+        for i in records:
+            if i["type"] == "checkpoint":
+                fileCheckpoints[(i["map"], i["dimension"])] = i["seq"]
+        return [i for i in records if i["type"] != "checkpoint" and i["seq"] > fileCheckpoints.get(self.getRecordFile(i), 0)]
+
+    def applyToHistory(self, record: dict) -> None:
+        if record["type"] == "change":
+            self.changes[record["seq"]] = record
+            self.undoStack.append(record["seq"])
+            self.redoStack.clear()
+        elif record["type"] == "undo":
+            if len(self.undoStack) > 0 and self.undoStack[-1] == record["target"]:
+                self.redoStack.append(self.undoStack.pop())
+        elif record["type"] == "redo":
+            if len(self.redoStack) > 0 and self.redoStack[-1] == record["target"]:
+                self.undoStack.append(self.redoStack.pop())
+
+    def compact(self) -> None:
+        """Rewrites the journal with only the last `MAX_HISTORY` changes that can still be undone (or redone). Only done when everything is in the waypoint files."""
+        keptSeqs = set(self.undoStack[-MAX_HISTORY:] + self.redoStack[-MAX_HISTORY:])
+        self.undoStack = [i for i in self.undoStack if i in keptSeqs]
+        self.redoStack = [i for i in self.redoStack if i in keptSeqs]
+        self.changes = {i: v for i, v in self.changes.items() if i in keptSeqs}
+        # the redo stack is written back as changes followed by their undos, most recently undone last
+        records = [self.changes[i] for i in self.undoStack] + [self.changes[i] for i in reversed(self.redoStack)]
+        records += [{"seq": self.lastSeq+1+i, "type": "undo", "target": v} for i, v in enumerate(self.redoStack)]
+        self.lastSeq += len(self.redoStack)+1
+        records.append({"seq": self.lastSeq, "type": "checkpoint"})
+        self.checkpointSeq = self.lastSeq
+        tempPath = self.path+".tmp"
+        with open(tempPath, "w", encoding="utf-8") as journalFile:
+            journalFile.write("".join([json.dumps(i)+"\n" for i in records]))
+            journalFile.flush()
+            os.fsync(journalFile.fileno())
+        os.replace(tempPath, self.path)
+        logging.debug(f"Compacted the journal \"{self.path}\" down to {len(records)} records.")
+
+    def record(self, record: dict) -> int:
+        """Buffers a record (it isn't written until `commit()`). Returns its seq."""
+        with self.lock:
+            self.lastSeq += 1
+            record = {"seq": self.lastSeq, **record}
+            self.applyToHistory(record)
+            self.pendingLines.append(json.dumps(record)+"\n")
+            return self.lastSeq
+
+    def recordChange(self, mapName: str, dimension: str, removed: list[Waypoint], added: list[Waypoint]) -> int | None:
+        if self.replaying or (len(removed) == 0 and len(added) == 0):
+            return None
+        return self.record({"type": "change", "map": mapName, "dimension": dimension, "removed": [i.toXaero() for i in removed], "added": [i.toXaero() for i in added]})
+
+    def commit(self, sync: bool = True) -> None:
+        """Writes every buffered record and fsyncs once. If another thread is committing, this waits for it, and then there's usually nothing left to write.\n
+        With `sync` False the records are only handed to the OS, so they survive the program crashing but not the computer (until the next commit that does fsync)."""
+        with self.commitLock:
+            with self.lock:
+                if len(self.pendingLines) == 0 and not (sync and self.unsynced):
+                    return
+                pendingLines = self.pendingLines
+                self.pendingLines = []
+            self.journalFile.write("".join(pendingLines))
+            self.journalFile.flush()
+            if sync:
+                os.fsync(self.journalFile.fileno())
+            self.unsynced = not sync
+
+    def checkpoint(self) -> None:
+        """Records that every change so far is in the waypoint files, so recovery doesn't have to look at anything before this."""
+        with self.lock:
+            if self.checkpointSeq == self.lastSeq:
+                return
+        self.checkpointSeq = self.record({"type": "checkpoint"})
+        self.commit()
+
+    def checkpointFile(self, mapName: str, dimension: str) -> None:
+        """Records that every change so far to one waypoint file is in it. It's written without an fsync, since losing it (only if the computer crashes) just means
+        the changes are replayed again, which does nothing unless they were changed in-game since (see `applyChange`)."""
+        if self.replaying: # the changes being replayed after this one aren't in the file yet
+            return
+        with self.lock:
+            if self.checkpointSeq == self.lastSeq:
+                return
+        self.record({"type": "checkpoint", "map": mapName, "dimension": dimension})
+        self.commit(sync=False)
+
+    def close(self) -> None:
+        self.commit()
+        self.journalFile.close()
+
+def parseWaypointLines(lines: list[str]) -> list[Waypoint]:
+    return [Waypoint.fromXaero(i) for i in lines]
+
+def applyChange(xaeroWaypoints: XaeroWaypoints, change: dict, inverse: bool = False) -> None:
+    """Applies a "change" record to the waypoints in memory (or takes it back, if `inverse` is True). The waypoint files are written by the next `flush()`.\n
+    This can be run more than once for the same change without doing it twice: waypoints that are already gone aren't removed and ones that are already there aren't added,
+    matched by their name and coordinates (see `getWaypointIdentity`) and then their other fields."""
+    toRemove = parseWaypointLines(change["added"] if inverse else change["removed"])
+    toAdd = parseWaypointLines(change["removed"] if inverse else change["added"])
+    previousMap = xaeroWaypoints.currentMap
+    if change["map"] != previousMap:
+        xaeroWaypoints.switchMap(change["map"]) # it's in the map cache if it was used recently, see switchMap
+    try:
+        waypointSet = xaeroWaypoints.getWaypointSet(change["dimension"])
+        xaeroWaypoints.syncExternalChanges([change["dimension"]])
+        existing: dict[tuple[str, int, int, int], list[Waypoint]] = {}
+        for i in waypointSet.waypoints:
+            existing.setdefault(getWaypointIdentity(i), []).append(i)
+        removedPyPoints: list[Waypoint] = []
+        for i in toRemove:
+            matches = existing.get(getWaypointIdentity(i), [])
+            for j, v in enumerate(matches):
+                if v == i:
+                    removedPyPoints.append(matches.pop(j))
+                    break
+        addedPyPoints = [i for i in toAdd if i not in existing.get(getWaypointIdentity(i), [])]
+        if len(removedPyPoints) > 0:
+            xaeroWaypoints.replaceWaypoints(removedPyPoints, addedPyPoints, change["dimension"])
+        elif len(addedPyPoints) > 0:
+            xaeroWaypoints.addWaypoints(addedPyPoints, change["dimension"])
+    finally:
+        if xaeroWaypoints.currentMap != previousMap:
+            xaeroWaypoints.switchMap(previousMap)
+
+def undo(xaeroWaypoints: XaeroWaypoints, journal: Journal) -> dict | None:
+    """Takes back the most recent change that hasn't been undone yet. Returns that change, or None if there's nothing to undo."""
+    if len(journal.undoStack) == 0:
+        return None
+    change = journal.changes[journal.undoStack[-1]]
+    journal.record({"type": "undo", "target": change["seq"]}) # recorded first, like every other change
+    journal.replaying = True
+    try:
+        applyChange(xaeroWaypoints, change, inverse=True)
+    finally:
+        journal.replaying = False
+    return change
+
+def redo(xaeroWaypoints: XaeroWaypoints, journal: Journal) -> dict | None:
+    """Makes the most recently undone change again. Returns that change, or None if there's nothing to redo."""
+    if len(journal.redoStack) == 0:
+        return None
+    change = journal.changes[journal.redoStack[-1]]
+    journal.record({"type": "redo", "target": change["seq"]}) # recorded first, like every other change
+    journal.replaying = True
+    try:
+        applyChange(xaeroWaypoints, change)
+    finally:
+        journal.replaying = False
+    return change
+
+def recoverJournal(xaeroWaypoints: XaeroWaypoints, journal: Journal) -> int:
+    """Replays every record after the last checkpoint (the changes that might not have made it into the waypoint files before the program stopped) and writes the files.
+    Since `applyChange` skips anything that's already been done, it doesn't matter which of them actually made it. Returns how many records were replayed."""
+    records = journal.unflushedRecords
+    journal.unflushedRecords = []
+    if len(records) == 0:
+        return 0
+    journal.replaying = True
+    try:
+        for i in records:
+            if i["type"] == "change":
+                applyChange(xaeroWaypoints, i)
+            elif i["type"] in ("undo", "redo") and i["target"] in journal.changes:
+                applyChange(xaeroWaypoints, journal.changes[i["target"]], inverse=i["type"] == "undo")
+    finally:
+        journal.replaying = False
+    xaeroWaypoints.flush()
+    journal.checkpoint() # flush() only does this if `xaeroWaypoints` owns the journal
+    return len(records)
+
+def isJournalFor(journal: Journal | None, waypointDirectory: str) -> bool:
+    """Whether `journal` is the journal of the world in `waypointDirectory`."""
+    return journal is not None and os.path.normcase(journal.path) == os.path.normcase(getJournalPath(waypointDirectory))
+
+def shareJournal(xaeroWaypoints: XaeroWaypoints, journal: Journal) -> None:
+    """Records the changes to `xaeroWaypoints` (another map of the same world) in a journal that's already open, without it taking the journal over.
+    Every map of a world has to use the same `Journal` object, two of them appending to the same file would mix up their seqs."""
+    xaeroWaypoints.journal = journal
+    xaeroWaypoints.ownsJournal = False
+
+def openJournal(xaeroWaypoints: XaeroWaypoints) -> int:
+    """Opens the journal of `xaeroWaypoints`'s world for it (it's closed along with it) and recovers anything in it. Returns how many records were recovered."""
+    xaeroWaypoints.journal = Journal(getJournalPath(xaeroWaypoints.waypointDirectory))
+    return recoverJournal(xaeroWaypoints, xaeroWaypoints.journal)
@@ -0,0 +1,159 @@
+import copy
+import logging
+import math
+import re
+import time
+from dataclasses import dataclass
+from typing import Tuple
+
+from CoordinateConverter import CoordinateConverter
+from SpatialIndex import SpatialIndex
+from Waypoint import Waypoint
+
+DEFAULT_PORTAL_COST: float = 200 # how many blocks of walking it's worth to get to a portal on each end and go through them, added to every leg that goes through the nether
+NEIGHBOUR_COUNT: int = 10 # how many of each waypoint's nearest waypoints 2-opt tries connecting it to
+DEFAULT_MAX_SECONDS: float = 10 # 2-opt stops after this long even if it could still improve the route, the route is still valid (just a little longer)
+ROUTE_NAME_PATTERN = re.compile(r"^\d+\. ") # the number "route --write" puts in front of names, so routing the same waypoints again doesn't stack them up
+
+@dataclass
+class Route:
+    """Waypoints in the order they should be visited, starting from the route's start point."""
+    waypoints: list[Waypoint]
+    legCosts: list[float] # how far it is to each waypoint from the one before it (or from the start, for the first one)
+    legsViaNether: list[bool] # whether it's shorter to get to each waypoint through the nether
+
+    @property
+    def totalCost(self) -> float:
+        return sum(self.legCosts)
+
+class RoutePlanner:
+    """Orders waypoints into a short path that visits all of them (the travelling salesman problem, without coming back to the start).\n
+    The path is built with nearest neighbour (using a `SpatialIndex` so each step doesn't look at every waypoint) and then improved with 2-opt,
+    only trying to connect each waypoint to its nearest few neighbours so each pass is O(n) instead of O(n^2).\n
+    If `useNether` is True every leg can also be travelled on the nether roof: 1/8 of the distance (see `CoordinateConverter`), plus `portalCost`."""
+    def __init__(self, pyPoints: list[Waypoint], start: Tuple[int, int] = (0, 0), useNether: bool = False, portalCost: float = DEFAULT_PORTAL_COST) -> None:
+        self.pyPoints = pyPoints
+        # node 0 is the start, node i is pyPoints[i-1]
+        self.xs: list[int] = [start[0]] + [i.x for i in pyPoints]
+        self.zs: list[int] = [start[1]] + [i.z for i in pyPoints]
+        self.useNether = useNether
+        self.portalCost = portalCost
+        if useNether:
+            netherCoordinates = CoordinateConverter.overworldToNetherBatch([(x, 0, z) for x, z in zip(self.xs, self.zs)])
+            self.netherXs: list[int] = [i[0] for i in netherCoordinates]
+            self.netherZs: list[int] = [i[2] for i in netherCoordinates]
+
+    def getCost(self, a: int, b: int) -> float:
+        """How far it is from node `a` to node `b`. This only goes up as the distance between them does (even through the nether), so the nearest node is always the cheapest one to go to."""
+        distance = math.hypot(self.xs[a]-self.xs[b], self.zs[a]-self.zs[b])
+        if self.useNether:
+            return min(distance, math.hypot(self.netherXs[a]-self.netherXs[b], self.netherZs[a]-self.netherZs[b]) + self.portalCost)
+        return distance
+
+    def isViaNether(self, a: int, b: int) -> bool:
+        return self.useNether and self.getCost(a, b) < math.hypot(self.xs[a]-self.xs[b], self.zs[a]-self.zs[b])
+
+    def createSpatialIndex(self) -> tuple[SpatialIndex, dict[int, int]]:
+        """A spatial index of every waypoint, and id(waypoint) -> node. The cells are sized so there's a few waypoints in each one."""
+        #* the size comes from the area the middle 90% of the waypoints are in, not all of them. with the full bounding box one waypoint far away from the rest (or the start being far away) made the cells huge, and then every waypoint was in the same cell
+        xs, zs = sorted(self.xs), sorted(self.zs)
+        low, high = len(xs)//20, len(xs)-1-len(xs)//20
+        width = xs[high]-xs[low]+1
+        height = zs[high]-zs[low]+1
+        spatialIndex = SpatialIndex(max(16, int(math.sqrt(width*height/max(1, high-low))*2)))
+        spatialIndex.insertMany(self.pyPoints)
+        return spatialIndex, {id(v): i+1 for i, v in enumerate(self.pyPoints)}
+
+    def buildNearestNeighbourPath(self) -> list[int]:
+        """Starting from the start node, keeps going to the closest node that hasn't been visited yet."""
+        spatialIndex, nodes = self.createSpatialIndex()
+        path: list[int] = [0]
+        x, z = self.xs[0], self.zs[0]
+        while len(spatialIndex) > 0:
+            waypoint = spatialIndex.near(x, z, limit=1)[0][1]
+            spatialIndex.remove(waypoint)
+            path.append(nodes[id(waypoint)])
+            x, z = waypoint.x, waypoint.z
+        return path
+
+    def getNeighbours(self) -> list[list[int]]:
+        """Each node's closest `NEIGHBOUR_COUNT` nodes (other than the start), closest first."""
+        spatialIndex, nodes = self.createSpatialIndex()
+        neighbours: list[list[int]] = []
+        for node in range(len(self.xs)):
+            nearby = spatialIndex.near(self.xs[node], self.zs[node], limit=NEIGHBOUR_COUNT+1)
+            neighbours.append([nodes[id(i[1])] for i in nearby if nodes[id(i[1])] != node][:NEIGHBOUR_COUNT])
+        return neighbours
+
+    def improveWithTwoOpt(self, path: list[int], maxSeconds: float = DEFAULT_MAX_SECONDS) -> int:
+        """Improves `path` in place by repeatedly swapping two legs for two shorter ones (and reversing the part of the path between them). Returns how many swaps were made."""
+        getCost = self.getCost
+        neighbours = self.getNeighbours()
+        positions: list[int] = [0]*len(path)
+        for i, v in enumerate(path):
+            positions[v] = i
+        lastPosition = len(path)-1
+        deadline = time.perf_counter()+maxSeconds
+
+        def reverse(start: int, end: int) -> None:
+            path[start:end+1] = path[start:end+1][::-1]
+            for i in range(start, end+1):
+                positions[path[i]] = i
+
+        swapCount: int = 0
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            for a in range(len(path)):
+                i = positions[a]
+                for c in neighbours[a]:
+                    costAC = getCost(a, c)
+                    j = positions[c]
+                    # a's next leg, swapped for a->c. everything from a's next node to c is reversed
+                    if i < lastPosition and j > i+1:
+                        nextA = path[i+1]
+                        if j == lastPosition: # c is the end of the path, so there's no leg after it to reconnect
+                            delta = costAC - getCost(a, nextA)
+                        else:
+                            nextC = path[j+1]
+                            delta = costAC + getCost(nextA, nextC) - getCost(a, nextA) - getCost(c, nextC)
+                        if delta < -1e-9:
+                            reverse(i+1, j)
+                            swapCount += 1
+                            improved = True
+                            break
+                    # a's previous leg, swapped for c->a. everything from c to a's previous node is reversed
+                    elif 0 < j < i-1:
+                        previousA, previousC = path[i-1], path[j-1]
+                        delta = costAC + getCost(previousC, previousA) - getCost(previousA, a) - getCost(previousC, c)
+                        if delta < -1e-9:
+                            reverse(j, i-1)
+                            swapCount += 1
+                            improved = True
+                            break
+                if time.perf_counter() > deadline:
+                    logging.debug("2-opt ran out of time, the route might not be as short as it could be.")
+                    break
+        return swapCount
+
+    def plan(self, maxSeconds: float = DEFAULT_MAX_SECONDS) -> Route:
+        if len(self.pyPoints) == 0:
+            return Route([], [], [])
+        path = self.buildNearestNeighbourPath()
+        swapCount = self.improveWithTwoOpt(path, maxSeconds)
+        logging.debug(f"2-opt made {swapCount} swaps.")
+        return Route(
+            [self.pyPoints[i-1] for i in path[1:]],
+            [self.getCost(path[i-1], path[i]) for i in range(1, len(path))],
+            [self.isViaNether(path[i-1], path[i]) for i in range(1, len(path))]
+        )
+
+def numberRoute(route: Route) -> list[Waypoint]:
+    """Copies of the route's waypoints with their place in the route in front of their name (ex. "3. Village") and as their initials."""
+    numberedPyPoints: list[Waypoint] = []
+    for i, v in enumerate(route.waypoints, start=1):
+        numberedPyPoint = copy.copy(v)
+        numberedPyPoint.name = f"{i}. {ROUTE_NAME_PATTERN.sub('', v.name)}"
+        numberedPyPoint.initials = str(i)
+        numberedPyPoints.append(numberedPyPoint)
+    return numberedPyPoints
@@ -0,0 +1,163 @@
+import math
+from typing import Iterator
+
+from Waypoint import Waypoint
+
+class SpatialIndex:
+    """A uniform grid over the X/Z plane for finding waypoints near a point without looking at every waypoint in a dimension.\n
+    Distances are horizontal (X and Z only), since that's what matters when looking for a structure or when walking to one.\n
+    Waypoints are bucketed by which `cellSize` x `cellSize` block square they're in, so a query only has to look at the cells its radius overlaps."""
+    def __init__(self, cellSize: int = 256) -> None:
+        self.cellSize = cellSize
+        self.cells: dict[tuple[int, int], list[Waypoint]] = {}
+        self.count: int = 0
+        # the range of cell coordinates that have a waypoint in them, so unbounded searches know when to stop
+        self.minCellX: int = 0
+        self.maxCellX: int = -1
+        self.minCellZ: int = 0
+        self.maxCellZ: int = -1
+        # how many non-empty cells are in each column/row of cells, so the range above can shrink when the cells on its edge are emptied
+        self.columnCounts: dict[int, int] = {}
+        self.rowCounts: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def getCell(self, x: int, z: int) -> tuple[int, int]:
+        return (x // self.cellSize, z // self.cellSize)
+
+    def insert(self, waypoint: Waypoint) -> None:
+        cellX, cellZ = self.getCell(waypoint.x, waypoint.z)
+        cell = self.cells.get((cellX, cellZ))
+        if cell is None:
+            cell = self.cells[(cellX, cellZ)] = []
+            if self.maxCellX < self.minCellX: # this is the first cell
+                self.minCellX = self.maxCellX = cellX
+                self.minCellZ = self.maxCellZ = cellZ
+            else:
+                self.minCellX = min(self.minCellX, cellX)
+                self.maxCellX = max(self.maxCellX, cellX)
+                self.minCellZ = min(self.minCellZ, cellZ)
+                self.maxCellZ = max(self.maxCellZ, cellZ)
+            self.columnCounts[cellX] = self.columnCounts.get(cellX, 0) + 1
+            self.rowCounts[cellZ] = self.rowCounts.get(cellZ, 0) + 1
+        cell.append(waypoint)
+        self.count += 1
+
+    def insertMany(self, waypoints: list[Waypoint]) -> None:
+        for i in waypoints:
+            self.insert(i)
+
+    def remove(self, waypoint: Waypoint) -> bool:
+        """Removes this exact waypoint object (not just one that's equal to it). Returns False if it isn't in the index."""
+        cellKey = self.getCell(waypoint.x, waypoint.z)
+        cell = self.cells.get(cellKey)
+        if cell is None:
+            return False
+        for i, v in enumerate(cell):
+            if v is waypoint:
+                del cell[i]
+                if len(cell) == 0:
+                    del self.cells[cellKey]
+                    self.removeFromBounds(*cellKey)
+                self.count -= 1
+                return True
+        return False
+
+    def removeFromBounds(self, cellX: int, cellZ: int) -> None:
+        """Updates the range of cells that have waypoints in them after the cell at (cellX, cellZ) was emptied.\n
+        Otherwise after a lot of removals (like when building a route, which removes every waypoint one at a time) unbounded searches would keep looking through rings of cells that are all empty."""
+        self.columnCounts[cellX] -= 1
+        if self.columnCounts[cellX] == 0:
+            del self.columnCounts[cellX]
+            if len(self.columnCounts) == 0:
+                self.minCellX, self.maxCellX = 0, -1
+            elif cellX == self.minCellX:
+                self.minCellX = min(self.columnCounts)
+            elif cellX == self.maxCellX:
+                self.maxCellX = max(self.columnCounts)
+        self.rowCounts[cellZ] -= 1
+        if self.rowCounts[cellZ] == 0:
+            del self.rowCounts[cellZ]
+            if len(self.rowCounts) == 0:
+                self.minCellZ, self.maxCellZ = 0, -1
+            elif cellZ == self.minCellZ:
+                self.minCellZ = min(self.rowCounts)
+            elif cellZ == self.maxCellZ:
+                self.maxCellZ = max(self.rowCounts)
+
+    def clear(self) -> None:
+        self.__init__(self.cellSize)
+
+    def iterCellRing(self, centerX: int, centerZ: int, ring: int) -> Iterator[list[Waypoint]]:
+        """Yields the cells that are exactly `ring` cells away from the center cell (a square outline around it)."""
+        if ring == 0:
+            cell = self.cells.get((centerX, centerZ))
+            if cell is not None:
+                yield cell
+            return
+        for cellX in range(centerX-ring, centerX+ring+1):
+            for cellZ in (centerZ-ring, centerZ+ring):
+                cell = self.cells.get((cellX, cellZ))
+                if cell is not None:
+                    yield cell
+        for cellZ in range(centerZ-ring+1, centerZ+ring):
+            for cellX in (centerX-ring, centerX+ring):
+                cell = self.cells.get((cellX, cellZ))
+                if cell is not None:
+                    yield cell
+
+    def near(self, x: int, z: int, radius: float | None = None, limit: int | None = None) -> list[tuple[float, Waypoint]]:
+        """Returns (distance, waypoint) pairs for waypoints within `radius` blocks of (x, z), closest first.\n
+        Either `radius` or `limit` can be None, but if both are None every waypoint in the index is returned."""
+        if self.count == 0 or (limit is not None and limit <= 0):
+            return []
+        centerX, centerZ = self.getCell(x, z)
+        # the furthest ring that could have anything in it
+        maxRing = max(abs(centerX-self.minCellX), abs(centerX-self.maxCellX), abs(centerZ-self.minCellZ), abs(centerZ-self.maxCellZ))
+        if radius is not None:
+            maxRing = min(maxRing, math.ceil(radius/self.cellSize))
+            radiusSquared = radius*radius
+
+        found: list[tuple[float, Waypoint]] = []
+        for ring in range(maxRing+1):
+            #* if the waypoints are spread out (or one of them is really far away) there can be a lot of empty rings in the way. once going through the rings would look up more cells than there are non-empty ones, the rest are just checked directly
+            if (2*ring+1)**2 > 4*len(self.cells):
+                for (cellX, cellZ), cell in self.cells.items():
+                    if max(abs(cellX-centerX), abs(cellZ-centerZ)) < ring: # already looked at
+                        continue
+                    for waypoint in cell:
+                        distanceSquared = (waypoint.x-x)**2 + (waypoint.z-z)**2
+                        if radius is None or distanceSquared <= radiusSquared:
+                            found.append((distanceSquared, waypoint))
+                break
+            for cell in self.iterCellRing(centerX, centerZ, ring):
+                for waypoint in cell:
+                    distanceSquared = (waypoint.x-x)**2 + (waypoint.z-z)**2
+                    if radius is None or distanceSquared <= radiusSquared:
+                        found.append((distanceSquared, waypoint))
+            # everything in the next ring is at least ring*cellSize blocks away, so once we have enough waypoints closer than that we can stop
+            if limit is not None and len(found) >= limit:
+                found.sort(key=lambda i: i[0])
+                del found[limit:]
+                if found[-1][0] <= (ring*self.cellSize)**2:
+                    break
+        found.sort(key=lambda i: i[0])
+        if limit is not None:
+            del found[limit:]
+        return [(math.sqrt(i[0]), i[1]) for i in found]
+
+    def anyWithin(self, x: int, z: int, radius: float) -> Waypoint | None:
+        """Returns a waypoint within `radius` blocks of (x, z) if there is one, or None. Faster than `near` since it stops at the first match."""
+        radiusSquared = radius*radius
+        minCellX, minCellZ = self.getCell(math.floor(x-radius), math.floor(z-radius))
+        maxCellX, maxCellZ = self.getCell(math.ceil(x+radius), math.ceil(z+radius))
+        for cellX in range(minCellX, maxCellX+1):
+            for cellZ in range(minCellZ, maxCellZ+1):
+                cell = self.cells.get((cellX, cellZ))
+                if cell is None:
+                    continue
+                for waypoint in cell:
+                    if (waypoint.x-x)**2 + (waypoint.z-z)**2 <= radiusSquared:
+                        return waypoint
+        return None
@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+
+# booleans have to be written lowercase or xaero won't read them
+XAERO_BOOLEANS: dict[bool, str] = {True: "true", False: "false"}
+# the fields that are almost always small numbers (Y, color, type, yaw, visibility) are looked up here instead of going through int(), which is the slowest part of parsing a line. anything not in here still goes through int()
+SMALL_INTS: dict[str, int | None] = {str(i): i for i in range(-2048, 2048)}
+SMALL_INTS["~"] = None # a waypoint without a Y
+
+@dataclass(slots=True)
+class Waypoint:
+    """A single Xaero waypoint (one `waypoint:` line in a waypoint file).\n
+    This uses __slots__ and real ints/bools instead of a dict of strings, which keeps large waypoint files a lot smaller in memory.\n
+    Converting a line with `fromXaero` and back with `toXaero` gives back the exact same line."""
+    name: str
+    initials: str
+    x: int
+    y: int | None # None is written as "~", that's what xaero uses for waypoints that don't have a Y
+    z: int
+    color: int
+    disabled: bool = False
+    type: int = 0
+    set: str = "gui.xaero_default"
+    rotateOnTp: bool = False
+    tpYaw: int = 0
+    visibilityType: int = 0
+    destination: bool = False
+    extraFields: tuple[str, ...] = () # anything after the destination field, in case a newer version of xaero adds more. they're kept so they aren't lost when the file is rewritten
+
+    @classmethod
+    def fromXaero(cls, xaeroFormat: str) -> "Waypoint":
+        """Raises ValueError (or IndexError if there aren't enough fields) if the line is malformed."""
+        waypointData: list[str] = xaeroFormat.split(":")
+        smallInts = SMALL_INTS
+        y, color, waypointType, tpYaw, visibilityType = waypointData[4], waypointData[6], waypointData[8], waypointData[11], waypointData[12]
+        return cls(
+            waypointData[1],
+            waypointData[2],
+            int(waypointData[3]),
+            smallInts[y] if y in smallInts else int(y),
+            int(waypointData[5]),
+            smallInts[color] if color in smallInts else int(color),
+            waypointData[7] == "true",
+            smallInts[waypointType] if waypointType in smallInts else int(waypointType),
+            waypointData[9],
+            waypointData[10] == "true",
+            smallInts[tpYaw] if tpYaw in smallInts else int(tpYaw),
+            smallInts[visibilityType] if visibilityType in smallInts else int(visibilityType),
+            waypointData[13] == "true",
+            tuple(waypointData[14:]) if len(waypointData) > 14 else ()
+        )
+
+    def toXaero(self) -> str:
+        xaeroFormat = f"waypoint:{self.name}:{self.initials}:{self.x}:{'~' if self.y is None else self.y}:{self.z}:{self.color}:{XAERO_BOOLEANS[self.disabled]}:{self.type}:{self.set}:{XAERO_BOOLEANS[self.rotateOnTp]}:{self.tpYaw}:{self.visibilityType}:{XAERO_BOOLEANS[self.destination]}"
+        if self.extraFields:
+            xaeroFormat += ":"+":".join(self.extraFields)
+        return xaeroFormat
+
+    def coordinateString(self) -> str:
+        """The coordinates as "(X, Y, Z)" for printing, with "~" for a missing Y (instead of "None")."""
+        return f"({self.x}, {'~' if self.y is None else self.y}, {self.z})"
@@ -0,0 +1,117 @@
+import csv
+import itertools
+import logging
+import os
+from dataclasses import dataclass
+from json.encoder import encode_basestring_ascii as toJsonString # what json.dumps uses for strings, without the overhead of going through json.dumps for each one
+from typing import Iterator, TextIO, Tuple
+
+from Waypoint import XAERO_BOOLEANS, Waypoint
+from XaeroWaypoints import XaeroWaypoints, iterXaeroWaypointFile
+
+EXPORT_FORMATS: tuple[str, ...] = ("csv", "jsonl", "geojson")
+# what each format is guessed from if it isn't given
+EXPORT_EXTENSIONS: dict[str, str] = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".geojson": "geojson", ".json": "geojson"}
+DIMENSION_NAMES: dict[str, str] = {XaeroWaypoints.OVERWORLD: "overworld", XaeroWaypoints.NETHER: "nether", XaeroWaypoints.THE_END: "the_end"}
+CSV_HEADER: list[str] = ["name", "initials", "x", "y", "z", "dimension", "color", "disabled", "set"] # a waypoint without a Y (see Waypoint.y) has an empty y, or null in json
+CHUNK_SIZE: int = 10_000 # waypoints are converted, filtered and written this many at a time
+WRITE_BUFFER_SIZE: int = 1_048_576
+
+@dataclass
+class ExportFilter:
+    """Which waypoints to export, by their (exported, so normalized if that's on) X and Z. Either a bounding box, a radius around a point, or both."""
+    boundingBox: Tuple[int, int, int, int] | None = None # min X, min Z, max X, max Z (inclusive)
+    center: Tuple[int, int] | None = None
+    radius: float | None = None
+
+    def getMatchingIndexes(self, coordinates: list[Tuple[int, int | None, int]]) -> list[int]:
+        matchingIndexes = range(len(coordinates))
+        if self.boundingBox is not None:
+            minX, minZ, maxX, maxZ = self.boundingBox
+            matchingIndexes = [i for i in matchingIndexes if minX <= coordinates[i][0] <= maxX and minZ <= coordinates[i][2] <= maxZ]
+        if self.center is not None and self.radius is not None:
+            centerX, centerZ = self.center
+            radiusSquared = self.radius*self.radius # so there's no sqrt per waypoint
+            matchingIndexes = [i for i in matchingIndexes if (coordinates[i][0]-centerX)**2 + (coordinates[i][2]-centerZ)**2 <= radiusSquared]
+        return list(matchingIndexes)
+
+def getExportFormat(path: str) -> str | None:
+    """Guesses the format from the file extension. Returns None if it's not one we know."""
+    return EXPORT_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+
+def iterWaypointChunks(xaeroWaypoints: XaeroWaypoints, dimension: str) -> Iterator[list[Waypoint]]:
+    """The waypoints in `dimension`, `CHUNK_SIZE` at a time. If the dimension is already loaded they come from memory, otherwise the file is read as it goes so it's never all in memory at once."""
+    if dimension in xaeroWaypoints.waypointSets:
+        waypoints = xaeroWaypoints.waypointSets[dimension].waypoints
+        for i in range(0, len(waypoints), CHUNK_SIZE):
+            yield waypoints[i:i+CHUNK_SIZE]
+        return
+    try:
+        waypointIterator = iterXaeroWaypointFile(xaeroWaypoints.getWaypointFilePath(dimension))
+        while True:
+            chunk = list(itertools.islice(waypointIterator, CHUNK_SIZE))
+            if len(chunk) == 0:
+                return
+            yield chunk
+    except FileNotFoundError:
+        return # no waypoints in this dimension
+
+def normalizeCoordinates(coordinates: list[Tuple[int, int | None, int]], dimension: str, normalizeTo: str | None) -> list[Tuple[int, int | None, int]]:
+    """Converts a chunk of coordinates from `dimension` to `normalizeTo` ("overworld" or "nether"), so waypoints from both can be shown on the same map. The end is never converted.
+
+    Only X and Z are converted, every waypoint keeps its own Y (or lack of one). CoordinateConverter's batch functions aren't used since they set the Y for a new waypoint."""
+    #* waypoint coordinates are always ints, so shifting by 3 is the same as multiplying by 8 or flooring x/8 (see CoordinateConverter)
+    if normalizeTo == "overworld" and dimension == XaeroWaypoints.NETHER:
+        return [(x << 3, y, z << 3) for x, y, z in coordinates]
+    if normalizeTo == "nether" and dimension == XaeroWaypoints.OVERWORLD:
+        return [(x >> 3, y, z >> 3) for x, y, z in coordinates]
+    return coordinates
+
+def writeCsvRows(exportFile: TextIO, waypoints: list[Waypoint], coordinates: list[Tuple[int, int | None, int]], dimensionName: str) -> None:
+    csv.writer(exportFile).writerows([(waypoint.name, waypoint.initials, x, y, z, dimensionName, waypoint.color, XAERO_BOOLEANS[waypoint.disabled], waypoint.set) for waypoint, (x, y, z) in zip(waypoints, coordinates)])
+
+def getJsonProperties(waypoint: Waypoint, dimensionName: str) -> str:
+    return f"\"name\": {toJsonString(waypoint.name)}, \"initials\": {toJsonString(waypoint.initials)}, \"dimension\": \"{dimensionName}\", \"color\": {waypoint.color}, \"disabled\": {'true' if waypoint.disabled else 'false'}, \"set\": {toJsonString(waypoint.set)}"
+
+def writeJsonLinesRows(exportFile: TextIO, waypoints: list[Waypoint], coordinates: list[Tuple[int, int | None, int]], dimensionName: str) -> None:
+    #* these are put together by hand instead of with json.dumps, since the fields are always the same and it's several times faster
+    exportFile.write("".join([f"{{{getJsonProperties(waypoint, dimensionName)}, \"x\": {x}, \"y\": {'null' if y is None else y}, \"z\": {z}}}\n" for waypoint, (x, y, z) in zip(waypoints, coordinates)]))
+
+def writeGeoJsonRows(exportFile: TextIO, waypoints: list[Waypoint], coordinates: list[Tuple[int, int | None, int]], dimensionName: str, first: bool) -> None:
+    # the point is [X, Z] with Z as is (south is positive, like in game), the Y is in the properties
+    features = ",\n".join([f"{{\"type\": \"Feature\", \"geometry\": {{\"type\": \"Point\", \"coordinates\": [{x}, {z}]}}, \"properties\": {{{getJsonProperties(waypoint, dimensionName)}, \"y\": {'null' if y is None else y}}}}}" for waypoint, (x, y, z) in zip(waypoints, coordinates)])
+    exportFile.write(features if first else ",\n"+features)
+
+def exportWaypoints(xaeroWaypoints: XaeroWaypoints, path: str, exportFormat: str, dimensions: list[str], normalizeTo: str | None = None, exportFilter: ExportFilter | None = None) -> int:
+    """Writes the waypoints in `dimensions` to `path` as CSV, JSON Lines or GeoJSON (see `EXPORT_FORMATS`). Returns how many were exported.\n
+    Waypoints are read, converted and written in chunks, so the whole export is never in memory at once (unless the dimension was already loaded).
+    The file is written next to `path` first and then moved over it, so it's never left half-written."""
+    xaeroWaypoints.flush() # so waypoints that haven't been written yet are in the files we read from
+    tempPath = path+".tmp"
+    exportedCount: int = 0
+    with open(tempPath, "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER_SIZE) as exportFile:
+        if exportFormat == "csv":
+            csv.writer(exportFile).writerow(CSV_HEADER)
+        elif exportFormat == "geojson":
+            exportFile.write("{\"type\": \"FeatureCollection\", \"features\": [\n")
+        for dimension in dimensions:
+            dimensionName = DIMENSION_NAMES[dimension]
+            for chunk in iterWaypointChunks(xaeroWaypoints, dimension):
+                coordinates = normalizeCoordinates([(i.x, i.y, i.z) for i in chunk], dimension, normalizeTo)
+                if exportFilter is not None:
+                    matchingIndexes = exportFilter.getMatchingIndexes(coordinates)
+                    chunk, coordinates = [chunk[i] for i in matchingIndexes], [coordinates[i] for i in matchingIndexes]
+                if len(chunk) == 0:
+                    continue
+                if exportFormat == "csv":
+                    writeCsvRows(exportFile, chunk, coordinates, dimensionName)
+                elif exportFormat == "jsonl":
+                    writeJsonLinesRows(exportFile, chunk, coordinates, dimensionName)
+                else:
+                    writeGeoJsonRows(exportFile, chunk, coordinates, dimensionName, exportedCount == 0)
+                exportedCount += len(chunk)
+        if exportFormat == "geojson":
+            exportFile.write("\n]}\n")
+    os.replace(tempPath, path)
+    logging.debug(f"Exported {exportedCount} waypoints to \"{path}\".")
+    return exportedCount
@@ -0,0 +1,84 @@
+import copy
+import logging
+from dataclasses import dataclass, field
+
+from Waypoint import Waypoint
+from XaeroWaypoints import XaeroWaypoints
+
+def getWaypointIdentity(waypoint: Waypoint) -> tuple[str, int, int, int]:
+    """What makes two waypoints in the same dimension "the same waypoint": their name and coordinates. Waypoints with the same identity but different other fields (color, initials...) are the same waypoint that's been changed."""
+    return (waypoint.name, waypoint.x, waypoint.y, waypoint.z)
+
+def indexWaypoints(pyPoints: list[Waypoint]) -> tuple[dict[tuple[str, int, int, int], Waypoint], dict[tuple[str, int, int, int], list[Waypoint]]]:
+    """Returns (identity -> the first waypoint with it, identity -> the other waypoints with it). The same waypoint can be in a file more than once, but it's rare, so the duplicates are kept separately to keep the first dict fast."""
+    keyedPyPoints: dict[tuple[str, int, int, int], Waypoint] = {}
+    duplicates: dict[tuple[str, int, int, int], list[Waypoint]] = {}
+    for i in pyPoints:
+        key = (i.name, i.x, i.y, i.z) # same as getWaypointIdentity, inlined since this runs once per waypoint
+        if keyedPyPoints.setdefault(key, i) is not i:
+            duplicates.setdefault(key, []).append(i)
+    return keyedPyPoints, duplicates
+
+@dataclass
+class WaypointDiff:
+    """What has to happen to one dimension of the target for it to match the source."""
+    dimension: str
+    added: list[Waypoint] = field(default_factory=list) # in the source but not the target
+    removed: list[Waypoint] = field(default_factory=list) # in the target but not the source (these are the target's waypoints)
+    changed: list[tuple[Waypoint, Waypoint]] = field(default_factory=list) # (the target's waypoint, the source's waypoint) for waypoints in both that aren't exactly the same
+
+    @property
+    def empty(self) -> bool:
+        return len(self.added) == 0 and len(self.removed) == 0 and len(self.changed) == 0
+
+def diffWaypoints(sourcePyPoints: list[Waypoint], targetPyPoints: list[Waypoint], dimension: str) -> WaypointDiff:
+    """Compares two lists of waypoints from the same dimension by their identities (see `getWaypointIdentity`). Each waypoint is hashed once, so this is O(n)."""
+    sourceKeys, sourceDuplicates = indexWaypoints(sourcePyPoints)
+    targetKeys, targetDuplicates = indexWaypoints(targetPyPoints)
+    diff = WaypointDiff(dimension)
+    for key, sourceWaypoint in sourceKeys.items():
+        targetWaypoint = targetKeys.get(key)
+        if targetWaypoint is None:
+            diff.added.append(sourceWaypoint)
+            diff.added.extend(sourceDuplicates.get(key, ()))
+        elif key in sourceDuplicates or key in targetDuplicates:
+            diffDuplicates([sourceWaypoint, *sourceDuplicates.get(key, ())], [targetWaypoint, *targetDuplicates.get(key, ())], diff)
+        elif sourceWaypoint != targetWaypoint: # compares every field, same as comparing their lines in the file
+            diff.changed.append((targetWaypoint, sourceWaypoint))
+    for key, targetWaypoint in targetKeys.items():
+        if key not in sourceKeys:
+            diff.removed.append(targetWaypoint)
+            diff.removed.extend(targetDuplicates.get(key, ()))
+    return diff
+
+def diffDuplicates(sourceWaypoints: list[Waypoint], targetWaypoints: list[Waypoint], diff: WaypointDiff) -> None:
+    """Adds the differences between waypoints with the same identity to `diff`, when either side has it more than once.
+
+    The ones that are exactly the same on both sides are paired up first, then whatever's left is paired up in order as changed, and any extras on either side are added or removed (so 3 copies in the source and 1 in the target adds 2)."""
+    unmatchedTargets = list(targetWaypoints)
+    unmatchedSources: list[Waypoint] = []
+    for sourceWaypoint in sourceWaypoints:
+        if sourceWaypoint in unmatchedTargets:
+            unmatchedTargets.remove(sourceWaypoint)
+        else:
+            unmatchedSources.append(sourceWaypoint)
+    diff.changed.extend(zip(unmatchedTargets, unmatchedSources))
+    diff.added.extend(unmatchedSources[len(unmatchedTargets):])
+    diff.removed.extend(unmatchedTargets[len(unmatchedSources):])
+
+def applyWaypointDiff(xaeroWaypoints: XaeroWaypoints, diff: WaypointDiff, removeExtra: bool = True) -> None:
+    """Makes the target (`xaeroWaypoints`) match the source the diff was made from, writing as little as possible:
+    if waypoints were only added they're appended to the file, and it's only rewritten if something had to be removed or changed.\n
+    If `removeExtra` is False, waypoints that are only in the target are kept."""
+    # the target gets its own copies, so changing a waypoint in one map can't change it in the other
+    toAdd = [copy.copy(i) for i in diff.added] + [copy.copy(i[1]) for i in diff.changed]
+    toRemove = [i[0] for i in diff.changed]
+    if removeExtra:
+        toRemove += diff.removed
+    if len(toRemove) == 0:
+        if len(toAdd) > 0:
+            xaeroWaypoints.addWaypoints(toAdd, diff.dimension)
+    else:
+        xaeroWaypoints.replaceWaypoints(toRemove, toAdd, diff.dimension)
+    xaeroWaypoints.flush()
+    logging.debug(f"Synced {diff.dimension}: {len(diff.added)} added, {len(diff.changed)} changed, {len(diff.removed) if removeExtra else 0} removed.")
@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+
+WORLD_INDEX_PATH: str = "./worldIndex.json"
+WORLD_INDEX_VERSION: int = 1 # bump this if the format changes so old indexes are ignored
+DEFAULT_MAP: str = "mw$default_1.txt" # the map xaero makes for a world that doesn't have any other ones
+MULTIPLAYER_PREFIX: str = "Multiplayer_"
+
+@dataclass
+class DiscoveredWorld:
+    """A singleplayer world or server that waypoints can be added to."""
+    folder: str # the world's folder in .minecraft/XaeroWaypoints, ex. "Multiplayer_1.2.3.4" or "New World"
+    maps: list[str] = field(default_factory=list) # map files found in any dimension, ex. ["mw$default_1.txt"]
+    dimensions: list[str] = field(default_factory=list) # ex. ["dim%0", "dim%-1"]
+    hasSave: bool = False # if there's a world with this name in saves/
+    # st_mtime_ns of the world's folder and each of its dimension folders when it was scanned. adding or removing a map or dimension changes these, so if they're the same the scan is still up to date
+    mtimes: dict[str, int] = field(default_factory=dict, repr=False)
+
+    @property
+    def multiplayer(self) -> bool:
+        return self.folder.startswith(MULTIPLAYER_PREFIX)
+
+    @property
+    def displayName(self) -> str:
+        if self.multiplayer:
+            return f"{self.folder[len(MULTIPLAYER_PREFIX):]} (server)"
+        return f"{self.folder} (singleplayer)"
+
+    def getWaypointDirectory(self, gameDirectory: str) -> str:
+        return os.path.join(gameDirectory, "XaeroWaypoints", self.folder)
+
+def getMtime(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def listDirectories(path: str) -> list[str]:
+    """Names of the directories in `path`, or an empty list if it doesn't exist. Uses scandir so on most systems no extra stat() is needed per entry."""
+    try:
+        with os.scandir(path) as entries:
+            return [i.name for i in entries if i.is_dir()]
+    except FileNotFoundError:
+        return []
+
+def scanWaypointWorld(worldDirectory: str, folder: str) -> DiscoveredWorld:
+    """Finds every dimension and map in one world's waypoint folder."""
+    world = DiscoveredWorld(folder)
+    maps: set[str] = set()
+    world.mtimes[worldDirectory] = getMtime(worldDirectory)
+    for dimension in sorted(listDirectories(worldDirectory)):
+        if not dimension.startswith("dim%"):
+            continue
+        dimensionDirectory = os.path.join(worldDirectory, dimension)
+        world.dimensions.append(dimension)
+        world.mtimes[dimensionDirectory] = getMtime(dimensionDirectory)
+        with os.scandir(dimensionDirectory) as entries:
+            maps.update(i.name for i in entries if i.name.endswith(".txt") and i.is_file()) # .tmp files are leftovers from interrupted writes
+    world.maps = sorted(maps)
+    return world
+
+def isUpToDate(world: DiscoveredWorld) -> bool:
+    return len(world.mtimes) > 0 and all(getMtime(i) == v for i, v in world.mtimes.items())
+
+def loadWorldIndex(gameDirectory: str, path: str = WORLD_INDEX_PATH) -> dict | None:
+    """Reads the index saved by `saveWorldIndex`. Returns None if there isn't one, or it's for a different game directory or an old version."""
+    try:
+        with open(path, "r", encoding="utf-8") as indexFile:
+            index = json.load(indexFile)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        logging.warning(f"The world index at \"{path}\" is malformed, it will be rebuilt.")
+        return None
+    if not isinstance(index, dict) or index.get("version") != WORLD_INDEX_VERSION or index.get("gameDirectory") != gameDirectory:
+        return None
+    return index
+
+def saveWorldIndex(index: dict, path: str = WORLD_INDEX_PATH) -> None:
+    tempPath = path+".tmp"
+    with open(tempPath, "w", encoding="utf-8") as indexFile:
+        json.dump(index, indexFile)
+    os.replace(tempPath, path)
+
+def discoverWorlds(gameDirectory: str, indexPath: str | None = WORLD_INDEX_PATH, maxWorkers: int | None = None) -> list[DiscoveredWorld]:
+    """Finds every singleplayer world (in saves/ and XaeroWaypoints/) and server (XaeroWaypoints/Multiplayer_*) in the instance, servers first.\n
+    The result is cached in `indexPath` along with the mtimes of every folder it came from. On later runs only the folders whose mtimes changed are scanned again,
+    and the ones that need scanning are scanned at the same time on a thread pool. Pass None as `indexPath` to skip the cache."""
+    savesDirectory = os.path.join(gameDirectory, "saves")
+    waypointsDirectory = os.path.join(gameDirectory, "XaeroWaypoints")
+    index = loadWorldIndex(gameDirectory, indexPath) if indexPath is not None else None
+    if index is None:
+        index = {"version": WORLD_INDEX_VERSION, "gameDirectory": gameDirectory, "roots": {}, "worlds": []}
+    cachedWorlds: dict[str, DiscoveredWorld] = {i["folder"]: DiscoveredWorld(**i) for i in index["worlds"]}
+    indexChanged = False
+
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        # the list of saves and worlds only needs to be read again if saves/ or XaeroWaypoints/ themselves changed
+        roots: dict[str, dict] = {}
+        rootFutures = {}
+        for rootDirectory in (savesDirectory, waypointsDirectory):
+            cachedRoot = index["roots"].get(rootDirectory)
+            mtime = getMtime(rootDirectory)
+            if cachedRoot is not None and cachedRoot["mtime"] == mtime:
+                roots[rootDirectory] = cachedRoot
+            else:
+                rootFutures[rootDirectory] = (mtime, executor.submit(listDirectories, rootDirectory))
+        for rootDirectory, (mtime, future) in rootFutures.items():
+            roots[rootDirectory] = {"mtime": mtime, "entries": sorted(future.result())}
+            indexChanged = True
+        saveNames: set[str] = set(roots[savesDirectory]["entries"])
+
+        worldFutures = {}
+        worlds: dict[str, DiscoveredWorld] = {}
+        for folder in roots[waypointsDirectory]["entries"]:
+            cachedWorld = cachedWorlds.get(folder)
+            if cachedWorld is not None and isUpToDate(cachedWorld):
+                worlds[folder] = cachedWorld
+            else:
+                worldFutures[folder] = executor.submit(scanWaypointWorld, os.path.join(waypointsDirectory, folder), folder)
+        for folder, future in worldFutures.items():
+            try:
+                worlds[folder] = future.result()
+            except OSError as e: # ex. it was deleted while we were scanning it
+                logging.warning(f"Unable to scan \"{os.path.join(waypointsDirectory, folder)}\": {e}")
+            indexChanged = True
+
+    # saves that have never been opened with the minimap installed don't have a waypoint folder yet, but they can still be picked
+    for i in saveNames:
+        if i not in worlds:
+            worlds[i] = DiscoveredWorld(i)
+    for i in worlds.values():
+        i.hasSave = i.folder in saveNames
+
+    discoveredWorlds = sorted(worlds.values(), key=lambda i: (not i.multiplayer, i.folder.lower()))
+    if indexPath is not None and indexChanged:
+        index["roots"] = roots
+        index["worlds"] = [asdict(i) for i in discoveredWorlds]
+        try:
+            saveWorldIndex(index, indexPath)
+        except OSError as e:
+            logging.warning(f"Unable to save the world index to \"{indexPath}\": {e}")
+    return discoveredWorlds
+
+def findWorld(worlds: list[DiscoveredWorld], name: str) -> DiscoveredWorld | None:
+    """Finds a world by its folder name, or a server by its IP address."""
+    for i in worlds:
+        if i.folder == name or i.folder == MULTIPLAYER_PREFIX+name:
+            return i
+    return None
@@ -1,7 +1,14 @@
-from typing import Tuple
+from typing import Iterator
+from collections import OrderedDict
+import gc
 import os
 import logging
 from enum import Enum
+from dataclasses import dataclass, field
+
+from Waypoint import Waypoint
+from SpatialIndex import SpatialIndex
+from FileWatcher import FileWatcher
 
 class XaeroWaypointColors(Enum):
     BLACK: int = 0
@@ -21,42 +28,137 @@ class XaeroWaypointColors(Enum):
     YELLOW: int = 14
     WHITE: int = 15
 
-#* example PyPoint (the way we store xaero waypoints)
-#! BOOLEANS MUST BE STRINGS!!!
-# booleans are not handled correctly when converted to strings (they must be converted to be used in str.join() when converting to xaero)
-# they're stored with an uppercase T (True) when they need to be stored with a lowercase t (true)
-# there's no effect on anything notable when the boolean is a string so pls use a string and no bool
+#* example PyPoint (the way we store xaero waypoints, see Waypoint.py)
 examplePyPoints = [
-    {
-        "name": "Skeleton Spawner",
-        "initials": "S",
-        "x": -48,
-        "y": 66,
-        "z": -9,
-        "color": XaeroWaypointColors.WHITE,
-        "disabled": "false",
-        "type": 0,
-        "set": "gui.xaero_default",
-        "rotate_on_tp": "false",
-        "tp_yaw": 0,
-        "visibility_type": "1",
-        "destination": "false"
-    }
+    Waypoint(
+        name="Skeleton Spawner",
+        initials="S",
+        x=-48,
+        y=66,
+        z=-9,
+        color=XaeroWaypointColors.WHITE.value,
+        disabled=False,
+        type=0,
+        set="gui.xaero_default",
+        rotateOnTp=False,
+        tpYaw=0,
+        visibilityType=1,
+        destination=False
+    )
 ]
 
 WAYPOINT_FORMAT_MESSAGE: str = """#
 #waypoint:name:initials:x:y:z:color:disabled:type:set:rotate_on_tp:tp_yaw:visibility_type:destination
 #\n""" # this message is at the top of every waypoint file, and when converting from PyPoints to xaero waypoints we will lose the comment. i like to keep it there because it helps me remember the format for them, so this is that same message so we can place it at the top of the waypoint file
 
+class WaypointParseError(ValueError):
+    """Raised when a `waypoint:` line in a waypoint file can't be parsed."""
+    def __init__(self, file: str, lineNumber: int, line: str, reason: str) -> None:
+        super().__init__(f"Line {lineNumber} of \"{file}\" is not a valid waypoint ({reason}): {line}")
+        self.file = file
+        self.lineNumber = lineNumber
+        self.line = line
+
+def iterXaeroWaypointFile(file: str, strict: bool = False, startOffset: int = 0, endOffset: int | None = None, unparsedLines: list[str] | None = None) -> Iterator[Waypoint]:
+    """Yields the waypoints in a waypoint file one at a time, reading it line by line so the whole file is never in memory at once.\n
+    Comment lines (starting with "#"), blank lines, and other non-waypoint lines (like xaero's "sets:" line) are skipped based on what they contain, not where they are in the file.\n
+    `waypoint:` lines that can't be parsed are logged with their line number and skipped, or raise a `WaypointParseError` if `strict` is True.\n
+    If `unparsedLines` is given, every skipped line that isn't a comment or blank is added to it, so it can be written back when the file is rewritten.\n
+    `startOffset` and `endOffset` limit reading to part of the file (in bytes), `startOffset` should be the start of a line. Line numbers are counted from `startOffset`.\n
+    Raises FileNotFoundError if the file doesn't exist."""
+    with open(file, "rb") as waypointFile:
+        if startOffset > 0:
+            waypointFile.seek(startOffset)
+        offset = startOffset
+        for lineNumber, rawLine in enumerate(waypointFile, start=1):
+            offset += len(rawLine)
+            if endOffset is not None and offset > endOffset:
+                # the file is longer than it was when we were asked to read it (ex. it's being appended to right now), anything past endOffset is picked up later
+                rawLine = rawLine[:len(rawLine)-(offset-endOffset)]
+                if rawLine == b"":
+                    return
+            line = rawLine.decode("utf-8", errors="replace").rstrip("\r\n")
+            if not line.startswith("waypoint:"):
+                if line != "" and line[0] != "#":
+                    logging.debug(f"Skipping non-waypoint line {lineNumber} of \"{file}\": {line}")
+                    if unparsedLines is not None:
+                        unparsedLines.append(line)
+                continue
+            try:
+                yield Waypoint.fromXaero(line)
+            except (ValueError, IndexError) as e:
+                parseError = WaypointParseError(file, lineNumber, line, str(e) if isinstance(e, ValueError) else "missing fields")
+                if strict:
+                    raise parseError from e
+                if unparsedLines is not None:
+                    unparsedLines.append(line)
+                    logging.warning(f"{parseError} It will be left in the file as it is.")
+                else:
+                    logging.warning(f"{parseError} It will be skipped.")
+            if endOffset is not None and offset >= endOffset:
+                return
+
+def removeMatchingWaypoints(pyPoints: list[Waypoint], toRemove: list[Waypoint]) -> list[Waypoint]:
+    """Returns `pyPoints` without one equal waypoint for each waypoint in `toRemove` (so if a waypoint is in there twice and only removed once, one copy is kept)."""
+    removeCounts: dict[str, int] = {}
+    for i in toRemove:
+        removeCounts[i.toXaero()] = removeCounts.get(i.toXaero(), 0)+1
+    keptPyPoints: list[Waypoint] = []
+    for i in pyPoints:
+        xaeroFormat = i.toXaero()
+        if removeCounts.get(xaeroFormat, 0) > 0:
+            removeCounts[xaeroFormat] -= 1
+            continue
+        keptPyPoints.append(i)
+    return keptPyPoints
+
+@dataclass
+class WaypointSet:
+    """The waypoints for one dimension of the current map, along with everything we keep track of for them."""
+    waypoints: list[Waypoint] = field(default_factory=list)
+    # used for "is there already a waypoint near here?" without looping over every waypoint in the dimension
+    spatialIndex: SpatialIndex = field(default_factory=SpatialIndex)
+    dirty: bool = False # True if the waypoints in memory have changed in a way that needs the whole file to be rewritten (appends are written straight away, so they don't count)
+    pendingRemoves: list[Waypoint] = field(default_factory=list) # waypoints removed in memory that are still in the file, so they can be removed again if the file is reloaded before it's rewritten
+    unparsedLines: list[str] = field(default_factory=list) # lines in the file that aren't comments or waypoints we could parse (ex. xaero's "sets:" line), they're written back as is whenever the file is rewritten
+    # what the file looked like the last time we read or wrote it, so we can tell when something else (like minecraft) has changed it
+    fileSize: int = 0 # how much of the file we've parsed, in bytes
+    fileMtime: int | None = None
+    fileInode: int | None = None
+    fileTail: bytes = b"" # the last few bytes before fileSize. if the file has grown but these are the same, it was appended to and only the new part needs to be parsed
+
+FILE_TAIL_LENGTH: int = 64
+# roughly how much memory one parsed waypoint takes up, including its spot in the spatial index. used to keep the map cache under its memory budget
+ESTIMATED_WAYPOINT_BYTES: int = 250
+DEFAULT_CACHE_BUDGET: int = 256_000_000
+
 class XaeroWaypoints:
     OVERWORLD: str = "dim%0"
     NETHER: str = "dim%-1"
     THE_END: str = "dim%1"
 
-    def __init__(self, waypointDirectory: str) -> None:
+    def __init__(self, waypointDirectory: str, currentMap: str | None = None, deferWrites: bool = False, cacheBudget: int = DEFAULT_CACHE_BUDGET) -> None:
+        """If `currentMap` isn't given, the user is asked to pick one of the maps in the waypoint directory.\n
+        If `deferWrites` is True, added waypoints aren't written until `flush()` is called, so lots of adds (ex. from a script) turn into one write per file.\n
+        `cacheBudget` is roughly how many bytes of parsed waypoints to keep in memory, see `switchMap`."""
         self.waypointDirectory = waypointDirectory
+        self.cacheBudget = cacheBudget
+        # (map, dimension) -> the waypoints of maps other than the current one, least recently used first. see switchMap
+        self.mapCache: OrderedDict[tuple[str, str], WaypointSet] = OrderedDict()
+        self.deferWrites = deferWrites
+        self.deferredAppends: dict[str, list[Waypoint]] = {} # dimension -> waypoints waiting to be appended by flush(), only used with deferWrites
+        #* dimensions are only parsed the first time they're used (see getWaypointSet), so startup doesn't depend on how many waypoints there are
+        self.waypointSets: dict[str, WaypointSet] = {}
+        # minecraft rewrites the waypoint files whenever waypoints are edited in-game, this is how we notice so we don't overwrite those edits
+        self.fileWatcher = FileWatcher()
+        self.journal = None # a Journal (see Journal.py) that every change is recorded in before it's written, if one is set. it's closed along with this if it's ours (see ownsJournal)
+        self.ownsJournal: bool = True # False if the journal is shared with another XaeroWaypoints for the same world (see Journal.shareJournal), then this doesn't close it or checkpoint all of it
 
-        waypointDirFiles = os.listdir(f"{waypointDirectory}\\dim%0") # for this we just use overworld because that one's the easiest. we might be able to use worldmap for this but who knows
+        if currentMap is not None:
+            self.currentMap = currentMap
+            return
+        waypointDirFiles = os.listdir(os.path.join(waypointDirectory, XaeroWaypoints.OVERWORLD)) # for this we just use overworld because that one's the easiest. we might be able to use worldmap for this but who knows
+        waypointDirFiles = [i for i in waypointDirFiles if not i.endswith(".tmp")] # leftovers from an interrupted writeXaeroWaypointFile
         print("Type the identifier associtated with which map you would like to use:")
         for i in enumerate(waypointDirFiles):
             print(f"({i[0]}) {i[1]}")
@@ -64,78 +166,395 @@ class XaeroWaypoints:
         self.currentMap = waypointDirFiles[mapSelection]
         logging.info(f"Using {waypointDirFiles[mapSelection]} as the map.")
 
-        self.waypointsOverworld = self.parseXaeroWaypointFile(f"{waypointDirectory}\\{XaeroWaypoints.OVERWORLD}\\{self.currentMap}")
-        self.waypointsNether = self.parseXaeroWaypointFile(f"{waypointDirectory}\\{XaeroWaypoints.NETHER}\\{self.currentMap}")
-        self.waypointsTheEnd = self.parseXaeroWaypointFile(f"{waypointDirectory}\\{XaeroWaypoints.THE_END}\\{self.currentMap}")
+    @property
+    def waypointsOverworld(self) -> list[Waypoint]:
+        return self.getWaypointSet(XaeroWaypoints.OVERWORLD).waypoints
+
+    @property
+    def waypointsNether(self) -> list[Waypoint]:
+        return self.getWaypointSet(XaeroWaypoints.NETHER).waypoints
+
+    @property
+    def waypointsTheEnd(self) -> list[Waypoint]:
+        return self.getWaypointSet(XaeroWaypoints.THE_END).waypoints
+
+    def getWaypointSet(self, dimension: str) -> WaypointSet | None:
+        """Returns the `WaypointSet` for `dimension`, parsing its file first if this is the first time it's been used. Returns None if `dimension` isn't a valid dimension."""
+        waypointSet = self.waypointSets.get(dimension)
+        if waypointSet is None:
+            if dimension not in (XaeroWaypoints.OVERWORLD, XaeroWaypoints.NETHER, XaeroWaypoints.THE_END):
+                return None
+            filePath = self.getWaypointFilePath(dimension)
+            self.fileWatcher.watch(filePath)
+            waypointSet = WaypointSet()
+            self.waypointSets[dimension] = waypointSet
+            self.reloadWaypointSet(dimension)
+            self.evictCachedMaps()
+        return waypointSet
+
+    def getLoadedWaypointSet(self, dimension: str, mapName: str | None = None) -> WaypointSet:
+        """The already loaded `WaypointSet` for `dimension` of `mapName` (the current map by default), which might be in the map cache."""
+        if mapName is None or mapName == self.currentMap:
+            return self.waypointSets[dimension]
+        return self.mapCache[(mapName, dimension)]
+
+    def switchMap(self, mapName: str) -> None:
+        """Makes `mapName` the current map. The waypoints of the old map stay in memory in the map cache (if they fit in `cacheBudget`), so switching back to it is instant.\n
+        Unsaved changes to a cached map are kept, they're written when it's pushed out of the cache or on `flush()`."""
+        if mapName == self.currentMap:
+            return
+        for dimension in list(self.deferredAppends): # these are keyed by dimension only, so they have to be written before the map changes
+            self.appendXaeroWaypointFile(self.deferredAppends.pop(dimension), dimension)
+        for dimension, waypointSet in self.waypointSets.items():
+            self.mapCache[(self.currentMap, dimension)] = waypointSet
+        self.waypointSets = {}
+        self.currentMap = mapName
+        for dimension in (XaeroWaypoints.OVERWORLD, XaeroWaypoints.NETHER, XaeroWaypoints.THE_END):
+            waypointSet = self.mapCache.pop((mapName, dimension), None)
+            if waypointSet is not None:
+                self.waypointSets[dimension] = waypointSet
+                self.syncDimension(dimension) # in case it was changed in-game while it was cached, this is only a stat() if it wasn't
+        self.evictCachedMaps()
+
+    def getCacheSize(self) -> int:
+        """Roughly how many bytes the waypoints of the current map and the map cache take up."""
+        waypointCount = sum(len(i.waypoints) for i in self.waypointSets.values()) + sum(len(i.waypoints) for i in self.mapCache.values())
+        return waypointCount*ESTIMATED_WAYPOINT_BYTES
+
+    def evictCachedMaps(self) -> None:
+        """Drops the least recently used maps from the map cache until everything fits in `cacheBudget`, writing them first if they have unsaved changes. The current map is never dropped."""
+        cacheSize = self.getCacheSize()
+        while cacheSize > self.cacheBudget and len(self.mapCache) > 0:
+            (mapName, dimension), waypointSet = next(iter(self.mapCache.items()))
+            if waypointSet.dirty:
+                self.syncDimension(dimension, mapName) # so in-game changes aren't overwritten
+                self.writeXaeroWaypointFile(waypointSet.waypoints, dimension, mapName)
+            del self.mapCache[(mapName, dimension)]
+            self.fileWatcher.unwatch(self.getWaypointFilePath(dimension, mapName))
+            cacheSize -= len(waypointSet.waypoints)*ESTIMATED_WAYPOINT_BYTES
+            logging.debug(f"Dropped {mapName} ({dimension}) from the map cache.")
+
+    def listMaps(self) -> list[str]:
+        """Every map in the waypoint directory (a map can have a file in any of the dimensions)."""
+        maps: set[str] = set()
+        for dimension in (XaeroWaypoints.OVERWORLD, XaeroWaypoints.NETHER, XaeroWaypoints.THE_END):
+            try:
+                with os.scandir(os.path.join(self.waypointDirectory, dimension)) as entries:
+                    maps.update(i.name for i in entries if i.name.endswith(".txt") and i.is_file())
+            except FileNotFoundError:
+                continue
+        maps.add(self.currentMap) # even if it doesn't have a file yet
+        return sorted(maps)
+
+    def close(self) -> None:
+        """Stops watching the waypoint files. Doesn't write anything, call `flush()` first for that."""
+        self.fileWatcher.close()
+        if self.journal is not None:
+            if self.ownsJournal:
+                self.journal.close()
+            else:
+                self.journal.commit()
+
+    def recordChange(self, dimension: str, removed: list[Waypoint], added: list[Waypoint]) -> None:
+        if self.journal is not None:
+            self.journal.recordChange(self.currentMap, dimension, removed, added)
+
+    def commitJournal(self) -> None:
+        """Makes sure every change so far is on disk in the journal. This has to happen before a waypoint file is written (so the journal always has anything the files might), and it's also done after each command."""
+        if self.journal is not None:
+            self.journal.commit()
+
+    def recordFileState(self, dimension: str, fileSize: int | None = None, mapName: str | None = None) -> None:
+        """Remembers what a dimension's file looks like right now (or what its first `fileSize` bytes look like), see `WaypointSet.fileTail`."""
+        waypointSet = self.getLoadedWaypointSet(dimension, mapName)
+        filePath = self.getWaypointFilePath(dimension, mapName)
+        try:
+            with open(filePath, "rb") as waypointFile:
+                fileStat = os.fstat(waypointFile.fileno())
+                if fileSize is None:
+                    fileSize = fileStat.st_size
+                waypointFile.seek(max(0, fileSize-FILE_TAIL_LENGTH))
+                waypointSet.fileTail = waypointFile.read(fileSize-max(0, fileSize-FILE_TAIL_LENGTH))
+        except FileNotFoundError:
+            waypointSet.fileSize, waypointSet.fileMtime, waypointSet.fileInode, waypointSet.fileTail = 0, None, None, b""
+            return
+        waypointSet.fileSize = fileSize
+        waypointSet.fileMtime = fileStat.st_mtime_ns
+        waypointSet.fileInode = fileStat.st_ino
+
+    def reloadWaypointSet(self, dimension: str, mapName: str | None = None) -> None:
+        """Parses a dimension's whole file again and replaces the waypoints in memory with it. Waypoints that were removed in memory but not from the file yet stay removed."""
+        waypointSet = self.getLoadedWaypointSet(dimension, mapName)
+        filePath = self.getWaypointFilePath(dimension, mapName)
+        try:
+            fileSize = os.stat(filePath).st_size
+        except FileNotFoundError:
+            fileSize = None
+        #* only the part of the file that existed when we stat()ed it is parsed, so anything appended while we're parsing is picked up by the next syncExternalChanges()
+        unparsedLines: list[str] = []
+        newPyPoints = self.parseXaeroWaypointFile(filePath, fileSize, unparsedLines)
+        if len(waypointSet.pendingRemoves) > 0:
+            newPyPoints = removeMatchingWaypoints(newPyPoints, waypointSet.pendingRemoves)
+        if mapName is None or mapName == self.currentMap:
+            newPyPoints.extend(self.deferredAppends.get(dimension, [])) # added but not written yet
+        waypointSet.waypoints = newPyPoints
+        waypointSet.unparsedLines = unparsedLines
+        waypointSet.spatialIndex.clear()
+        waypointSet.spatialIndex.insertMany(newPyPoints)
+        self.recordFileState(dimension, fileSize, mapName)
+
+    def syncExternalChanges(self, dimensions: list[str] | None = None) -> None:
+        """Checks whether any of the loaded waypoint files have been changed by something else (like minecraft) and brings the waypoints in memory up to date.\n
+        If a file was only appended to, just the new lines are parsed. If it was rewritten, it's parsed again in full. Either way, changes we haven't written yet are kept.\n
+        If `dimensions` is given only those are synced and the rest are left for later, so different dimensions can be used from different threads at the same time."""
+        changedPaths = self.fileWatcher.getChangedPaths()
+        if len(changedPaths) == 0:
+            return
+        for dimension in list(self.waypointSets):
+            filePath = os.path.abspath(self.getWaypointFilePath(dimension))
+            if filePath not in changedPaths:
+                continue
+            if dimensions is not None and dimension not in dimensions:
+                self.fileWatcher.markChanged(filePath)
+                continue
+            self.syncDimension(dimension)
+
+    def syncDimension(self, dimension: str, mapName: str | None = None) -> None:
+        waypointSet = self.getLoadedWaypointSet(dimension, mapName)
+        filePath = self.getWaypointFilePath(dimension, mapName)
+        try:
+            fileStat = os.stat(filePath)
+        except FileNotFoundError:
+            if waypointSet.fileInode is not None:
+                logging.warning(f"\"{filePath}\" was deleted. The waypoints that were in it are still loaded and will be written back the next time the file is written.")
+                waypointSet.dirty = True
+                waypointSet.fileSize, waypointSet.fileMtime, waypointSet.fileInode, waypointSet.fileTail = 0, None, None, b""
+            return
+        if (fileStat.st_size, fileStat.st_mtime_ns, fileStat.st_ino) == (waypointSet.fileSize, waypointSet.fileMtime, waypointSet.fileInode):
+            return # nothing changed (most likely this was our own write)
+
+        if fileStat.st_ino == waypointSet.fileInode and fileStat.st_size > waypointSet.fileSize and self.fileStillStartsWith(filePath, waypointSet):
+            # appended to, so only the new lines need to be parsed
+            with open(filePath, "rb") as waypointFile:
+                waypointFile.seek(waypointSet.fileSize)
+                newData = waypointFile.read(fileStat.st_size-waypointSet.fileSize)
+            completeLength = newData.rfind(b"\n")+1 # a line that's still being written is left for next time
+            if completeLength == 0:
+                return
+            newPyPoints = list(iterXaeroWaypointFile(filePath, startOffset=waypointSet.fileSize, endOffset=waypointSet.fileSize+completeLength, unparsedLines=waypointSet.unparsedLines))
+            waypointSet.waypoints.extend(newPyPoints)
+            waypointSet.spatialIndex.insertMany(newPyPoints)
+            self.recordFileState(dimension, waypointSet.fileSize+completeLength, mapName)
+            logging.info(f"{len(newPyPoints)} waypoints were added to \"{filePath}\" by something else, they've been loaded.")
+            return
+
+        previousCount = len(waypointSet.waypoints)
+        self.reloadWaypointSet(dimension, mapName)
+        logging.info(f"\"{filePath}\" was changed by something else, it has been reloaded ({previousCount} -> {len(waypointSet.waypoints)} waypoints).")
 
-        self.writeXaeroWaypointFile(self.waypointsOverworld, XaeroWaypoints.OVERWORLD)
+    def fileStillStartsWith(self, filePath: str, waypointSet: WaypointSet) -> bool:
+        """Checks that the bytes just before `waypointSet.fileSize` are the same as when we last saw the file, which means it was appended to rather than rewritten."""
+        tailStart = waypointSet.fileSize-len(waypointSet.fileTail)
+        with open(filePath, "rb") as waypointFile:
+            waypointFile.seek(tailStart)
+            return waypointFile.read(len(waypointSet.fileTail)) == waypointSet.fileTail
+
+    def markDirty(self, dimension: str) -> None:
+        """Call this after changing a dimension's waypoints in memory (anything other than adding them) so the file is rewritten by the next `flush()`."""
+        self.getWaypointSet(dimension).dirty = True
+
+    def flush(self) -> None:
+        """Writes every dimension that has unsaved changes: a full rewrite if waypoints were changed or removed, otherwise just an append of the deferred waypoints (see `deferWrites`). Dimensions that haven't changed aren't touched.\n
+        Maps in the map cache with unsaved changes are written too."""
+        for (mapName, dimension), waypointSet in self.mapCache.items():
+            if waypointSet.dirty:
+                self.syncDimension(dimension, mapName)
+                self.writeXaeroWaypointFile(waypointSet.waypoints, dimension, mapName)
+        self.syncExternalChanges() # so changes made in-game since the last write aren't overwritten
+        for dimension in self.waypointSets:
+            if self.waypointSets[dimension].dirty:
+                self.writeXaeroWaypointFile(self.waypointSets[dimension].waypoints, dimension)
+        for dimension in list(self.deferredAppends):
+            self.appendXaeroWaypointFile(self.deferredAppends.pop(dimension), dimension)
+        if self.journal is not None:
+            if self.ownsJournal:
+                self.journal.checkpoint() # everything is in the files now
+            else:
+                self.journal.commit() # the files this wrote were checkpointed as they were written, the rest of the journal isn't ours to checkpoint
+
+    def appendOrDefer(self, pyPoints: list[Waypoint], dimension: str) -> None:
+        if self.deferWrites:
+            self.deferredAppends.setdefault(dimension, []).extend(pyPoints)
+        else:
+            self.appendXaeroWaypointFile(pyPoints, dimension)
 
     # this is run when we read from the waypoint file to convert the xaero waypoints to PyPoints
-    def parseXaeroWaypointFile(self, file: str) -> list[dict] | None:
-        newPyPoints: list[dict[str, str | Tuple[int, int, int] | int | bool]] = []
+    def parseXaeroWaypointFile(self, file: str, endOffset: int | None = None, unparsedLines: list[str] | None = None) -> list[Waypoint]:
+        """Reads every waypoint in `file` (or in its first `endOffset` bytes) into a list. See `iterXaeroWaypointFile` for going through them without keeping them all in memory, and for `unparsedLines`."""
+        #* the garbage collector is paused while the list is built. every waypoint is a new object that's kept, so the collections it would do (over and over, on everything loaded so far) never find anything, and they took up about a quarter of the time on large files
+        gcWasEnabled = gc.isenabled()
+        gc.disable()
         try:
-            with open(file, "r") as waypointFile:
-                waypointsData: list[str] = waypointFile.read().split("\n")[3:-1]
+            return list(iterXaeroWaypointFile(file, endOffset=endOffset, unparsedLines=unparsedLines))
         except FileNotFoundError:
-            logging.warning(f"Unable to find file \"{file}\". It's possible no waypoints have been created in that dimension. There is a high chance of experiencing an error when trying to add a waypoint to this dimension.")
-            return None
-        for i in waypointsData:
-            newPyPoints.append(self.convertXaeroToPyPoint(i))
-        return newPyPoints
+            logging.warning(f"Unable to find file \"{file}\". It's possible no waypoints have been created in that dimension. The file will be created when a waypoint is added to it.")
+            return []
+        finally:
+            if gcWasEnabled:
+                gc.enable()
     
-    def convertXaeroToPyPoint(self, xaeroFormat: str) -> dict[str, str | Tuple[int, int, int] | int | bool]:
-        newPyPoint: dict[str, str | Tuple[int, int, int] | int | bool] = {}
-
-        waypointData: list = xaeroFormat.split(":")
-        newPyPoint = {
-            "name": waypointData[1],
-            "initials": waypointData[2],
-            "x": waypointData[3],
-            "y": waypointData[4],
-            "z": waypointData[5],
-            "color": waypointData[6],
-            "disabled": waypointData[7],
-            "type": waypointData[8],
-            "set": waypointData[9],
-            "rotate_on_tp": waypointData[10],
-            "tp_yaw": waypointData[11],
-            "visibility_type": waypointData[12],
-            "destination": waypointData[13]
-        }
-        return newPyPoint
-    def convertPyPointToXaero(self, pyPoint: dict[str, str | Tuple[int, int, int] | int | bool]) -> str:
-        waypointStart: str = "waypoint:"
-        # xaero doesn't like decimals so round them out here
-        pyPoint["x"] = str(round(int(pyPoint["x"]))) # type gymnastics!
-        pyPoint["y"] = str(round(int(pyPoint["y"])))
-        pyPoint["z"] = str(round(int(pyPoint["z"])))
-        # str.join() only takes strings so this just set's every value in pyPoint to a string #! ISSUE! doesn't account for stuff like False -> false in json.loads() 'cause they're all strings
-        for i, v in enumerate(pyPoint):
-            pyPoint[v] = str(pyPoint[v])
-        waypointCSV = ":".join(list(pyPoint.values()))
-        return waypointStart+waypointCSV
+    def convertXaeroToPyPoint(self, xaeroFormat: str) -> Waypoint:
+        return Waypoint.fromXaero(xaeroFormat)
+
+    def convertPyPointToXaero(self, pyPoint: Waypoint) -> str:
+        return pyPoint.toXaero()
     
-    def writeXaeroWaypointFile(self, pyPoints: list[dict[str, str | Tuple[int, int, int] | int | bool]], dimension: str):
-        with open(f"{self.waypointDirectory}\\{dimension}\\{self.currentMap}", "w") as waypointFile:
-        # with open(f"C:\\Users\\fifth\\AppData\\Roaming\\.minecraft\\launcher_log.txt", "w") as waypointFile:
+    def getWaypointFilePath(self, dimension: str, mapName: str | None = None) -> str:
+        return os.path.join(self.waypointDirectory, dimension, self.currentMap if mapName is None else mapName)
+
+    def writeXaeroWaypointFile(self, pyPoints: list[Waypoint], dimension: str, mapName: str | None = None):
+        """Rewrites the whole waypoint file for `dimension` of `mapName` (the current map by default). This is only needed when waypoints are changed or removed, adding them should go through `appendXaeroWaypointFile`.\n
+        The file is written to a temporary file next to it first and then swapped in with `os.replace`, so Minecraft (or anything else) never reads a half-written file."""
+        filePath = self.getWaypointFilePath(dimension, mapName)
+        self.commitJournal()
+        if mapName is not None and mapName != self.currentMap:
+            waypointSet = self.mapCache.get((mapName, dimension))
+        else:
+            waypointSet = self.waypointSets.get(dimension)
+        os.makedirs(os.path.dirname(filePath), exist_ok=True)
+        tempFilePath = filePath+".tmp"
+        with open(tempFilePath, "w", encoding="utf-8") as waypointFile:
             waypointFile.write(f"{WAYPOINT_FORMAT_MESSAGE}")
-            for i in pyPoints:
-                waypointFile.write(self.convertPyPointToXaero(i)+"\n")
-
-    def addWaypoint(self, pyPoint: dict[str, str | Tuple[int, int, int] | int | bool], dimension: str) -> None:
-        if dimension == XaeroWaypoints.OVERWORLD:
-            self.waypointsOverworld.append(pyPoint)
-            self.writeXaeroWaypointFile(self.waypointsOverworld, XaeroWaypoints.OVERWORLD)
-        elif dimension == XaeroWaypoints.NETHER:
-            self.waypointsNether.append(pyPoint)
-            self.writeXaeroWaypointFile(self.waypointsNether, XaeroWaypoints.NETHER)
-        elif dimension == XaeroWaypoints.THE_END:
-            self.waypointsTheEnd.append(pyPoint)
-            self.writeXaeroWaypointFile(self.waypointsTheEnd, XaeroWaypoints.THE_END)
+            if waypointSet is not None and len(waypointSet.unparsedLines) > 0: # so rewriting the file never loses anything we couldn't read
+                waypointFile.write("".join([i+"\n" for i in waypointSet.unparsedLines]))
+            # one big write instead of one write per waypoint, this matters once there's thousands of them
+            waypointFile.write("".join([self.convertPyPointToXaero(i)+"\n" for i in pyPoints]))
+            waypointFile.flush()
+            os.fsync(waypointFile.fileno())
+        os.replace(tempFilePath, filePath)
+        if mapName is None or mapName == self.currentMap:
+            self.deferredAppends.pop(dimension, None) # they were in pyPoints
+        if waypointSet is not None and waypointSet.waypoints is pyPoints:
+            waypointSet.dirty = False
+            waypointSet.pendingRemoves = []
+            self.recordFileState(dimension, mapName=mapName)
+            if self.journal is not None:
+                self.journal.checkpointFile(self.currentMap if mapName is None else mapName, dimension)
+
+    def appendXaeroWaypointFile(self, pyPoints: list[Waypoint], dimension: str):
+        """Writes only the `waypoint:` lines for `pyPoints` to the end of the existing file for `dimension`, so the cost doesn't depend on how many waypoints are already in it.\n
+        If the file doesn't exist yet it's created with the usual header."""
+        filePath = self.getWaypointFilePath(dimension)
+        self.commitJournal()
+        newLines: str = "".join([self.convertPyPointToXaero(i)+"\n" for i in pyPoints])
+        try:
+            with open(filePath, "rb") as waypointFile:
+                waypointFile.seek(0, os.SEEK_END)
+                if waypointFile.tell() == 0:
+                    newLines = WAYPOINT_FORMAT_MESSAGE+newLines
+                else:
+                    # if the file doesn't end with a newline (ex. it was edited by hand) the first new waypoint would end up on the same line as the last old one
+                    waypointFile.seek(-1, os.SEEK_END)
+                    if waypointFile.read(1) != b"\n":
+                        newLines = "\n"+newLines
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(filePath), exist_ok=True)
+            newLines = WAYPOINT_FORMAT_MESSAGE+newLines
+        #* this is a single write() to a file opened in append mode, so the old contents of the file are never touched and a reader can't see a truncated file
+        with open(filePath, "a", encoding="utf-8") as waypointFile:
+            waypointFile.write(newLines)
+        if dimension in self.waypointSets:
+            self.recordFileState(dimension)
+        waypointSet = self.waypointSets.get(dimension)
+        if self.journal is not None and dimension not in self.deferredAppends and (waypointSet is None or not waypointSet.dirty):
+            # nothing else is waiting to be written to this file, so recovery doesn't need to add these again (which would bring them back if they've been deleted in-game since)
+            self.journal.checkpointFile(self.currentMap, dimension)
+
+    def compactXaeroWaypointFiles(self) -> None:
+        """Rewrites every dimension's waypoint file from the waypoints in memory. Dimensions that don't have a file or any waypoints are skipped, so no empty files are made for them."""
+        self.syncExternalChanges()
+        for dimension in (XaeroWaypoints.OVERWORLD, XaeroWaypoints.NETHER, XaeroWaypoints.THE_END):
+            waypointSet = self.waypointSets.get(dimension)
+            hasWaypoints = (waypointSet is not None and len(waypointSet.waypoints) > 0) or len(self.deferredAppends.get(dimension, [])) > 0
+            if not hasWaypoints and not os.path.exists(self.getWaypointFilePath(dimension)):
+                continue
+            self.writeXaeroWaypointFile(self.getWaypointSet(dimension).waypoints, dimension)
+
+    def getWaypointList(self, dimension: str) -> list[Waypoint] | None:
+        waypointSet = self.getWaypointSet(dimension)
+        if waypointSet is None:
+            return None
+        return waypointSet.waypoints
+
+    def addWaypoint(self, pyPoint: Waypoint, dimension: str, dedupeRadius: float | None = None) -> bool:
+        """Returns False if the waypoint wasn't added (see `addWaypoints`)."""
+        return len(self.addWaypoints([pyPoint], dimension, dedupeRadius)) == 1
+
+    def addWaypoints(self, pyPoints: list[Waypoint], dimension: str, dedupeRadius: float | None = None) -> list[Waypoint]:
+        """Adds every PyPoint in `pyPoints` to `dimension` and then appends them to that dimension's file in one write (or leaves them for `flush()` if `deferWrites` is on).\n
+        If `dedupeRadius` is set, PyPoints that are within that many blocks (horizontally) of an existing waypoint, or of one added earlier in the same call, are skipped.\n
+        Returns the PyPoints that were actually added."""
+        if dimension not in self.waypointSets and dimension in (XaeroWaypoints.OVERWORLD, XaeroWaypoints.NETHER, XaeroWaypoints.THE_END) and dedupeRadius is None:
+            #* nothing needs to be checked against the existing waypoints, so there's no point parsing the file just to append to it. if the dimension is loaded later it'll be parsed with these in it
+            self.recordChange(dimension, [], pyPoints)
+            self.appendOrDefer(pyPoints, dimension)
+            return pyPoints
+        waypointSet = self.getWaypointSet(dimension)
+        if waypointSet is None:
+            logging.error("Invalid dimension parameter for XaeroWaypoints.addWaypoints()")
+            return []
+        self.syncExternalChanges([dimension]) # otherwise we could append to a file that's changed since we last read it, and we'd never notice the change
+        spatialIndex = waypointSet.spatialIndex
+        addedPyPoints: list[Waypoint] = []
+        for i in pyPoints:
+            if dedupeRadius is not None:
+                existingWaypoint = spatialIndex.anyWithin(i.x, i.z, dedupeRadius)
+                if existingWaypoint is not None:
+                    logging.debug(f"Skipping waypoint \"{i.name}\" at ({i.x}, {i.y}, {i.z}), \"{existingWaypoint.name}\" is already at ({existingWaypoint.x}, {existingWaypoint.y}, {existingWaypoint.z}).")
+                    continue
+            spatialIndex.insert(i)
+            addedPyPoints.append(i)
+        if len(addedPyPoints) > 0:
+            waypointSet.waypoints.extend(addedPyPoints)
+            self.recordChange(dimension, [], addedPyPoints)
+            self.appendOrDefer(addedPyPoints, dimension)
+        return addedPyPoints
+
+    def removeWaypoints(self, pyPoints: list[Waypoint], dimension: str) -> None:
+        """Removes these exact waypoint objects from `dimension` in memory (or equal ones, if the file was changed by something else and reloaded since they were picked). The file is rewritten by the next `flush()`."""
+        self.removeFromWaypointSet(pyPoints, dimension)
+        self.recordChange(dimension, pyPoints, [])
+
+    def removeFromWaypointSet(self, pyPoints: list[Waypoint], dimension: str) -> None:
+        waypointSet = self.getWaypointSet(dimension)
+        loadedPyPoints = waypointSet.waypoints
+        self.syncExternalChanges([dimension])
+        if waypointSet.waypoints is loadedPyPoints:
+            removedIds = {id(i) for i in pyPoints}
+            waypointSet.waypoints = [i for i in waypointSet.waypoints if id(i) not in removedIds]
+            removedPyPoints = pyPoints
         else:
-            logging.error("Invalid dimension parameter for XaeroWaypoints.addWaypoint()")
-            return
-        
+            #* the file was reloaded, so these waypoint objects aren't loaded anymore and we have to go by what they're equal to instead
+            keptPyPoints = removeMatchingWaypoints(waypointSet.waypoints, pyPoints)
+            keptIds = {id(i) for i in keptPyPoints}
+            removedPyPoints = [i for i in waypointSet.waypoints if id(i) not in keptIds]
+            waypointSet.waypoints = keptPyPoints
+        for i in removedPyPoints:
+            waypointSet.spatialIndex.remove(i)
+        waypointSet.pendingRemoves.extend(pyPoints)
+        waypointSet.dirty = True
+
+    def replaceWaypoints(self, toRemove: list[Waypoint], toAdd: list[Waypoint], dimension: str) -> None:
+        """Removes these exact waypoint objects and adds `toAdd` in their place, in memory. Since the file has to be rewritten anyway the new waypoints aren't appended, they're written along with everything else by the next `flush()`."""
+        self.removeFromWaypointSet(toRemove, dimension)
+        waypointSet = self.waypointSets[dimension]
+        waypointSet.waypoints.extend(toAdd)
+        waypointSet.spatialIndex.insertMany(toAdd)
+        self.recordChange(dimension, toRemove, toAdd)
+
+    def findWaypointsNear(self, x: int, z: int, dimension: str, radius: float | None = None, limit: int | None = None) -> list[tuple[float, Waypoint]]:
+        """Returns (distance, waypoint) pairs for the waypoints in `dimension` near (x, z), closest first. See `SpatialIndex.near`."""
+        return self.getWaypointSet(dimension).spatialIndex.near(x, z, radius, limit)
 
     # def setWaypointDirectory(self, waypointDirectory: str) -> None: # todo: maps?
     #     self.waypointFile = open(waypointDirectory, "w") 
\ No newline at end of file
@@ -1,20 +1,78 @@
 import json
+import logging
+import os
+from dataclasses import dataclass, field, fields
 
-# todo: make a dataclass for Config instead of using a dictionary
-
-def createConfig() -> None: # if the config file doesn't exist this function needs to create it
-    blankConfig = {
-        "gameDirectory": None,
-        "targetIpAddress": None
-    }
-    with open("./config.json", "x") as configFile:
-        configFile.write(json.dumps(blankConfig))
-
-def getConfig():
-    """return type is any because for some reason json.loads also has a return type of any (ugh)"""
-    with open("./config.json","r") as configFile:
-        return json.loads(configFile.read())
-    
-def writeConfig(config: dict) -> None:
-    with open("./config.json","w") as configFile:
-        configFile.write(json.dumps(config))
\ No newline at end of file
+CONFIG_PATH: str = "./config.json"
+
+@dataclass
+class Config:
+    """Everything stored in config.json. Use `getConfig()` to get the shared instance instead of making one of these directly.\n
+    Changes are made with `set()` and only hit the disk when `save()` is called, so changing several values at once is still a single write."""
+    gameDirectory: str | None = None
+    targetIpAddress: str | None = None
+    targetWorld: str | None = None # the world or server's folder in XaeroWaypoints, ex. "Multiplayer_1.2.3.4" or "New World". if this isn't set, targetIpAddress is used
+    fanOutTargets: list[dict[str, str]] = field(default_factory=list) # other servers/maps that "add --fanout" and "import --fanout" also write to, each one is {"ipAddress": ..., "map": ...}
+    mapCacheMegabytes: int = 256 # roughly how much memory the "map" command can use to keep recently used maps loaded
+
+    # these aren't saved to config.json, they're just for keeping track of the file
+    path: str = field(default=CONFIG_PATH, repr=False, compare=False, metadata={"saved": False})
+    mtime: int | None = field(default=None, repr=False, compare=False, metadata={"saved": False}) # st_mtime_ns of config.json when it was last read or written by us
+    dirty: bool = field(default=False, repr=False, compare=False, metadata={"saved": False}) # whether there are changes that haven't been saved yet
+
+    def toDict(self) -> dict:
+        return {i.name: getattr(self, i.name) for i in fields(self) if i.metadata.get("saved", True)}
+
+    def set(self, name: str, value) -> None:
+        """Changes a config value in memory. Call `save()` to write it to config.json."""
+        if name not in self.toDict():
+            raise AttributeError(f"\"{name}\" is not a config value.")
+        if getattr(self, name) != value:
+            setattr(self, name, value)
+            self.dirty = True
+
+    def save(self) -> None:
+        """Writes the config to disk if anything has changed since it was loaded or last saved.\n
+        The new config is written to a temporary file that then replaces config.json, so it's never left half-written."""
+        if not self.dirty:
+            return
+        tempPath = self.path+".tmp"
+        with open(tempPath, "w") as configFile:
+            configFile.write(json.dumps(self.toDict()))
+        os.replace(tempPath, self.path)
+        self.mtime = os.stat(self.path).st_mtime_ns
+        self.dirty = False
+
+def loadConfig(path: str = CONFIG_PATH) -> Config:
+    """Reads the config from `path`. If the file doesn't exist a blank config is returned, which is created on disk the first time it's saved."""
+    try:
+        with open(path, "r") as configFile:
+            mtime = os.fstat(configFile.fileno()).st_mtime_ns
+            configData: dict = json.loads(configFile.read())
+    except FileNotFoundError:
+        logging.info(f"A config file was not found at \"{path}\". Creating a new one...")
+        return Config(path=path, dirty=True)
+    savedFields = Config().toDict()
+    newConfig = Config(**{i: configData[i] for i in configData if i in savedFields})
+    newConfig.path = path
+    newConfig.mtime = mtime
+    return newConfig
+
+cachedConfig: Config | None = None
+
+def getConfig() -> Config:
+    """Returns the shared `Config`. config.json is only read again if it has been changed on disk since we last read or wrote it, checking that is just a stat()."""
+    global cachedConfig
+    if cachedConfig is None:
+        cachedConfig = loadConfig()
+        return cachedConfig
+    try:
+        mtime = os.stat(cachedConfig.path).st_mtime_ns
+    except FileNotFoundError:
+        mtime = None
+    if mtime != cachedConfig.mtime and mtime is not None:
+        if cachedConfig.dirty:
+            logging.warning("config.json was changed by something else, but there are config changes that haven't been saved yet. They will overwrite the changes made to the file.")
+        else:
+            cachedConfig = loadConfig(cachedConfig.path)
+    return cachedConfig
@@ -1,17 +1,12 @@
 import re
-
-def removeCommasFromNumber(number: str) -> int:
-    NUMBERS = ["1","2","3","4","5","6","7","8","9","0","-"]
-    newString: str = ""
-    for i in number:
-        if i not in NUMBERS:
-            continue
-        else:
-            newString += i
-    return int(newString)
+import unicodedata
 
 def isValidIPv4Address(addr: str):
     if re.search("^((25[0-5]|(2[0-4]|1[0-9]|[1-9]|)[0-9])(\\.(?!$)|$)){4}$", addr) or addr == "localhost" or addr == "0":
         return True
     else:
-        return False
\ No newline at end of file
+        return False
+
+def isValidWaypointText(value: str) -> bool:
+    """Whether `value` can be used as a waypoint's name or initials. It can't be empty, and it can't have a ":" (the waypoint file's separator) or a newline or other control character in it, since those would break the line it's written on."""
+    return value != "" and ":" not in value and not any(unicodedata.category(i) in ("Cc", "Zl", "Zp") for i in value)
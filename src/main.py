@@ -1,17 +1,24 @@
 # Chunkbase Nether Coordinator
 # Parses the coordinates from a string of overworld coordinates from Chunkbase and spits back nether coordinates
 
+import argparse
+import cProfile
+import pstats
 import logging
-import json
-from typing import Tuple
+from typing import TextIO, Tuple
 import os
-from ast import literal_eval # used for if a tuple is passed into the "add" command making that string into a tuple
+import sys
 
 import config
+import Instrumentation
 from Console import Command, Console
-from CoordinateConverter import CoordinateConverter
-from helper import removeCommasFromNumber, isValidIPv4Address
+from helper import isValidIPv4Address
 from XaeroWaypoints import XaeroWaypoints, XaeroWaypointColors
+from Journal import openJournal
+from Daemon import DEFAULT_PORT, runDaemon
+from WorldDiscovery import DEFAULT_MAP, MULTIPLAYER_PREFIX, DiscoveredWorld, discoverWorlds, findWorld
+
+PROFILE_LINES: int = 30 # how many functions --profile prints
 
 # CFLAGS is a reserved keyword for saying "the following flags are valid"
 # CVALUE is a reserved keyword for saying "this command can take a value after the flags"
@@ -22,24 +29,218 @@ COMMANDS = {
 
 Description
     Required Arguments: 
-        coordinates: The X, (Y), and Z of the waypoint. Can be copy/pasted in this format (what you see when clicking on an object): "X: -6,652 Z: -5,420" or what the copy button gives you: "/tp -1392 ~ -1264". You can also pass a Tuple that contains the coordinates, ex. (432, 77, -98). If a Y-value is not provided it is set to 63.
+        coordinates: The X, (Y), and Z of the waypoint. Can be copy/pasted in this format (what you see when clicking on an object): "X: -6,652 Z: -5,420" or what the copy button gives you: "/tp -1392 ~ -1264". You can also pass a Tuple that contains the coordinates, ex. (432, 77, -98), the "XYZ:" line from the F3 screen, or just "432 77 -98". If a Y-value is not provided it is set to 63.
     Flags: 
         --dimension [value]: What dimension to put the waypoint in. Allowed values are: "overworld", "nether", "the_end". Default value: "overworld"
         --name [value]: The name of the waypoint. Cannot have spaces. Default value: "new waypont"
         --initial [value]: The initial to show for the waypoint. Cannot exceed # characters. Default value: waypointName[0].upper() (the first char of waypointName uppercased)
         --color [value]: The color of the waypoint. Should be an integer from 0-15. Use the constants in the class XaeroWaypointColors to see the colors these numbers translate to. Default value: XaeroWaypointColors.GREEN
         --innether: Whether to translate Overworld coordinates to Nether coordinates and put the waypoint in the Nether. Y-level is set to 128 for Nether Roof travel.
-        --inoverworld: Whether to translate Nether coordinates to Overworld coordinates and put the waypoint in the Overworld. Y-level is set to 63 since that's the Ocean level.""",
+        --inoverworld: Whether to translate Nether coordinates to Overworld coordinates and put the waypoint in the Overworld. Y-level is set to 63 since that's the Ocean level.
+        --dedupe [value]: Don't add the waypoint if there's already one within this many blocks (horizontally) of it. Useful when re-adding structures from Chunkbase.
+        --fanout: Also add the waypoint to every fan-out target (other servers and maps, see the "targets" command). They're all written at the same time.""",
         CFLAGS={ #* format is the flag then whether it has an input afterwards, so for --dimension since it takes a value it's value is True, but since --innether doesn't take a value it is False
             "--dimension": True,
             "--name": True,
             "--initial": True,
             "--color": True,
             "--innether": False, # says "these coordinates are from the overworld, but make the waypoint in the nether (divided by 8). All waypoint's Y levels will be set to 128 for nether roof travel purposes."
-            "--inoverworld": False # says "these coordinates are from the nether, but make the waypoint in the overworld (multiplied by 8)"
+            "--inoverworld": False, # says "these coordinates are from the nether, but make the waypoint in the overworld (multiplied by 8)"
+            "--dedupe": True,
+            "--fanout": False
+        },
+        CVALUE=True
+    ),
+    "import": Command(
+        CHELP="""Usage: import <flags> [file]
+
+Description
+    Required Arguments: 
+        file: The path to a text file with one set of coordinates per line, in any of the formats the "add" command accepts (ex. "X: -6,652 Z: -5,420" or "/tp -1392 ~ -1264"). Blank lines and lines starting with "#" are ignored, and lines that can't be parsed are skipped with a warning.
+    Flags: 
+        Accepts the same flags as the "add" command, which apply to every waypoint in the file.""",
+        CFLAGS={
+            "--dimension": True,
+            "--name": True,
+            "--initial": True,
+            "--color": True,
+            "--innether": False,
+            "--inoverworld": False,
+            "--dedupe": True,
+            "--fanout": False
+        },
+        CVALUE=True
+    ),
+    "targets": Command(
+        CHELP="""Usage: targets <flags>
+
+Description
+    Manages the fan-out targets, which are the other servers and maps that "add --fanout" and "import --fanout" also add waypoints to. With no flags, lists the current targets.
+    Flags: 
+        --add: Add a target. Requires --ip and --map.
+        --ip [value]: The IP address of the server to add as a target.
+        --map [value]: The name of the map file to add as a target (ex. "mw$default_1.txt").
+        --remove [value]: Remove the target with this number (from the list).""",
+        CFLAGS={
+            "--add": False,
+            "--ip": True,
+            "--map": True,
+            "--remove": True
+        },
+        CVALUE=False
+    ),
+    "near": Command(
+        CHELP="""Usage: near <flags> [coordinates]
+
+Description
+    Lists the waypoints closest to the given coordinates (measured horizontally), closest first.
+    Required Arguments: 
+        coordinates: The coordinates to search around, in any format the "add" command accepts.
+    Flags: 
+        --dimension [value]: Which dimension to search. Allowed values are: "overworld", "nether", "the_end". Default value: "overworld"
+        --radius [value]: Only list waypoints within this many blocks. Default value: no limit
+        --limit [value]: The most waypoints to list. Default value: 10""",
+        CFLAGS={
+            "--dimension": True,
+            "--radius": True,
+            "--limit": True
         },
         CVALUE=True
     ),
+    "map": Command(
+        CHELP="""Usage: map [map]
+
+Description
+    Without a map, lists the maps in the current world or server. With one, switches to it, so waypoints are added to that map from then on.
+    Optional Arguments: 
+        map: The name of the map (ex. "mw$default_1.txt") or its number from the list. A name ending in ".txt" that doesn't exist yet is created when a waypoint is added to it.
+    Recently used maps are kept in memory, so switching back to one is instant. How much memory is used for this can be set with "mapCacheMegabytes" in config.json (default: 256).""",
+        CVALUE=False
+    ),
+    "diff": Command(
+        CHELP="""Usage: diff <flags>
+
+Description
+    Compares the current map to another map or server, and lists what "sync" would change in the other one. Waypoints are matched by their name, coordinates and dimension.
+    Flags: 
+        --map [value]: The other map (ex. "mw$default_2.txt"). Default value: the current map
+        --world [value]: The other singleplayer world (its folder name) or server (its IP address). Default value: the current world
+        --dimension [value]: Only compare this dimension. Allowed values are: "overworld", "nether", "the_end". Default value: every dimension
+        --limit [value]: The most waypoints to list for each kind of change. Default value: 10""",
+        CFLAGS={
+            "--map": True,
+            "--world": True,
+            "--dimension": True,
+            "--limit": True
+        },
+        CVALUE=False
+    ),
+    "sync": Command(
+        CHELP="""Usage: sync <flags>
+
+Description
+    Makes another map or server match the current map: waypoints only in the current map are added to it, waypoints that were changed (ex. a different color) are updated, and waypoints only in the other map are removed. Only what's different is written, so if nothing was changed or removed the other map's file is just appended to.
+    Flags: 
+        --map [value]: The map to sync to (ex. "mw$default_2.txt"). Default value: the current map
+        --world [value]: The singleplayer world (its folder name) or server (its IP address) to sync to. Default value: the current world
+        --dimension [value]: Only sync this dimension. Allowed values are: "overworld", "nether", "the_end". Default value: every dimension
+        --keep: Don't remove waypoints that are only in the other map.""",
+        CFLAGS={
+            "--map": True,
+            "--world": True,
+            "--dimension": True,
+            "--keep": False
+        },
+        CVALUE=False
+    ),
+    "export": Command(
+        CHELP="""Usage: export <flags> [file]
+
+Description
+    Writes the waypoints of the current map to a file that other programs (dashboards, web maps, spreadsheets) can read. The file is written as it goes, so even huge maps don't have to fit in memory.
+    Required Arguments: 
+        file: Where to write the waypoints. The format is picked from the extension: ".csv", ".jsonl" (one JSON object per line) or ".geojson" (a FeatureCollection of points at [X, Z]).
+    Flags: 
+        --format [value]: The format, if it can't be told from the extension. Allowed values are: "csv", "jsonl", "geojson"
+        --dimension [value]: Which dimension to export, can be used more than once. Allowed values are: "overworld", "nether", "the_end". Default value: every dimension
+        --normalize [value]: Convert the coordinates of nether and overworld waypoints so they're all in the same dimension's coordinates. Allowed values are: "overworld", "nether". The end is never converted.
+        --bbox [value]: Only export waypoints inside this box, written as "minX,minZ,maxX,maxZ" (no spaces). Uses the coordinates after --normalize.
+        --center [value]: Only export waypoints within --radius blocks of this point, written as "X,Z" (no spaces). Uses the coordinates after --normalize.
+        --radius [value]: See --center.""",
+        CFLAGS={
+            "--format": True,
+            "--dimension": True,
+            "--normalize": True,
+            "--bbox": True,
+            "--center": True,
+            "--radius": True
+        },
+        CVALUE=True
+    ),
+    "route": Command(
+        CHELP="""Usage: route <flags> [coordinates]
+
+Description
+    Works out a short order to visit waypoints in (ex. after importing a few hundred structures) and lists them in that order, with how far each one is from the last.
+    Optional Arguments: 
+        coordinates: Where the route starts, in any format the "add" command accepts. Default value: 0 0 (around spawn)
+    Flags: 
+        --dimension [value]: Which dimension's waypoints to route. Allowed values are: "overworld", "nether", "the_end". Default value: "overworld"
+        --name [value]: Only route waypoints with this in their name (not case sensitive), ex. "village".
+        --nether: Travel on the nether roof when it's shorter (1/8 of the distance, plus the time to get to and through the portals). Only for overworld routes.
+        --portalcost [value]: How many blocks of walking getting to and through the portals for one nether trip is worth. Default value: 200
+        --write: Rename the routed waypoints to their number in the route (ex. "3. Village", with "3" as the initials), so the route can be followed in game.""",
+        CFLAGS={
+            "--dimension": True,
+            "--name": True,
+            "--nether": False,
+            "--portalcost": True,
+            "--write": False
+        },
+        CVALUE=False
+    ),
+    "undo": Command(
+        CHELP="""Usage: undo [count]
+
+Description
+    Takes back the last change to the waypoints of this world (an add, an import, a sync, numbering a route...), even if it was made before the program was restarted. Every change is kept in a journal next to the world's waypoint folder (ex. "XaeroWaypoints/Multiplayer_1.2.3.4.journal"). Syncs and fan-out adds to a different world are kept in that world's journal, so they're undone by running this with that world.
+    Optional Arguments: 
+        count: How many changes to take back. Default value: 1""",
+        CVALUE=False
+    ),
+    "redo": Command(
+        CHELP="""Usage: redo [count]
+
+Description
+    Makes the last change that was taken back with "undo" again. Making a new change clears what can be redone.
+    Optional Arguments: 
+        count: How many changes to make again. Default value: 1""",
+        CVALUE=False
+    ),
+    "stats": Command(
+        CHELP="""Usage: stats <flags>
+
+Description
+    Shows how many times waypoint files have been parsed and written, how many commands have been run, how long they took (in total and the 50th, 90th and 99th percentile of single calls), and how many bytes were read and written.
+    Timing is off unless the program was started with --stats, --trace or "stats --enable" is used, so it doesn't slow anything down until it's needed.
+    Flags: 
+        --enable: Start timing.
+        --disable: Stop timing. The stats so far are kept.
+        --reset: Clear the stats.""",
+        CFLAGS={
+            "--enable": False,
+            "--disable": False,
+            "--reset": False
+        },
+        CVALUE=False
+    ),
+    "compact": Command(
+        CHELP="""Usage: compact
+
+Description
+    Rewrites every dimension's waypoint file from the waypoints that are currently loaded. Adding waypoints only appends to the end of the files, so this is never required, but it will clean up anything left behind by hand edits.""",
+        CVALUE=False
+    ),
     "help": Command(
         CHELP="""I seriously doubt you require additional assistance with the help command.""",
         CVALUE=False
@@ -50,40 +251,109 @@ Description
     )
 }
 
-#* this isn't in main() because when it's execution is started again (if gameDirectory config is malformed) we don't want this message printing write
-# we don't use logging.warning() because basicConfig hasn't run yet (it's in main)
-print("[WARNING] Currently, this tool only supports multiplayer servers. Singleplayer worlds will be added in the future.") # todo: you know what
+def parseArguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Adds waypoints from Chunkbase to Xaero's Minimap.")
+    parser.add_argument("--map", help="the map file to use (ex. \"mw$default_1.txt\"), instead of picking one at startup")
+    parser.add_argument("--target", help="the IP address of the server to use for this run, instead of the one from the config")
+    parser.add_argument("--world", help="the singleplayer world (its folder name) or server (its IP address) to use for this run, instead of the one from the config")
+    parser.add_argument("--script", help="run the commands in this file (one per line) instead of starting the console, \"-\" reads them from stdin. Commands are also read from stdin when it isn't a terminal (ex. when piping into this)")
+    parser.add_argument("--daemon", action="store_true", help="instead of the console, keep running in the background and accept waypoints over HTTP on localhost (see Daemon.py)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"the port the daemon listens on (default: {DEFAULT_PORT})")
+    parser.add_argument("--stats", action="store_true", help="time parsing, writing and commands from the start (see the \"stats\" command)")
+    parser.add_argument("--trace", help="time everything like --stats, and write every timed call to this file as JSON when the program exits. it can be opened in chrome://tracing or ui.perfetto.dev")
+    parser.add_argument("--profile", nargs="?", const="-", help="run everything under cProfile. the slowest functions are printed when the program exits, or if a file is given the full profile is saved to it (open it with pstats or snakeviz)")
+    return parser.parse_args()
+
+def pickFromList(prompt: str, options: list[str]) -> int:
+    """Asks the user to pick one of `options` by its number, until they give a valid one."""
+    print(prompt)
+    for i, v in enumerate(options):
+        print(f"({i}) {v}")
+    while True:
+        try:
+            selection = int(input("ID: "))
+        except ValueError:
+            selection = -1
+        if selection in range(len(options)):
+            return selection
+        logging.error(f"Type a number from 0 to {len(options)-1}.")
+
+def pickWorld(worlds: list[DiscoveredWorld]) -> DiscoveredWorld:
+    return worlds[pickFromList("Type the identifier associated with the world or server you would like to use:", [i.displayName for i in worlds])]
+
+def pickMap(world: DiscoveredWorld) -> str:
+    return world.maps[pickFromList("Type the identifier associated with which map you would like to use:", world.maps)]
+
+def runScript(console: Console, xaeroWaypoints: XaeroWaypoints, scriptFile: TextIO, scriptName: str) -> int:
+    """Runs every command in `scriptFile`, one per line (blank lines and lines starting with "#" are skipped). Nothing is written until the end, when every file is written once.\n
+    A command failing doesn't stop the script. Returns how many commands failed."""
+    failedCommands: int = 0
+    try:
+        for lineNumber, line in enumerate(scriptFile, start=1):
+            line = line.strip()
+            if line == "" or line[0] == "#":
+                continue
+            userCommand = console.handleInput(line)
+            if userCommand is False or not console.runCommand(userCommand, xaeroWaypoints):
+                logging.error(f"Line {lineNumber} of {scriptName} failed: {line}")
+                failedCommands += 1
+            if not console.running: # the script ran "exit"
+                break
+    finally:
+        xaeroWaypoints.flush() # also written if something unexpected goes wrong, so the commands that did run aren't lost
+    return failedCommands
 
 def main() -> None:
+    args = parseArguments()
     logging.basicConfig(format='[%(levelname)s] %(message)s',level=logging.INFO)
-
-    if "config.json" not in os.listdir("."):
-        logging.info("A config.json file was not found at the project root. Creating a new one...")
-        config.createConfig()
-    
-    if config.getConfig()["gameDirectory"] == None: # it's at it's default value of null
-        logging.warning("No game instance directory was set! Please type the path to your \".minecraft\" directory below:")
-        minecraftDir = input("> ").replace("/","\\")
-        newConfig = config.getConfig()
-        newConfig["gameDirectory"] = minecraftDir
-        config.writeConfig(newConfig)
-        logging.info(f"Set gameDirectory to {minecraftDir}!")
-    # check if the directory provided is actually a valid .minecraft folder
-    # we do this by looking for the "logs" directory because it will always be present in every instance of the game as long as it's ever been launched.
-    # we also put it in a try/except for a FileNotFoundError to check if the dir even exists
+    if args.stats or args.trace is not None:
+        Instrumentation.enableInstrumentation(trace=args.trace is not None)
+    profiler = cProfile.Profile() if args.profile is not None else None
     try:
-        if "logs" not in os.listdir(config.getConfig()["gameDirectory"]):
-            logging.error(f"The provided .minecraft directory ({config.getConfig()["gameDirectory"]}) does not appear to be valid. Resetting config value...")
-            newConfig = config.getConfig()
-            newConfig["gameDirectory"] = None #* set the config value to None and write it to file, then restart execution of main() so that the program detects it's None and will ask for a dir to use.
-            config.writeConfig(newConfig)
-            main()
-    except FileNotFoundError:
-        logging.error(f"The provided .minecraft directory ({config.getConfig()["gameDirectory"]}) does not exist. Resetting config value...")
-        newConfig = config.getConfig()
-        newConfig["gameDirectory"] = None # see above comment
-        config.writeConfig(newConfig)
-        main()
+        if profiler is None:
+            runSession(args)
+        else:
+            profiler.runcall(runSession, args)
+    finally: # sys.exit() and Ctrl+C still get here, so the profile and trace aren't lost
+        if profiler is not None:
+            if args.profile == "-":
+                pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_LINES)
+            else:
+                profiler.dump_stats(args.profile)
+                logging.info(f"Wrote the profile to \"{args.profile}\".")
+        if args.trace is not None:
+            Instrumentation.writeTrace(args.trace)
+
+def runSession(args: argparse.Namespace) -> None:
+    #* in script mode commands come from a file or a pipe instead of someone typing them, so if anything is missing we can't prompt for it and have to exit instead
+    scriptMode: bool = not args.daemon and (args.script is not None or not sys.stdin.isatty())
+    #* never prompt in script mode, even from a terminal (a --script run is meant to be left alone). the daemon can only prompt if there's someone at a terminal to answer
+    canPrompt: bool = not scriptMode and sys.stdin.isatty()
+
+    appConfig: config.Config = config.getConfig() # this is the only time config.json is read, everything below changes this in memory and it's saved once at the end
+
+    while True:
+        if appConfig.gameDirectory == None and not canPrompt:
+            logging.error("No game instance directory was set! Set \"gameDirectory\" in config.json, or run this without a script or pipe once to be asked for it.")
+            sys.exit(2)
+        if appConfig.gameDirectory == None: # it's at it's default value of null
+            logging.warning("No game instance directory was set! Please type the path to your \".minecraft\" directory below:")
+            minecraftDir = input("> ").replace("/","\\")
+            appConfig.set("gameDirectory", minecraftDir)
+            logging.info(f"Set gameDirectory to {minecraftDir}!")
+        # check if the directory provided is actually a valid .minecraft folder
+        # we do this by looking for the "logs" directory because it will always be present in every instance of the game as long as it's ever been launched.
+        # we also put it in a try/except for a FileNotFoundError to check if the dir even exists
+        try:
+            if "logs" not in os.listdir(appConfig.gameDirectory):
+                logging.error(f"The provided .minecraft directory ({appConfig.gameDirectory}) does not appear to be valid. Resetting config value...")
+                appConfig.set("gameDirectory", None) #* set the config value to None and go back to the start of the loop so that the program detects it's None and will ask for a dir to use.
+                continue
+        except FileNotFoundError:
+            logging.error(f"The provided .minecraft directory ({appConfig.gameDirectory}) does not exist. Resetting config value...")
+            appConfig.set("gameDirectory", None) # see above comment
+            continue
+        break
     # todo: check for trailing slash in gameDirectory and if there is one remove it
 
     # check that both minimap and world map are installed by looking in .minecraft/config for their config files
@@ -91,49 +361,121 @@ def main() -> None:
     # but the chances of that happening are less than zero. also the reason we don't look for the .jar file is because, unlike the config
     # file, it could be renamed
     #* this is put here because it requires config.gameDirectory to be assigned a value and it might as well be before we do anything with IP addresses since we don't need IP addresses for this check
-    configDirectoryContents = os.listdir(f"{config.getConfig()["gameDirectory"]}\\config")
+    configDirectoryContents = os.listdir(os.path.join(appConfig.gameDirectory, "config"))
     if "xaerominimap.txt" not in configDirectoryContents:
         logging.warning("Xaero's Minimap was not detected in this instance. You have a very high chance of receiving errors following this message.")
     if "xaeroworldmap.txt" not in configDirectoryContents:
         logging.warning("Xaero's World Map was not detected in this instance. You have a very high chance of receiving errors following this message.")
 
-    if config.getConfig()["targetIpAddress"] == None:
-        logging.warning("No target IP address was set! Please type the IP address of the server you want to add the waypoints to below:")
-        targetIP = input("> ")
-        newConfig = config.getConfig()
-        newConfig["targetIpAddress"] = targetIP
-        config.writeConfig(newConfig)
-        logging.info(f"Set targetIpAddress to {targetIP}!")
-    
-    if not isValidIPv4Address(config.getConfig()["targetIpAddress"]):
-        logging.error(f"The provided target IP address ({config.getConfig()["targetIpAddress"]}) is not valid. Resetting config value...")
-        newConfig = config.getConfig()
-        newConfig["targetIpAddress"] = None #* set the config value to None and write it to file, then restart execution of main() so that the program detects it's None and will ask for a dir to use.
-        config.writeConfig(newConfig)
-        main()
-
-    logging.info(f"Using \"{config.getConfig()["gameDirectory"]}\" as gameDirectory.")
-    logging.info(f"Using \"{config.getConfig()["targetIpAddress"]}\" as targetIpAddress.")
+    # which world or server to use: --target or --world for this run only, otherwise the one saved in the config, otherwise pick one from every world and server in the instance
+    worlds: list[DiscoveredWorld] | None = None # only scanned if it's needed
+    world: DiscoveredWorld | None = None
+    if args.target is not None:
+        if not isValidIPv4Address(args.target):
+            logging.error(f"The provided target IP address ({args.target}) is not valid.")
+            sys.exit(2)
+        worldFolder: str = MULTIPLAYER_PREFIX+args.target
+    elif args.world is not None:
+        worlds = discoverWorlds(appConfig.gameDirectory)
+        world = findWorld(worlds, args.world)
+        if world is None:
+            logging.error(f"There is no world or server called \"{args.world}\" in {appConfig.gameDirectory}.")
+            sys.exit(2)
+        worldFolder = world.folder
+    else:
+        if appConfig.targetWorld == None and appConfig.targetIpAddress != None: # configs from before singleplayer worlds were supported
+            if isValidIPv4Address(appConfig.targetIpAddress):
+                appConfig.set("targetWorld", MULTIPLAYER_PREFIX+appConfig.targetIpAddress)
+            else:
+                logging.error(f"The provided target IP address ({appConfig.targetIpAddress}) is not valid. Resetting config value...")
+                appConfig.set("targetIpAddress", None)
+        if appConfig.targetWorld == None:
+            if not canPrompt:
+                logging.error("No world or server was set! Set \"targetWorld\" in config.json or pass --world or --target.")
+                sys.exit(2)
+            worlds = discoverWorlds(appConfig.gameDirectory)
+            if len(worlds) == 0:
+                logging.error(f"No worlds or servers were found in {appConfig.gameDirectory}. Join the world or server with Xaero's Minimap installed first.")
+                sys.exit(2)
+            world = pickWorld(worlds)
+            appConfig.set("targetWorld", world.folder)
+            if world.multiplayer:
+                appConfig.set("targetIpAddress", world.folder[len(MULTIPLAYER_PREFIX):])
+            logging.info(f"Set targetWorld to {world.folder}!")
+        worldFolder = appConfig.targetWorld
+
+    appConfig.save() # only writes if something above changed
+
+    logging.info(f"Using \"{appConfig.gameDirectory}\" as gameDirectory.")
+    logging.info(f"Using \"{worldFolder}\" as the world.")
+
+    currentMap: str | None = args.map
+    if currentMap is None:
+        if worlds is None:
+            worlds = discoverWorlds(appConfig.gameDirectory)
+        world = findWorld(worlds, worldFolder) or DiscoveredWorld(worldFolder)
+        if len(world.maps) == 0:
+            currentMap = DEFAULT_MAP # it'll be created when the first waypoint is added
+        elif len(world.maps) == 1:
+            currentMap = world.maps[0]
+        elif not canPrompt:
+            logging.error(f"{world.displayName} has more than one map ({', '.join(world.maps)}). Pass the one to use with --map.")
+            sys.exit(2)
+        else:
+            currentMap = pickMap(world)
+        logging.info(f"Using {currentMap} as the map.")
+    waypointDirectory = os.path.join(appConfig.gameDirectory, "XaeroWaypoints", worldFolder)
+    xaeroWaypoints: XaeroWaypoints = XaeroWaypoints(waypointDirectory, currentMap, deferWrites=scriptMode, cacheBudget=appConfig.mapCacheMegabytes*1_000_000)
+    recoveredCount = openJournal(xaeroWaypoints) # changes from last time that might not have made it into the waypoint files (ex. it crashed)
+    if recoveredCount > 0:
+        logging.info(f"Recovered {recoveredCount} changes from the journal that weren't written to the waypoint files last time.")
+    if args.daemon:
+        runDaemon(xaeroWaypoints, args.port)
+        return
 
     console: Console = Console()
     for i in COMMANDS:
         console.registerCommand(i, COMMANDS[i])
-    xaeroWaypoints: XaeroWaypoints = XaeroWaypoints(f"{config.getConfig()["gameDirectory"]}\\XaeroWaypoints\\Multiplayer_{config.getConfig()["targetIpAddress"]}")
 
-    running = True
+    if scriptMode:
+        try:
+            if args.script is None or args.script == "-":
+                failedCommands = runScript(console, xaeroWaypoints, sys.stdin, "stdin")
+            else:
+                try:
+                    scriptFile = open(args.script, "r", encoding="utf-8")
+                except OSError as e:
+                    logging.error(f"Unable to read script \"{args.script}\": {e}")
+                    sys.exit(2)
+                with scriptFile:
+                    failedCommands = runScript(console, xaeroWaypoints, scriptFile, f"\"{args.script}\"")
+        finally:
+            xaeroWaypoints.close()
+        if failedCommands > 0:
+            logging.error(f"{failedCommands} commands failed.")
+            sys.exit(1)
+        return
+
     print("Chunkbase-Xaero Waypoint Integration Script. Type \"help\" for instructions.")
-    while running:
-        userInput: str = input("> ")
-        if userInput == "" or userInput is None:
-            logging.error("An input is required to continue.")
-            continue
-        
-        userCommand = console.handleInput(userInput)
-        if userCommand is False:
-            logging.error("Failed to handle user input.")
-            continue
+    try:
+        while console.running:
+            userInput: str = input("> ")
+            if userInput == "" or userInput is None:
+                logging.error("An input is required to continue.")
+                continue
+            
+            userCommand = console.handleInput(userInput)
+            if userCommand is False:
+                logging.error("Failed to handle user input.")
+                continue
 
-        console.runCommand(userCommand, xaeroWaypoints)
+            console.runCommand(userCommand, xaeroWaypoints)
+            xaeroWaypoints.commitJournal() # one fsync for everything the command changed
+    except (KeyboardInterrupt, EOFError): # Ctrl+C or Ctrl+D, treated the same as "exit"
+        print()
+    finally:
+        xaeroWaypoints.flush() # so everything is in the waypoint files and the journal doesn't replay it next time
+        xaeroWaypoints.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file